@@ -0,0 +1,121 @@
+"""
+Benchmark: combined (single-call) generation vs the three-call path.
+
+Offline it compares input-token estimates for the prompts of a set of sample profiles.
+With --live (and OPENAI_API_KEY set) it also sends both variants to OpenAI and reports
+latency and the token usage the API returns.
+
+Usage: python -m backend.benchmarks.combined_generation [--live] [--runs 3]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+from backend.main import UserInput, build_workout_prompts
+from backend.nlp.GPTClient import GPTClient
+from backend.nlp.GPTWorkoutGenerator import GPTWorkoutGenerator
+from backend.nlp.PromptTemplates import PromptTemplates
+from backend.nlp.TokenCounter import TokenCounter
+
+
+def estimate_prompt_tokens(prompt):
+    """Prompt tokens plus chat framing, matching GPTScheduler's estimate."""
+    return TokenCounter.count(prompt) + 4
+
+
+def sample_profiles():
+    for goal, preference, location, experience, conditions in itertools.product(
+        ("Muscle Gain", "Weight Loss"), ("strength training", "cardio", "mixed"), ("Home", "Gym"),
+        ("beginner", "expert"), (("No", "No"), ("Yes", "No"))
+    ):
+        yield UserInput(
+            weight=82, height=178, gender=1, age=34, hypertension=conditions[0], diabetes=conditions[1],
+            fitness_goal=goal, workout_preference=preference, workout_location=location,
+            duration="2 weeks", experience_level=experience
+        )
+
+
+def build_variants(user_input):
+    bmi, recommendation_level, _, prompts = build_workout_prompts(user_input)
+    combined = PromptTemplates.combined_plan_prompt(user_input, recommendation_level, bmi)
+    return list(prompts.values()), combined
+
+
+def offline_report():
+    separate_tokens, combined_tokens = [], []
+    for user_input in sample_profiles():
+        separate, combined = build_variants(user_input)
+        separate_tokens.append(sum(estimate_prompt_tokens(prompt) for prompt in separate))
+        combined_tokens.append(estimate_prompt_tokens(combined))
+    separate_mean, combined_mean = statistics.mean(separate_tokens), statistics.mean(combined_tokens)
+    return {
+        "profiles": len(separate_tokens),
+        "separate_input_tokens_mean": round(separate_mean, 1),
+        "combined_input_tokens_mean": round(combined_mean, 1),
+        "input_token_savings_pct": round(100 * (1 - combined_mean / separate_mean), 1),
+        "requests_per_plan": {"separate": 3, "combined": 1},
+    }
+
+
+async def live_report(runs):
+    client = GPTClient()
+    user_input = next(sample_profiles())
+    separate, combined = build_variants(user_input)
+    results = {"separate": [], "combined": []}
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.create_completion_async(prompt) for prompt in separate))
+        results["separate"].append({
+            "latency_s": time.perf_counter() - start,
+            "prompt_tokens": sum(r.usage.prompt_tokens for r in responses),
+            "completion_tokens": sum(r.usage.completion_tokens for r in responses),
+            "valid": True,
+        })
+
+        start = time.perf_counter()
+        response = await client.create_completion_async(combined, max_tokens=1500)
+        try:
+            GPTWorkoutGenerator.parse_combined(response.choices[0].message.content)
+            valid = True
+        except Exception:
+            valid = False
+        results["combined"].append({
+            "latency_s": time.perf_counter() - start,
+            "prompt_tokens": response.usage.prompt_tokens,
+            "completion_tokens": response.usage.completion_tokens,
+            "valid": valid,
+        })
+
+    await GPTClient.aclose()
+    summary = {}
+    for mode, samples in results.items():
+        summary[mode] = {
+            "latency_s_median": round(statistics.median(s["latency_s"] for s in samples), 3),
+            "prompt_tokens_mean": statistics.mean(s["prompt_tokens"] for s in samples),
+            "completion_tokens_mean": statistics.mean(s["completion_tokens"] for s in samples),
+            "valid_rate": sum(s["valid"] for s in samples) / len(samples),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--live", action="store_true", help="also call OpenAI (costs tokens)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    report = {"offline": offline_report()}
+    if args.live:
+        load_dotenv()
+        report["live"] = asyncio.run(live_report(args.runs))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Offline load test of the FastAPI app against the local mock upstreams (mock_upstreams.py).
+
+Starts the mock OpenAI and YouTube servers, points the app at them (OPENAI_BASE_URL,
+YOUTUBE_API_URL), serves the app with uvicorn in a background thread and drives
+/generate-workout, /user-concerns, /youtube-search and /youtube-video with a closed
+loop of `concurrency` clients. For every scenario and concurrency level it reports
+p50/p95/p99 latency, throughput, status counts, the upstream calls made and the lag of
+the app's event loop (sampled every 10 ms while the run is in progress). Memory per
+session is reported from the stored session objects and from the process RSS.
+
+Responses are not served from the GPT caches unless --use-cache is given, so every
+request exercises the upstream path.
+
+Usage: python -m backend.benchmarks.load_test [--scenarios generate-workout,user-concerns]
+       [--concurrency 1,8,32] [--requests 50] [--openai-latency lognormal:1.2,0.4]
+       [--openai-429-rate 0.05] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import os
+import random
+import resource
+import sys
+import time
+
+import httpx
+
+from backend.benchmarks import results
+from backend.benchmarks.mock_upstreams import (
+    BackgroundServer, add_upstream_arguments, behaviours_from_args, mock_video_id, start_mock_upstreams
+)
+
+SCENARIOS = ("generate-workout", "user-concerns", "youtube-search", "youtube-video")
+CONCERNS = (
+    "How do I avoid knee pain during squats?", "I lose motivation after two weeks, any tips?",
+    "How long should I rest between workouts?", "What should I eat before training?",
+    "Are protein supplements necessary?", "My lower back hurts after deadlifts", "How do I stay consistent while travelling?",
+    "Is it ok to train when my muscles are sore?", "How much water should I drink?", "Can I train with a cold?",
+)
+EXERCISES = ("Goblet Squat", "Push-Up", "Bent-Over Row", "Plank", "Glute Bridge", "Reverse Lunge",
+             "Overhead Press", "Dead Bug", "Jumping Jacks", "Lat Pulldown", "Deadlift", "Bench Press")
+LAG_INTERVAL = 0.01
+
+
+def profiles(rng):
+    """Endless random UserInput payloads over the categorical grid."""
+    while True:
+        yield {
+            "weight": round(rng.uniform(50, 120), 1), "height": round(rng.uniform(150, 200), 1),
+            "gender": rng.choice((0, 1)), "age": rng.randint(18, 70),
+            "hypertension": rng.choice(("No", "No", "Yes")), "diabetes": rng.choice(("No", "No", "Yes")),
+            "fitness_goal": rng.choice(("Muscle Gain", "Weight Loss", "Weight Gain")),
+            "workout_preference": rng.choice(("Strength Training", "Cardio", "Mixed")),
+            "workout_location": rng.choice(("Home", "Gym")),
+            "duration": rng.choice(("1 week", "2 weeks", "1 month")),
+            "experience_level": rng.choice(("beginner", "intermediate", "expert")),
+        }
+
+
+def rss_bytes():
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def deep_sizeof(value, seen=None):
+    """Approximate bytes held by a JSON-like object graph (dicts, lists, strings, numbers)."""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in value)
+    elif hasattr(value, "__slots__"):
+        size += sum(deep_sizeof(getattr(value, name), seen) for name in value.__slots__ if hasattr(value, name))
+    elif hasattr(value, "__dict__"):
+        size += deep_sizeof(vars(value), seen)
+    return size
+
+
+class LagProbe:
+    """Measures how late the app's event loop wakes up from short sleeps (scheduling lag)."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.samples = []
+        self._future = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.samples.append(max(0.0, time.perf_counter() - started - LAG_INTERVAL))
+
+    def start(self):
+        self.samples = []
+        self._future = asyncio.run_coroutine_threadsafe(self._run(), self.loop)
+
+    def stop(self):
+        self._future.cancel()
+        samples_ms = [sample * 1000 for sample in self.samples]
+        return {
+            "p50_ms": round(results.percentile(samples_ms, 50), 2),
+            "p99_ms": round(results.percentile(samples_ms, 99), 2),
+            "max_ms": round(max(samples_ms, default=0.0), 2),
+        }
+
+
+class LoadTest:
+    def __init__(self, app_url, args, openai_behaviour, youtube_behaviour):
+        self.app_url = app_url
+        self.args = args
+        self.upstreams = {"openai": openai_behaviour, "youtube": youtube_behaviour}
+        self.rng = random.Random(args.seed)
+        self.profiles = profiles(self.rng)
+        self.sessions = []
+        self.headers = {} if args.use_cache else {"cache-bypass": "1"}
+
+    def _request(self, scenario):
+        """(method, path, kwargs) for one request of a scenario."""
+        if scenario == "generate-workout":
+            return "POST", "/generate-workout", {"json": next(self.profiles), "headers": self.headers}
+        if scenario == "user-concerns":
+            session_id = self.rng.choice(self.sessions)
+            return "POST", f"/user-concerns/{session_id}", {
+                "json": {"concern": self.rng.choice(CONCERNS)}, "headers": self.headers
+            }
+        if scenario == "youtube-search":
+            exercise = self.rng.choice(EXERCISES)
+            level = self.rng.choice(("beginner", "intermediate", "expert"))
+            headers = {"session-id": self.rng.choice(self.sessions)} if self.sessions else {}
+            return "POST", "/youtube-search", {
+                "json": {"query": f"{exercise} for {level} {level} form technique", "max_results": 10},
+                "headers": headers
+            }
+        video_id = mock_video_id(f"{self.rng.choice(EXERCISES)}:{self.rng.randint(0, 9)}")
+        return "GET", f"/youtube-video/{video_id}", {}
+
+    async def ensure_sessions(self, client, count):
+        """Sessions for the scenarios that need one, created through /generate-workout."""
+        while len(self.sessions) < count:
+            response = await client.post("/generate-workout", json=next(self.profiles))
+            response.raise_for_status()
+            self.sessions.append(response.json()["session_id"])
+
+    async def run(self, client, scenario, concurrency, probe):
+        requests = iter(range(self.args.requests))
+        latencies, statuses = [], {}
+        upstream_before = {name: behaviour.stats["requests"] for name, behaviour in self.upstreams.items()}
+
+        async def worker():
+            for _ in requests:
+                method, path, kwargs = self._request(scenario)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **kwargs)
+                    status = str(response.status_code)
+                    if scenario == "generate-workout" and response.status_code == 200:
+                        self.sessions.append(response.json()["session_id"])
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        probe.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        lag = probe.stop()
+
+        latencies_ms = [latency * 1000 for latency in latencies]
+        return {
+            "requests": len(latencies),
+            "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+            "status_counts": statuses,
+            "latency_ms": {
+                "p50": round(results.percentile(latencies_ms, 50), 1),
+                "p95": round(results.percentile(latencies_ms, 95), 1),
+                "p99": round(results.percentile(latencies_ms, 99), 1),
+                "mean": round(sum(latencies_ms) / len(latencies_ms), 1) if latencies_ms else 0.0,
+            },
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "upstream_calls": {
+                name: behaviour.stats["requests"] - upstream_before[name] for name, behaviour in self.upstreams.items()
+            },
+            "event_loop_lag": lag,
+        }
+
+
+def memory_per_session(session_manager, rss_before):
+    """Bytes per stored session: object-graph size of the stored sessions, and RSS growth over the run."""
+    gc.collect()
+    sessions = session_manager.backend.count()
+    stored = getattr(session_manager.backend, "sessions", None)
+    object_bytes = sum(deep_sizeof(entry[0]) for entry in stored.values()) if stored is not None else None
+    return {
+        "sessions": sessions,
+        "object_bytes_per_session": round(object_bytes / sessions) if sessions and object_bytes is not None else None,
+        "rss_growth_bytes_per_session": round((rss_bytes() - rss_before) / sessions) if sessions else None,
+        "rss_bytes": rss_bytes(),
+    }
+
+
+async def drive(app_url, args, behaviours, probe):
+    load_test = LoadTest(app_url, args, *behaviours)
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(concurrency_levels) + 10)
+    report = {}
+    async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=args.timeout) as client:
+        for scenario, concurrency in itertools.product(args.scenarios.split(","), concurrency_levels):
+            if scenario not in SCENARIOS:
+                raise SystemExit(f"Unknown scenario {scenario}; choose from {', '.join(SCENARIOS)}")
+            if scenario in ("user-concerns", "youtube-search"):
+                await load_test.ensure_sessions(client, 10)
+            print(f"{scenario} @ concurrency {concurrency}", file=sys.stderr)
+            report.setdefault(scenario, {})[str(concurrency)] = await load_test.run(client, scenario, concurrency, probe)
+        report["cache_stats"] = (await client.get("/cache/stats")).json()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=50, help="requests per scenario and concurrency level")
+    parser.add_argument("--timeout", type=float, default=120.0, help="client timeout per request (seconds)")
+    parser.add_argument("--use-cache", action="store_true", help="let the app serve from its GPT caches")
+    add_upstream_arguments(parser)
+    results.add_result_arguments(parser)
+    args = parser.parse_args()
+
+    behaviours = behaviours_from_args(args)
+    openai_server, youtube_server = start_mock_upstreams(*behaviours)
+    # The app reads its upstream configuration at import time
+    os.environ.update({
+        "OPENAI_BASE_URL": f"{openai_server.url}/v1", "OPENAI_API_KEY": "mock-key",
+        "YOUTUBE_API_URL": f"{youtube_server.url}/youtube/v3", "YOUTUBE_API_KEY": "mock-key",
+        "SESSION_BACKEND": "memory",
+    })
+    os.environ.pop("SEMANTIC_CACHE_DB", None)
+    from backend import main as app_module
+
+    rss_before = rss_bytes()
+    app_server = BackgroundServer(app_module.app, lifespan="on").start()
+    try:
+        report = asyncio.run(drive(app_server.url, args, behaviours, LagProbe(app_server.loop)))
+        report["memory"] = memory_per_session(app_module.session_manager, rss_before)
+        report["upstreams"] = {name: behaviour.stats for name, behaviour in zip(("openai", "youtube"), behaviours)}
+    finally:
+        app_server.stop()
+        openai_server.stop()
+        youtube_server.stop()
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    results.emit(args, "load_test", config, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Microbenchmarks for the CPU-bound request path: RuleBasedRecommender and PromptTemplates.
+
+Each case is timed with timeit (auto-ranged loop count, best of --repeat runs) and
+reported in microseconds per call, so results can be saved with --output and compared
+across commits with --compare.
+
+Usage: python -m backend.benchmarks.microbench [--repeat 5] [--output micro.json] [--compare baseline.json]
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from backend.benchmarks import results
+from backend.main import UserInput
+from backend.models.RuleBasedRecommender import RuleBasedRecommender
+from backend.nlp.PromptTemplates import PromptTemplates
+
+BATCH_ROWS = 100_000
+
+
+def sample_inputs():
+    user_input = UserInput(
+        weight=82, height=178, gender=1, age=34, hypertension="Yes", diabetes="No", fitness_goal="Muscle Gain",
+        workout_preference="Strength Training", workout_location="Gym", duration="4 weeks", experience_level="expert"
+    )
+    user_data = {**user_input.dict(), "bmi": 25.9, "recommendation_level": 3}
+    turns = [{"concern": "My knees hurt during squats", "response": "Reduce the depth and slow the lowering phase. " * 6},
+             {"concern": "What should I eat before training?", "response": "A light carb-rich snack an hour before. " * 6}]
+    return user_input, user_data, turns
+
+
+def cases():
+    user_input, user_data, turns = sample_inputs()
+    rng = np.random.default_rng(0)
+    batch = (
+        np.round(rng.uniform(30, 250, BATCH_ROWS), 1), np.round(rng.uniform(100, 220, BATCH_ROWS), 1),
+        rng.integers(10, 90, BATCH_ROWS), np.where(rng.random(BATCH_ROWS) < 0.3, "Yes", "No"),
+        np.where(rng.random(BATCH_ROWS) < 0.2, "Yes", "No"),
+    )
+    return {
+        "recommender.calculate_bmi": lambda: RuleBasedRecommender.calculate_bmi(82, 178),
+        "recommender.get_recommendation_level": lambda: RuleBasedRecommender.get_recommendation_level(
+            82, 178, 34, "Yes", "No"),
+        f"recommender.get_recommendation_levels_batch[{BATCH_ROWS}]": lambda: RuleBasedRecommender.get_recommendation_levels_batch(
+            *batch),
+        "prompts.user_fitness_analysis": lambda: PromptTemplates.user_fitness_analysis(user_input, 3, 25.9),
+        "prompts.workout_plan_prompt": lambda: PromptTemplates.workout_plan_prompt(user_input),
+        "prompts.nutrition_tips_prompt": lambda: PromptTemplates.nutrition_tips_prompt(user_data, 25.9),
+        "prompts.combined_plan_prompt": lambda: PromptTemplates.combined_plan_prompt(user_input, 3, 25.9),
+        "prompts.user_concern_prompt": lambda: PromptTemplates.user_concern_prompt(user_data, "knee pain"),
+        "prompts.user_concern_prompt_with_history": lambda: PromptTemplates.user_concern_prompt(
+            user_data, "knee pain", "- Asked about squats.", turns),
+        "prompts.section_inputs": lambda: PromptTemplates.section_inputs(user_input.dict(), 3, 25.9),
+    }
+
+
+def measure(function, repeat):
+    timer = timeit.Timer(function)
+    loops, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=loops)) / loops
+    return {"us_per_call": round(best * 1e6, 3), "calls_per_second": round(1 / best) if best else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this text")
+    results.add_result_arguments(parser)
+    args = parser.parse_args()
+
+    report = {name: measure(function, args.repeat) for name, function in cases().items() if args.filter in name}
+    results.emit(args, "microbench", {"repeat": args.repeat, "filter": args.filter}, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Local stand-ins for the OpenAI chat completions API and the YouTube Data API, for
+offline benchmarks and load tests.
+
+Each server samples a response latency from a configurable distribution and fails a
+configurable share of requests with 429 (with Retry-After) or 500, so upstream
+behaviour is repeatable from run to run and costs nothing. Replies are shaped like the
+real APIs closely enough for the backend to parse them: workout-plan prompts get a
+markdown exercise table, combined prompts a JSON object, and streaming requests SSE
+chunks spread over the sampled latency.
+
+Latency specs: "fixed:SECONDS", "uniform:LOW,HIGH", "normal:MEAN,SD" or
+"lognormal:MEDIAN,SIGMA".
+
+Usage (standalone): python -m backend.benchmarks.mock_upstreams [--openai-latency lognormal:1.5,0.5]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import socket
+import threading
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+WORKOUT_PLAN_REPLY = "\n".join([
+    "A balanced week built around your goal.",
+    "",
+    "| Day | Exercise | Sets | Reps | Equipment Needed | Additional Notes |",
+    "|---|---|---|---|---|---|",
+    "| Day 1 | Jumping Jacks | 1 | 5 min | None | Warm up gradually. |",
+    "| Day 1 | Goblet Squat | 3 | 10-12 | Dumbbell | Chest up, knees over toes. |",
+    "| Day 1 | Push-Up | 3 | 8-10 | None | Keep your core tight. |",
+    "| Day 1 | Bent-Over Row | 3 | 10-12 | Dumbbells | Squeeze the shoulder blades. |",
+    "| Day 1 | Plank | 3 | 30 s | Mat | Flat lower back. |",
+    "| Day 2 | Brisk Walk | 1 | 25 min | None | Conversational pace. |",
+    "| Day 2 | Glute Bridge | 3 | 12 | Mat | Pause at the top. |",
+    "| Day 2 | Dead Bug | 3 | 10 | Mat | Move slowly. |",
+    "| Day 3 | Reverse Lunge | 3 | 10 | None | Control the lowering phase. |",
+    "| Day 3 | Overhead Press | 3 | 8-10 | Dumbbells | Brace before each rep. |",
+    "| Day 3 | Hamstring Stretch | 1 | 5 min | Mat | Breathe slowly. |",
+    "",
+    "### Progression & Scaling",
+    "Add 1-2 reps per set each week; add load once every set hits the top of the range.",
+])
+FILLER = ("Stay consistent, recover well and adjust the load to how you feel. "
+          "Hydrate, sleep seven to nine hours and build each week on the last. ")
+
+
+class LatencyDistribution:
+    """Samples response latencies (seconds) from a spec such as "lognormal:1.2,0.4"."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(value) for value in params.split(",") if value]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self, rng):
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(*self.params))
+        median, sigma = self.params
+        return rng.lognormvariate(math.log(median), sigma)
+
+
+class UpstreamBehaviour:
+    """Latency, failure rates and request counters for one mock server."""
+
+    def __init__(self, latency="fixed:0.05", error_rate=0.0, rate_limit_rate=0.0, retry_after=0.2, seed=0):
+        self.latency = LatencyDistribution(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0}
+
+    def outcome(self):
+        """(latency seconds, status): status 429 or 500 for injected failures, else 200."""
+        self.stats["requests"] += 1
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            return self.latency.sample(self.rng) * 0.1, 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.stats["errors"] += 1
+            return self.latency.sample(self.rng), 500
+        return self.latency.sample(self.rng), 200
+
+    def failure(self, status):
+        headers = {"retry-after-ms": str(int(self.retry_after * 1000))} if status == 429 else {}
+        message = "Rate limit reached (mock)" if status == 429 else "Internal error (mock)"
+        return JSONResponse({"error": {"message": message, "code": status}}, status_code=status, headers=headers)
+
+
+def openai_reply(prompt, max_tokens):
+    """A reply shaped like what the prompt asks for, roughly max_tokens long."""
+    if "Return ONLY a JSON object" in prompt:
+        return json.dumps({"fitness_analysis": FILLER * 2, "workout_plan": WORKOUT_PLAN_REPLY,
+                           "nutrition_tips": FILLER * 3})
+    if "`Day`, `Exercise`" in prompt:
+        return WORKOUT_PLAN_REPLY
+    words = FILLER.split()
+    length = max(20, int(max_tokens * 0.6))
+    return " ".join(words[i % len(words)] for i in range(length))
+
+
+def create_openai_app(behaviour):
+    async def chat_completions(request):
+        body = json.loads(await request.body())
+        latency, status = behaviour.outcome()
+        if status != 200:
+            await asyncio.sleep(latency)
+            return behaviour.failure(status)
+
+        prompt = body["messages"][-1]["content"]
+        reply = openai_reply(prompt, body.get("max_tokens") or 500)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(reply) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": "chatcmpl-mock", "created": int(time.time()), "model": body["model"]}
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+            return JSONResponse({**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}
+            ]})
+
+        chunks = [reply[i:i + 40] for i in range(0, len(reply), 40)]
+
+        async def events():
+            # About a third of the latency before the first token, the rest spread over the chunks
+            await asyncio.sleep(latency * 0.3)
+            for chunk in chunks:
+                data = {**base, "object": "chat.completion.chunk",
+                        "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+                yield f"data: {json.dumps(data)}\n\n"
+                await asyncio.sleep(latency * 0.7 / len(chunks))
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return Starlette(routes=[Route("/v1/chat/completions", chat_completions, methods=["POST"])])
+
+
+def mock_video_id(text):
+    return hashlib.md5(text.encode("utf-8")).hexdigest()[:11]
+
+
+def _snippet(video_id):
+    thumbnail = {"url": f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg"}
+    return {"title": f"Workout video {video_id}", "description": "Form and technique walkthrough.",
+            "channelTitle": "Mock Fitness", "publishedAt": "2024-01-01T00:00:00Z",
+            "thumbnails": {"medium": thumbnail, "high": thumbnail}}
+
+
+def create_youtube_app(behaviour):
+    async def search(request):
+        latency, status = behaviour.outcome()
+        await asyncio.sleep(latency)
+        if status != 200:
+            return behaviour.failure(status)
+        query = request.query_params.get("q", "")
+        count = int(request.query_params.get("maxResults", "5"))
+        items = []
+        for i in range(count):
+            video_id = mock_video_id(f"{query}:{i}")
+            items.append({"id": {"kind": "youtube#video", "videoId": video_id}, "snippet": _snippet(video_id)})
+        return JSONResponse({"items": items})
+
+    async def videos(request):
+        latency, status = behaviour.outcome()
+        await asyncio.sleep(latency)
+        if status != 200:
+            return behaviour.failure(status)
+        items = [
+            {"id": video_id, "snippet": _snippet(video_id), "contentDetails": {"duration": "PT8M30S"},
+             "statistics": {"viewCount": "12345", "likeCount": "678"}}
+            for video_id in request.query_params.get("id", "").split(",") if video_id
+        ]
+        return JSONResponse({"items": items})
+
+    return Starlette(routes=[Route("/youtube/v3/search", search), Route("/youtube/v3/videos", videos)])
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class BackgroundServer:
+    """Runs an ASGI app with uvicorn on its own event loop in a daemon thread."""
+
+    def __init__(self, app, port=None, lifespan="auto"):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.server = uvicorn.Server(uvicorn.Config(
+            app, host="127.0.0.1", port=self.port, log_level="warning", lifespan=lifespan, access_log=False
+        ))
+        self.loop = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+
+    def start(self, timeout=10):
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"Server on port {self.port} did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+def start_mock_upstreams(openai_behaviour, youtube_behaviour):
+    """Start both mock servers; returns (openai_server, youtube_server)."""
+    openai_server = BackgroundServer(create_openai_app(openai_behaviour), lifespan="off").start()
+    youtube_server = BackgroundServer(create_youtube_app(youtube_behaviour), lifespan="off").start()
+    return openai_server, youtube_server
+
+
+def add_upstream_arguments(parser):
+    """Command-line options for the mock upstreams, shared by the benchmark scripts."""
+    parser.add_argument("--openai-latency", default="lognormal:1.2,0.4", help="OpenAI latency distribution")
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--openai-429-rate", type=float, default=0.0)
+    parser.add_argument("--youtube-latency", default="lognormal:0.25,0.3", help="YouTube latency distribution")
+    parser.add_argument("--youtube-error-rate", type=float, default=0.0)
+    parser.add_argument("--youtube-429-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def behaviours_from_args(args):
+    return (
+        UpstreamBehaviour(args.openai_latency, args.openai_error_rate, args.openai_429_rate, seed=args.seed),
+        UpstreamBehaviour(args.youtube_latency, args.youtube_error_rate, args.youtube_429_rate, seed=args.seed + 1),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the mock OpenAI and YouTube servers until interrupted.")
+    add_upstream_arguments(parser)
+    args = parser.parse_args()
+    openai_server, youtube_server = start_mock_upstreams(*behaviours_from_args(args))
+    print(f"OPENAI_BASE_URL={openai_server.url}/v1")
+    print(f"YOUTUBE_API_URL={youtube_server.url}/youtube/v3")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        openai_server.stop()
+        youtube_server.stop()
+
+
+if __name__ == "__main__":
+    main()
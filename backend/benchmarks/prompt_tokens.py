@@ -0,0 +1,94 @@
+"""
+Prompt token budget check.
+
+Renders every PromptTemplates template over the categorical profile grid, counts input
+tokens with the offline TokenCounter estimate (so results do not depend on network
+access or tiktoken) and compares the worst case with PromptTemplates.TOKEN_BUDGETS.
+Exits 1 when any template is over budget, so it can run as a CI regression check.
+
+Usage: python -m backend.benchmarks.prompt_tokens [--baseline <git-ref>]
+"""
+import argparse
+import itertools
+import json
+import subprocess
+import sys
+import types
+
+from backend.main import UserInput, build_workout_prompts
+from backend.nlp.PromptTemplates import PromptTemplates
+from backend.nlp.TokenCounter import TokenCounter
+
+CONCERNS = (
+    "injury prevention", "motivation", "workout recovery", "nutrition guidance", "supplements",
+    "joint health", "mental health", "muscle soreness", "how do I stay consistent while travelling",
+)
+
+
+def profile_grid():
+    for goal, preference, location, experience, conditions, weight in itertools.product(
+        ("Muscle Gain", "Weight Loss", "Weight Gain", "General Fitness"),
+        ("strength training", "cardio", "mixed"), ("Home", "Gym"),
+        ("beginner", "intermediate", "expert"), (("No", "No"), ("Yes", "No"), ("Yes", "Yes")),
+        (50, 70, 85, 120)
+    ):
+        yield UserInput(
+            weight=weight, height=175, gender=1, age=34, hypertension=conditions[0], diabetes=conditions[1],
+            fitness_goal=goal, workout_preference=preference, workout_location=location,
+            duration="4 weeks", experience_level=experience
+        )
+
+
+def render_all(templates):
+    """Yield (template name, prompt) for every template over the grid."""
+    for user_input in profile_grid():
+        bmi, recommendation_level, user_data, prompts = build_workout_prompts(user_input)
+        yield "user_fitness_analysis", templates.user_fitness_analysis(user_input, recommendation_level, bmi)
+        yield "workout_plan_prompt", templates.workout_plan_prompt(user_input)
+        yield "nutrition_tips_prompt", templates.nutrition_tips_prompt(user_data, bmi)
+        if hasattr(templates, "combined_plan_prompt"):
+            yield "combined_plan_prompt", templates.combined_plan_prompt(user_input, recommendation_level, bmi)
+        if hasattr(templates, "user_concern_prompt"):
+            for concern in CONCERNS:
+                yield "user_concern_prompt", templates.user_concern_prompt(user_data, concern)
+
+
+def measure(templates):
+    worst = {}
+    for name, prompt in render_all(templates):
+        worst[name] = max(worst.get(name, 0), TokenCounter.count_offline(prompt))
+    return worst
+
+
+def load_baseline(ref):
+    """PromptTemplates as of a git ref, for a before/after comparison."""
+    source = subprocess.run(
+        ["git", "show", f"{ref}:backend/nlp/PromptTemplates.py"], capture_output=True, text=True, check=True
+    ).stdout
+    module = types.ModuleType("baseline_prompt_templates")
+    exec(compile(source, "baseline_prompt_templates", "exec"), module.__dict__)
+    return module.PromptTemplates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", help="git ref to compare token counts against")
+    args = parser.parse_args()
+
+    worst = measure(PromptTemplates)
+    report = {
+        name: {"max_tokens": tokens, "budget": PromptTemplates.TOKEN_BUDGETS.get(name)}
+        for name, tokens in worst.items()
+    }
+    if args.baseline:
+        for name, tokens in measure(load_baseline(args.baseline)).items():
+            if name in report:
+                report[name]["baseline_max_tokens"] = tokens
+
+    over = [name for name, entry in report.items() if entry["budget"] is None or entry["max_tokens"] > entry["budget"]]
+    print(json.dumps({"templates": report, "over_budget": over}, indent=2))
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark and agreement check for the vectorized RuleBasedRecommender.
+
+Scores a synthetic cohort with get_recommendation_levels_batch, then replays a
+sample (plus boundary cases) through the scalar rules and exits non-zero if any
+BMI or recommendation level differs.
+
+Usage: python -m backend.benchmarks.recommender_batch [--rows 1000000] [--sample 100000]
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from backend.models.RuleBasedRecommender import RuleBasedRecommender
+
+
+def make_cohort(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "weight": np.round(rng.uniform(30, 250, rows), 1),
+        "height": np.round(rng.uniform(100, 220, rows), 1),
+        "age": rng.integers(10, 90, rows),
+        "hypertension": np.where(rng.random(rows) < 0.3, "Yes", "No"),
+        "diabetes": np.where(rng.random(rows) < 0.2, "Yes", "No"),
+    }
+
+
+def boundary_cases():
+    """Rows sitting on every threshold of the scalar rules."""
+    cases = []
+    for bmi in (15.9, 16.0, 18.4, 18.5, 24.9, 25.0, 29.9, 30.0, 34.9, 35.0, 39.9, 40.0):
+        for age in (17, 18, 59, 60, 65, 66):
+            for hypertension, diabetes in (("No", "No"), ("Yes", "No"), ("No", "Yes"), ("Yes", "Yes")):
+                # height 100 cm makes weight == BMI
+                cases.append((bmi, 100.0, age, hypertension, diabetes))
+    return cases
+
+
+def check_agreement(cohort, indices, bmi, levels):
+    mismatches = 0
+    for i in indices:
+        args = (float(cohort["weight"][i]), float(cohort["height"][i]), int(cohort["age"][i]),
+                str(cohort["hypertension"][i]), str(cohort["diabetes"][i]))
+        if RuleBasedRecommender.calculate_bmi(*args[:2]) != bmi[i] or \
+                RuleBasedRecommender.get_recommendation_level(*args) != levels[i]:
+            mismatches += 1
+            if mismatches <= 5:
+                print("Mismatch:", args, "batch:", bmi[i], levels[i])
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=100_000)
+    args = parser.parse_args()
+
+    cohort = make_cohort(args.rows)
+    start = time.perf_counter()
+    bmi, levels = RuleBasedRecommender.get_recommendation_levels_batch(
+        cohort["weight"], cohort["height"], cohort["age"], cohort["hypertension"], cohort["diabetes"]
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Batch scored {args.rows:,} rows in {elapsed * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    for i in range(min(args.sample, args.rows)):
+        RuleBasedRecommender.get_recommendation_level(
+            cohort["weight"][i], cohort["height"][i], cohort["age"][i], cohort["hypertension"][i], cohort["diabetes"][i]
+        )
+    scalar_elapsed = time.perf_counter() - start
+    print(f"Scalar rules: {scalar_elapsed / max(1, min(args.sample, args.rows)) * 1e6:.2f} us/row")
+
+    sample = np.random.default_rng(1).choice(args.rows, size=min(args.sample, args.rows), replace=False)
+    mismatches = check_agreement(cohort, sample, bmi, levels)
+
+    edges = boundary_cases()
+    edge_cohort = {name: np.array(values) for name, values in
+                   zip(("weight", "height", "age", "hypertension", "diabetes"), zip(*edges))}
+    edge_bmi, edge_levels = RuleBasedRecommender.get_recommendation_levels_batch(
+        edge_cohort["weight"], edge_cohort["height"], edge_cohort["age"],
+        edge_cohort["hypertension"], edge_cohort["diabetes"]
+    )
+    mismatches += check_agreement(edge_cohort, range(len(edges)), edge_bmi, edge_levels)
+
+    if mismatches:
+        print(f"FAILED: {mismatches} rows disagree with the scalar rules")
+        sys.exit(1)
+    print(f"OK: batch matches scalar rules on {len(sample) + len(edges):,} checked rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+JSON result files shared by the benchmark scripts, so runs can be saved and compared.
+
+A result file is {"benchmark", "metadata": {git commit, python, platform, time}, "config", "results"}.
+compare() walks two result trees and reports every numeric value with its relative change.
+"""
+import json
+import platform
+import subprocess
+import sys
+import time
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"git_commit": commit or None, "python": sys.version.split()[0], "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def save(path, benchmark, config, results):
+    document = {"benchmark": benchmark, "metadata": metadata(), "config": config, "results": results}
+    with open(path, "w", encoding="utf-8") as output:
+        json.dump(document, output, indent=2)
+    return document
+
+
+def load(path):
+    with open(path, encoding="utf-8") as source:
+        return json.load(source)
+
+
+def compare(baseline, current, prefix=""):
+    """{dotted path: {"baseline", "current", "change_pct"}} for numeric values present in both result trees."""
+    changes = {}
+    for key, value in current.items():
+        if key not in baseline:
+            continue
+        path = f"{prefix}{key}"
+        old = baseline[key]
+        if isinstance(value, dict) and isinstance(old, dict):
+            changes.update(compare(old, value, path + "."))
+        elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and not isinstance(value, bool):
+            change = round(100 * (value - old) / old, 1) if old else None
+            changes[path] = {"baseline": old, "current": value, "change_pct": change}
+    return changes
+
+
+def emit(args, benchmark, config, results):
+    """Print results (and the comparison with --compare); write them to --output when given."""
+    if args.output:
+        save(args.output, benchmark, config, results)
+    report = {"benchmark": benchmark, "results": results}
+    if args.compare:
+        report["comparison"] = compare(load(args.compare)["results"], results)
+    print(json.dumps(report, indent=2))
+
+
+def add_result_arguments(parser):
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="earlier JSON result file to compare against")
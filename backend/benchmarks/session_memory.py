@@ -0,0 +1,137 @@
+"""
+Memory per stored session: plain dicts (SESSION_COMPACT=0) against SessionRecords.
+
+Builds --sessions sessions shaped like the ones the app stores after /generate-workout
+and a few /user-concerns turns: the profile, bmi and recommendation level, the three
+generated sections (rendered by FallbackPlanEngine, so the markdown varies with the
+profile), the plan state, --turns conversation turns and prefetched videos. Every session
+is decoded from its own JSON document, as request bodies are, so no strings are shared
+between sessions unless the store shares them.
+
+For each mode the sessions are saved into a MemorySessionBackend and the bytes still
+allocated afterwards are read from tracemalloc (the input dicts are freed when the store
+does not keep them). Also reported: the object-graph size walked across all sessions
+(shared objects counted once), and the cost of saving a session (JSON decode included)
+and of reading its profile and its workout plan back.
+
+Usage: python -m backend.benchmarks.session_memory [--sessions 20000] [--turns 4]
+       [--min-bytes 256] [--output memory.json] [--compare baseline.json]
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from backend.benchmarks import results
+from backend.benchmarks.load_test import CONCERNS, EXERCISES, deep_sizeof, profiles
+from backend.benchmarks.mock_upstreams import mock_video_id
+from backend.main import UserInput
+from backend.models.FallbackPlanEngine import FallbackPlanEngine
+from backend.models.RuleBasedRecommender import RuleBasedRecommender
+from backend.utils.SessionBackends import MemorySessionBackend
+
+
+def session_documents(count, turns, seed=0):
+    """JSON documents of realistic stored sessions."""
+    rng = random.Random(seed)
+    engine = FallbackPlanEngine()
+    generator = profiles(rng)
+    for _ in range(count):
+        profile = next(generator)
+        user_input = UserInput(**profile)
+        bmi = RuleBasedRecommender.calculate_bmi(user_input.weight, user_input.height)
+        level = RuleBasedRecommender.get_recommendation_level(
+            user_input.weight, user_input.height, user_input.age, user_input.hypertension, user_input.diabetes
+        )
+        sections = engine.build_sections(user_input, level, bmi)
+        now = time.time()
+        artifacts = {
+            section: {"content": content, "fingerprint": f"{rng.getrandbits(64):016x}", "source": "gpt",
+                      "generated_at": now}
+            for section, content in sections.items()
+        }
+        conversation = {"summary": "", "summarized_turns": 0, "turns": [
+            {"concern": concern, "response": f"{sections['nutrition_tips']}\n\n{sections['fitness_analysis']}"}
+            for concern in rng.sample(CONCERNS, turns)
+        ]}
+        videos = {
+            exercise.lower(): [{"video_id": mock_video_id(f"{exercise}:{i}"), "title": f"{exercise} tutorial {i}",
+                                "thumbnail_url": f"https://i.ytimg.com/vi/{mock_video_id(f'{exercise}:{i}')}/mqdefault.jpg"}
+                               for i in range(3)]
+            for exercise in rng.sample(EXERCISES, 4)
+        }
+        yield json.dumps({
+            **user_input.dict(), "bmi": bmi, "recommendation_level": level, "artifacts": artifacts,
+            "plan": {"generation_mode": "separate", "pending": False}, "conversation": conversation,
+            "exercise_videos": videos, "video_prefetch": {"quota_used": 400},
+        })
+
+
+def fill(documents, compress_min_bytes):
+    backend = MemorySessionBackend(compress_min_bytes)
+    for position, document in enumerate(documents):
+        backend.save(f"session-{position}", json.loads(document))
+    return backend
+
+
+def measure(documents, compress_min_bytes):
+    count = len(documents)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    backend = fill(documents, compress_min_bytes)
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    seen = set()
+    graph_bytes = sum(deep_sizeof(entry[0], seen) for entry in backend.sessions.values())
+    del backend
+
+    # Timings on a second fill, outside tracemalloc
+    started = time.perf_counter()
+    backend = fill(documents, compress_min_bytes)
+    save_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for session_id in backend.sessions:
+        session = backend.load(session_id)
+        session.get("fitness_goal"), session.get("experience_level"), session.get("workout_location")
+    profile_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for session_id in backend.sessions:
+        backend.load(session_id)["artifacts"]["workout_plan"]["content"]
+    plan_seconds = time.perf_counter() - started
+
+    return {
+        "allocated_bytes_per_session": round(allocated / count),
+        "object_graph_bytes_per_session": round(graph_bytes / count),
+        "save_us": round(save_seconds / count * 1e6, 2),
+        "read_profile_us": round(profile_seconds / count * 1e6, 2),
+        "read_workout_plan_us": round(plan_seconds / count * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--turns", type=int, default=4, help="conversation turns per session")
+    parser.add_argument("--min-bytes", type=int, default=256, help="SESSION_COMPRESS_MIN_BYTES for the records")
+    results.add_result_arguments(parser)
+    args = parser.parse_args()
+
+    documents = list(session_documents(args.sessions, args.turns))
+    report = {
+        "json_bytes_per_session": round(sum(len(document) for document in documents) / len(documents)),
+        "dict": measure(documents, None),
+        "record": measure(documents, args.min_bytes),
+    }
+    before, after = report["dict"]["allocated_bytes_per_session"], report["record"]["allocated_bytes_per_session"]
+    report["reduction_pct"] = round(100 * (before - after) / before, 1)
+    report["projected_mb_at_100k"] = {"dict": round(before * 100_000 / 2 ** 20), "record": round(after * 100_000 / 2 ** 20)}
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    results.emit(args, "session_memory", config, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Cold-start benchmark: import time of the API module and time to the first successful request.
+
+Import time is measured in --runs fresh interpreters (`import backend.main`, nothing
+cached in-process) and reported as median/min/max. Time to first request starts a new
+`uvicorn backend.main:app` process against the mock upstreams (mock_upstreams.py) and
+measures, from the moment the process is spawned, when the server first answers
+(GET /cache/stats) and when the first POST /generate-workout returns 200; the latency of
+that first request is reported next to a second, warm one.
+
+With --max-import-seconds / --max-first-request-seconds the script exits non-zero when
+a median exceeds its budget, so CI can fail a change that slows startup down.
+
+Usage: python -m backend.benchmarks.startup [--runs 5] [--max-import-seconds 1.5]
+       [--max-first-request-seconds 5] [--output startup.json] [--compare baseline.json]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from backend.benchmarks import results
+from backend.benchmarks.mock_upstreams import (
+    add_upstream_arguments, behaviours_from_args, free_port, start_mock_upstreams
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import backend.main; print(time.perf_counter() - started)"
+)
+PROFILE = {
+    "weight": 78, "height": 175, "gender": 1, "age": 31, "hypertension": "No", "diabetes": "No",
+    "fitness_goal": "Muscle Gain", "workout_preference": "Strength Training", "workout_location": "Gym",
+    "duration": "1 month", "experience_level": "intermediate",
+}
+
+
+def app_environment(openai_server=None, youtube_server=None):
+    """Environment for a fresh app process: memory sessions, no persisted caches or plan store."""
+    env = {**os.environ, "SESSION_BACKEND": "memory", "PYTHONPATH": REPO_ROOT}
+    for name in ("SEMANTIC_CACHE_DB", "PLAN_STORE_PATH"):
+        env.pop(name, None)
+    if openai_server is not None:
+        env.update({
+            "OPENAI_BASE_URL": f"{openai_server.url}/v1", "OPENAI_API_KEY": "mock-key",
+            "YOUTUBE_API_URL": f"{youtube_server.url}/youtube/v3", "YOUTUBE_API_KEY": "mock-key",
+        })
+    return env
+
+
+def summary(values):
+    return {"median": round(statistics.median(values), 4), "min": round(min(values), 4),
+            "max": round(max(values), 4)}
+
+
+def measure_imports(runs):
+    """Seconds to import backend.main in each of `runs` fresh interpreters."""
+    timings = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=REPO_ROOT, env=app_environment(),
+                                   capture_output=True, text=True, check=True)
+        timings.append(float(completed.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def measure_first_request(env, timeout):
+    """(ready, first request done, first request latency, warm request latency) in seconds from spawn."""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            deadline = started + timeout
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+                if time.perf_counter() > deadline:
+                    raise RuntimeError(f"app did not answer within {timeout}s")
+                try:
+                    if client.get("/cache/stats").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+            ready = time.perf_counter() - started
+
+            latencies = []
+            for _ in range(2):
+                sent = time.perf_counter()
+                response = client.post("/generate-workout", json=PROFILE)
+                if response.status_code != 200:
+                    raise RuntimeError(f"/generate-workout returned {response.status_code}: {response.text[:200]}")
+                latencies.append(time.perf_counter() - sent)
+                if len(latencies) == 1:
+                    first_done = time.perf_counter() - started
+        return ready, first_done, latencies[0], latencies[1]
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for the app to answer")
+    parser.add_argument("--max-import-seconds", type=float, help="fail when the median import time exceeds this")
+    parser.add_argument("--max-first-request-seconds", type=float,
+                        help="fail when the median time from spawn to the first 200 exceeds this")
+    add_upstream_arguments(parser)
+    # Startup is what is measured here, so the mock upstreams answer quickly by default
+    parser.set_defaults(openai_latency="fixed:0.05", youtube_latency="fixed:0.02")
+    results.add_result_arguments(parser)
+    args = parser.parse_args()
+
+    imports = measure_imports(args.runs)
+    print(f"import backend.main: median {statistics.median(imports):.3f}s", file=sys.stderr)
+
+    openai_server, youtube_server = start_mock_upstreams(*behaviours_from_args(args))
+    try:
+        env = app_environment(openai_server, youtube_server)
+        runs = [measure_first_request(env, args.timeout) for _ in range(args.runs)]
+    finally:
+        openai_server.stop()
+        youtube_server.stop()
+    ready, first_done, first_latency, warm_latency = (list(column) for column in zip(*runs))
+
+    report = {
+        "import_seconds": summary(imports),
+        "ready_seconds": summary(ready),
+        "first_request_seconds": summary(first_done),
+        "first_request_latency_seconds": summary(first_latency),
+        "warm_request_latency_seconds": summary(warm_latency),
+    }
+    budgets = (("import_seconds", args.max_import_seconds), ("first_request_seconds", args.max_first_request_seconds))
+    report["over_budget"] = [
+        f"{name} median {report[name]['median']}s > {budget}s"
+        for name, budget in budgets if budget is not None and report[name]["median"] > budget
+    ]
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    results.emit(args, "startup", config, report)
+    if report["over_budget"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
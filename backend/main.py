@@ -1,16 +1,33 @@
-from fastapi import FastAPI, HTTPException, Header, Path
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Header, Path, Request
+from fastapi.responses import StreamingResponse, Response
+from pydantic import BaseModel, ValidationError
 from typing import List, Optional
 
 import os
 import asyncio
+import csv
+import io
+import json
+import logging
+import time
 
 import uuid  # Generate unique session IDs
+from contextlib import asynccontextmanager
 from backend.models.RuleBasedRecommender import RuleBasedRecommender
+from backend.models.FallbackPlanEngine import FallbackPlanEngine
 from backend.nlp.GPTWorkoutGenerator import GPTWorkoutGenerator
+from backend.nlp.ConversationMemory import ConversationMemory
+from backend.nlp.GPTScheduler import PRIORITY_BACKGROUND, PRIORITY_BULK, PRIORITY_INTERACTIVE
 from backend.utils.SessionManager import SessionManager
+from backend.utils.JobManager import JobManager
+from backend.utils.SemanticCache import SemanticCache
+from backend.utils.SessionArtifacts import SECTIONS, SessionArtifacts
+from backend.utils.PlanStore import PlanStore
+from backend.utils.Metrics import REGISTRY, MetricsMiddleware
+from backend.utils.Tracing import Tracing, TracingMiddleware
 from backend.nlp.PromptTemplates import PromptTemplates
 from backend.models.youtube_search import YouTubeSearch
+from backend.models.VideoPrefetcher import VideoPrefetcher, exercise_key, session_relevance_keywords
 
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -19,10 +36,52 @@ from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 load_dotenv()
 
-print("API Key:", os.getenv("OPENAI_API_KEY")) 
+logger = logging.getLogger(__name__)
+Tracing.configure()
+
+# Initialize required classes
+workout_generator = GPTWorkoutGenerator()
+session_manager = SessionManager()
+conversation_memory = ConversationMemory(workout_generator, session_manager)
+semantic_cache = SemanticCache()
+background_tasks = set()  # strong references to fire-and-forget tasks
+fallback_engine = FallbackPlanEngine()
+session_artifacts = SessionArtifacts(session_manager)
+plan_store = PlanStore(routes=workout_generator.router.routes)  # sections precomputed offline (python -m backend.precompute)
+
+async def warm_up():
+    """
+    First-use work done off the event loop once the server is accepting requests, rather
+    than at import time: the OpenAI client and token encoding (needed by nearly every
+    request) first, then the semantic cache index, whose scikit-learn import would
+    otherwise compete with the first requests for the interpreter.
+    """
+    started = time.perf_counter()
+    for step in (workout_generator.warm_up, semantic_cache.warm_up):
+        try:
+            await asyncio.to_thread(step)
+        except Exception as e:
+            logger.error("Warm-up step %s failed: %s", step.__qualname__, e)
+    logger.info("Warm-up finished in %.2fs", time.perf_counter() - started)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    session_manager.start_sweeper()
+    start_background_task(warm_up())
+    yield
+    # Close pooled upstream connections on shutdown
+    await session_manager.stop_sweeper()
+    await job_manager.cancel_all()
+    await conversation_memory.cancel_all()
+    for task in list(background_tasks):
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await workout_generator.aclose()
+    await YouTubeSearch.aclose()
+    Tracing.shutdown()
 
 # Initialize FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,10 +90,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# Initialize required classes
-workout_generator = GPTWorkoutGenerator()
-session_manager = SessionManager()
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 
 # User input model (Now includes workout_location)
 class UserInput(BaseModel):
@@ -50,25 +107,37 @@ class UserInput(BaseModel):
     duration: str  # 1 week, 2 weeks, 1 month, etc.
     experience_level: str  # Beginner, Intermediate, Expert (User-defined)
     
+# Partial profile for PATCH /session/{session_id}: only the fields being changed
+class ProfileUpdate(BaseModel):
+    weight: Optional[float] = None
+    height: Optional[float] = None
+    gender: Optional[int] = None
+    age: Optional[int] = None
+    hypertension: Optional[str] = None
+    diabetes: Optional[str] = None
+    fitness_goal: Optional[str] = None
+    workout_preference: Optional[str] = None
+    workout_location: Optional[str] = None
+    duration: Optional[str] = None
+    experience_level: Optional[str] = None
+
 # Define request model for user concerns
 class UserConcernRequest(BaseModel):
     concern: str
 
-@app.post("/generate-workout")
-async def generate_workout(user_input: UserInput, session_id: str = Header(default=None)):
-    """Process user input, use rule-based logic, and generate a GPT-based workout plan asynchronously."""
-
-    try:
-        print("Received user input:", user_input.dict())
-
-        # Generate new session ID if not provided
-        if not session_id:
-            session_id = str(uuid.uuid4())
-            print(f"New session created: {session_id}")
+def is_cache_bypassed(cache_bypass_header):
+    """A `cache-bypass: 1|true|yes` request header skips the GPT response cache."""
+    return bool(cache_bypass_header) and cache_bypass_header.strip().lower() in ("1", "true", "yes")
 
+def build_workout_prompts(user_input: UserInput):
+    """
+    Run the rule-based evaluation and build the GPT prompts.
+    Returns (bmi, recommendation_level, user_data, prompts) where prompts maps
+    each response section to its prompt.
+    """
+    with Tracing.span("rule_eval"):
         # Calculate BMI dynamically inside RuleBasedRecommender
         bmi = RuleBasedRecommender.calculate_bmi(user_input.weight, user_input.height)
-        print("Calculated BMI:", bmi)
 
         # Get recommendation level using the rule-based system
         recommendation_level = RuleBasedRecommender.get_recommendation_level(
@@ -76,76 +145,560 @@ async def generate_workout(user_input: UserInput, session_id: str = Header(defau
             user_input.hypertension, user_input.diabetes
         )
 
-        print("Rule-Based Recommendation Level:", recommendation_level)
+    # User data for the session (now includes calculated BMI and workout location)
+    user_data = user_input.dict()
+    user_data["bmi"] = bmi
+    user_data["recommendation_level"] = recommendation_level
 
-        # Store user data in session (now includes calculated BMI and workout location)
-        user_data = user_input.dict()
-        user_data["bmi"] = bmi  # Store calculated BMI in session
-        user_data["recommendation_level"] = recommendation_level
-        session_manager.create_session(session_id, user_data)
+    # **Generate GPT-based prompts**
+    with Tracing.span("prompt_build"):
+        prompts = {
+            section: PromptTemplates.section_prompt(section, user_input, recommendation_level, bmi)
+            for section in SECTIONS
+        }
+    return bmi, recommendation_level, user_data, prompts
 
-        # **Generate GPT-based prompts**
-        fitness_analysis_prompt = PromptTemplates.user_fitness_analysis(user_input, recommendation_level, bmi)
-        workout_prompt = PromptTemplates.workout_plan_prompt(user_input)
-        nutrition_prompt = PromptTemplates.nutrition_tips_prompt(user_data, bmi)
+# Profile fields each rule-based derived value is computed from
+DERIVED_INPUTS = {
+    "bmi": ("weight", "height"),
+    "recommendation_level": ("weight", "height", "age", "hypertension", "diabetes"),
+}
+
+GENERATION_MODES = ("separate", "combined")
+DEFAULT_GENERATION_MODE = os.getenv("GENERATION_MODE", "separate")
 
-        # **Send prompts to GPT asynchronously**
-        fitness_analysis, workout_plan, nutrition_tips = await asyncio.gather(
-            workout_generator.generate_response_async(fitness_analysis_prompt),
-            workout_generator.generate_response_async(workout_prompt),
-            workout_generator.generate_response_async(nutrition_prompt)
+async def generate_sections(user_input: UserInput, bmi, recommendation_level, prompts, mode=None,
+                            use_cache=True, priority=PRIORITY_INTERACTIVE, endpoint="/generate-workout",
+                            deadline=None):
+    """
+    Generate fitness_analysis, workout_plan and nutrition_tips.
+    "combined" mode asks for all three in one JSON reply and falls back to the
+    three separate calls when that reply does not validate; when only some sections
+    are requested they are always generated separately.
+    Sections not generated by `deadline` (see request_deadline) come back as error strings.
+    Returns (sections, mode actually used).
+    """
+    if (mode or DEFAULT_GENERATION_MODE) == "combined" and set(prompts) == set(SECTIONS):
+        combined = await workout_generator.generate_combined_async(
+            PromptTemplates.combined_plan_prompt(user_input, recommendation_level, bmi),
+            use_cache=use_cache, priority=priority, endpoint=endpoint, deadline=deadline, duration=user_input.duration
+        )
+        if combined is not None:
+            return combined.dict(), "combined"
+        logger.warning("Combined generation could not be parsed; falling back to separate calls")
+
+    sections = await asyncio.gather(
+        *(workout_generator.generate_response_async(prompt, use_cache=use_cache, priority=priority,
+                                                    template=PromptTemplates.SECTION_TEMPLATES[section],
+                                                    endpoint=endpoint, deadline=deadline, duration=user_input.duration)
+          for section, prompt in prompts.items())
+    )
+    return dict(zip(prompts, sections)), "separate"
+
+# **Latency budgets (seconds; 0 disables): past the budget a local answer is returned instead of waiting on GPT**
+LATENCY_BUDGETS = {
+    "/generate-workout": float(os.getenv("GENERATE_WORKOUT_BUDGET_SECONDS", "20")),
+    "/user-concerns": float(os.getenv("USER_CONCERNS_BUDGET_SECONDS", "15")),
+}
+
+# **Deadlines (seconds; 0 disables): GPT calls still queued or running this long after the request
+# arrived are cancelled. At least the latency budget, so an upgrade after a local answer can still land**
+GPT_DEADLINES = {
+    "/generate-workout": float(os.getenv("GENERATE_WORKOUT_DEADLINE_SECONDS", "60")),
+    "/user-concerns": float(os.getenv("USER_CONCERNS_DEADLINE_SECONDS", "45")),
+    "/generate-nutrition": float(os.getenv("GENERATE_NUTRITION_DEADLINE_SECONDS", "45")),
+    "/session": float(os.getenv("SESSION_UPDATE_DEADLINE_SECONDS", "60")),
+}
+
+# Answers that missed the /user-concerns budget, kept on the session for the client to fetch
+PENDING_CONCERNS_KEPT = 8
+
+def request_deadline(endpoint):
+    """time.monotonic() value by which the endpoint's GPT calls must finish (None: no deadline)."""
+    seconds = GPT_DEADLINES.get(endpoint)
+    return time.monotonic() + seconds if seconds else None
+
+async def within_budget(endpoint, task):
+    """Wait for task up to the endpoint's latency budget; returns True if it finished in time."""
+    budget = LATENCY_BUDGETS.get(endpoint) or None
+    done, _ = await asyncio.wait({task}, timeout=budget)
+    return task in done
+
+async def upgrade_plan_later(session_id, generation, fingerprints):
+    """Store the GPT sections in the session once they arrive, replacing the local ones the client was given."""
+    try:
+        sections, generation_mode = await generation
+    except Exception as e:
+        logger.error("Upgrading local plan failed: %s", e)
+        return
+    if any(workout_generator.is_error(section) for section in sections.values()):
+        return
+    session_data = await session_manager.get_session_async(session_id)
+    if session_data:
+        plan = {"generation_mode": generation_mode, "pending": False}
+        await session_manager.create_session_async(
+            session_id, {**SessionArtifacts.merged(session_data, sections, fingerprints), "plan": plan}
+        )
+        session_artifacts.stats["stored"] += len(sections)
+        if "workout_plan" in sections:
+            video_prefetcher.schedule(session_id, sections["workout_plan"], start_background_task)
+
+async def prepare_workout_session(user_input: UserInput, session_id: Optional[str], use_cache=True):
+    """
+    Build the prompts for a user and store their session.
+    Sections already generated for the session from the same prompts are kept and reused;
+    the others are looked up in the precomputed PlanStore and stored on the session.
+    Returns (session_id, bmi, recommendation_level, prompts, fingerprints, stored sections,
+    names of the stored sections that came from the PlanStore).
+    """
+    # Generate new session ID if not provided
+    if not session_id:
+        session_id = str(uuid.uuid4())
+
+    bmi, recommendation_level, user_data, prompts = build_workout_prompts(user_input)
+    fingerprints = SessionArtifacts.section_fingerprints(prompts)
+
+    # Keep the artifacts of an earlier submission, and the video prefetch quota the session has spent
+    previous = await session_manager.get_session_async(session_id) or {}
+    for key in ("artifacts", "video_prefetch"):
+        if previous.get(key):
+            user_data[key] = previous[key]
+    stored = session_artifacts.fresh_sections(user_data, fingerprints) if use_cache else {}
+    precomputed = plan_store.lookup_sections(
+        {section: fingerprint for section, fingerprint in fingerprints.items() if section not in stored}
+    ) if use_cache else {}
+    if precomputed:
+        user_data = SessionArtifacts.merged(user_data, precomputed, fingerprints, source="precomputed")
+        stored.update(precomputed)
+    await session_manager.create_session_async(session_id, user_data)
+    return session_id, bmi, recommendation_level, prompts, fingerprints, stored, list(precomputed)
+
+@app.post("/generate-workout")
+async def generate_workout(
+    user_input: UserInput,
+    session_id: str = Header(default=None),
+    cache_bypass: Optional[str] = Header(default=None),
+    mode: Optional[str] = None,
+    upgrade: bool = True
+):
+    """
+    Process user input, use rule-based logic, and generate a GPT-based workout plan asynchronously.
+    `mode` selects "separate" (three GPT calls) or "combined" (one structured call); defaults to GENERATION_MODE.
+
+    If GPT misses the endpoint's latency budget (or fails), the local FallbackPlanEngine plan is
+    returned with plan_source "local". With `upgrade` (default) GPT keeps running until the
+    request's deadline and its plan replaces the local one in the session
+    (GET /session/{session_id}/plan) when it arrives; without it the GPT calls are cancelled.
+
+    Sections already generated for this session from the same inputs (see SessionArtifacts)
+    are reused without a GPT call and listed in reused_sections; sections found in the
+    precomputed PlanStore are served without a GPT call and listed in precomputed_sections.
+    """
+    if mode is not None and mode not in GENERATION_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(GENERATION_MODES)}")
+
+    try:
+        deadline = request_deadline("/generate-workout")
+        use_cache = not is_cache_bypassed(cache_bypass)
+        session_id, bmi, recommendation_level, prompts, fingerprints, stored, precomputed = await prepare_workout_session(
+            user_input, session_id, use_cache
         )
+        stale = {section: prompt for section, prompt in prompts.items() if section not in stored}
+
+        # **Send the prompts of missing or stale sections to GPT asynchronously (cached unless the client bypasses it)**
+        sections, generation_mode = dict(stored), "session"
+        local_sections = []
+        upgrade_pending = False
+        if stale:
+            generation = asyncio.ensure_future(generate_sections(
+                user_input, bmi, recommendation_level, stale, mode, use_cache=use_cache, deadline=deadline
+            ))
+            local = None
+            if await within_budget("/generate-workout", generation):
+                generated, generation_mode = generation.result()
+                # Sections GPT failed on are filled in locally
+                local_sections = [name for name, section in generated.items() if workout_generator.is_error(section)]
+                if local_sections:
+                    local = fallback_engine.build_sections(user_input, recommendation_level, bmi)
+                    generated = {**generated, **{name: local[name] for name in local_sections}}
+            else:
+                local = fallback_engine.build_sections(user_input, recommendation_level, bmi)
+                generated, generation_mode = {name: local[name] for name in stale}, "local"
+                local_sections = list(stale)
+                if upgrade:
+                    upgrade_pending = True
+                    start_background_task(upgrade_plan_later(session_id, generation, fingerprints))
+                else:
+                    generation.cancel()
+            sections.update(generated)
+
+            # **Keep the new sections on the session for reuse by later requests**
+            session_data = await session_manager.get_session_async(session_id)
+            session_data = SessionArtifacts.merged(
+                session_data, {name: generated[name] for name in generated if name not in local_sections}, fingerprints
+            )
+            session_data = SessionArtifacts.merged(
+                session_data, {name: generated[name] for name in local_sections}, fingerprints, source="local"
+            )
+            plan = {"generation_mode": generation_mode, "pending": upgrade_pending}
+            await session_manager.create_session_async(session_id, {**session_data, "plan": plan})
+            session_artifacts.stats["stored"] += len(generated)
+
+        # **Warm the exercise video caches while the user reads the plan**
+        video_prefetcher.schedule(session_id, sections["workout_plan"], start_background_task)
 
         # **Return structured JSON response**
         return {
             "session_id": session_id,
             "bmi": bmi,
             "recommendation_level": recommendation_level,
-            "fitness_analysis": fitness_analysis,
-            "workout_plan": workout_plan,
-            "nutrition_tips": nutrition_tips
+            "fitness_analysis": sections["fitness_analysis"],
+            "workout_plan": sections["workout_plan"],
+            "nutrition_tips": sections["nutrition_tips"],
+            "generation_mode": generation_mode,
+            "plan_source": "gpt" if not local_sections else "local" if len(local_sections) == len(sections) else "mixed",
+            "local_sections": local_sections,
+            "reused_sections": [section for section in stored if section not in precomputed],
+            "precomputed_sections": precomputed,
+            "upgrade_pending": upgrade_pending
         }
 
     except Exception as e:
-        print("ERROR in /generate-workout:", str(e))
+        logger.exception("/generate-workout failed")
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 
-@app.post("/generate-nutrition")
-async def generate_nutrition(session_id: str = Header(..., alias="session_id")):
-    """Generate nutrition tips based on stored session data."""
-    
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/generate-workout/stream")
+async def generate_workout_stream(
+    user_input: UserInput,
+    session_id: str = Header(default=None),
+    cache_bypass: Optional[str] = Header(default=None)
+):
+    """
+    Streaming variant of /generate-workout using Server-Sent Events.
+
+    Emits a `meta` event with the session ID, BMI and recommendation level straight away,
+    then interleaved `delta` events ({"section", "delta"}) for fitness_analysis, workout_plan
+    and nutrition_tips as each upstream stream produces them, a `section_done` event per
+    section ({"section", "source": "gpt" | "local"}) and a final `done` event. Sections already
+    stored on the session for the same inputs, or precomputed in the PlanStore, are sent as a
+    single delta; completed sections are stored for later reuse.
+
+    As in /generate-workout, a section whose stream sends nothing within the latency budget,
+    or fails, is replaced by the FallbackPlanEngine section: a `section_reset` event tells the
+    client to drop any text already received for it, the local section follows as one delta
+    and `section_done` carries "source": "local". Local sections are not stored for reuse.
+    """
+    deadline = request_deadline("/generate-workout")
+    budget = LATENCY_BUDGETS.get("/generate-workout") or None
+    budget_end = time.monotonic() + budget if budget else None
+    use_cache = not is_cache_bypassed(cache_bypass)
     try:
-        if not session_id:
-            raise HTTPException(status_code=400, detail="Session ID is required")
+        session_id, bmi, recommendation_level, prompts, fingerprints, stored, _ = await prepare_workout_session(
+            user_input, session_id, use_cache
+        )
+    except Exception as e:
+        logger.exception("/generate-workout/stream failed")
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+    async def event_stream():
+        yield sse_event("meta", {
+            "session_id": session_id,
+            "bmi": bmi,
+            "recommendation_level": recommendation_level
+        })
+
+        # Fan the three upstream streams into one queue so deltas interleave
+        queue = asyncio.Queue()
+
+        async def pump(section, prompt):
+            """Forward a section's deltas; error deltas are not forwarded but mark the section failed."""
+            failed, received = False, False
+            upstream = workout_generator.stream_response_async(
+                prompt, use_cache=use_cache, template=PromptTemplates.SECTION_TEMPLATES[section],
+                endpoint="/generate-workout/stream", deadline=deadline, duration=user_input.duration
+            )
+            try:
+                while True:
+                    try:
+                        if received or budget_end is None:
+                            delta = await anext(upstream)
+                        else:
+                            # Nothing yet: wait for the first delta only until the latency budget runs out
+                            delta = await asyncio.wait_for(anext(upstream), max(0.0, budget_end - time.monotonic()))
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        failed = True
+                        break
+                    if workout_generator.is_error(delta):
+                        failed = True
+                        break
+                    received = True
+                    await queue.put(("delta", {"section": section, "delta": delta}))
+            except Exception as e:
+                logger.error("Streaming %s failed: %s", section, e)
+                failed = True
+            finally:
+                await upstream.aclose()
+                await queue.put(("section_done", {"section": section, "failed": failed or not received}))
+
+        for section, content in stored.items():
+            yield sse_event("delta", {"section": section, "delta": content})
+            yield sse_event("section_done", {"section": section, "source": "gpt"})
+
+        tasks = [
+            asyncio.create_task(pump(section, prompt)) for section, prompt in prompts.items() if section not in stored
+        ]
+        if "workout_plan" in stored:
+            video_prefetcher.schedule(session_id, stored["workout_plan"], start_background_task)
+        chunks = {section: [] for section in prompts}
+        completed = {}
+        local = None
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event, data = await queue.get()
+                if event == "delta":
+                    chunks[data["section"]].append(data["delta"])
+                    yield sse_event(event, data)
+                    continue
+                remaining -= 1
+                section = data["section"]
+                if data["failed"]:
+                    # Missed the budget or failed: replace whatever arrived with the local section
+                    if local is None:
+                        local = fallback_engine.build_sections(user_input, recommendation_level, bmi)
+                    if chunks[section]:
+                        yield sse_event("section_reset", {"section": section})
+                    yield sse_event("delta", {"section": section, "delta": local[section]})
+                    yield sse_event("section_done", {"section": section, "source": "local"})
+                    continue
+                text = "".join(chunks[section])
+                completed[section] = text
+                if section == "workout_plan":
+                    # Warm the exercise video caches while the other sections finish
+                    video_prefetcher.schedule(session_id, text, start_background_task)
+                yield sse_event("section_done", {"section": section, "source": "gpt"})
+            yield sse_event("done", {"session_id": session_id})
+        finally:
+            # Client disconnected or stream finished: stop any upstream work still running. The store runs
+            # as its own task, since awaiting here is cancelled along with the response on a disconnect.
+            for task in tasks:
+                task.cancel()
+            start_background_task(session_artifacts.store(session_id, completed, fingerprints))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+COHORT_COLUMNS = ("weight", "height", "age", "hypertension", "diabetes")
+
+def parse_cohort_columns(body: bytes, content_type: str):
+    """
+    Parse a cohort upload into column lists.
+    Accepts a JSON object of equal-length arrays or a CSV file with a header row.
+    """
+    if content_type.startswith("text/csv"):
+        reader = csv.reader(io.StringIO(body.decode("utf-8-sig")))
+        header = [name.strip() for name in next(reader, [])]
+        rows = [row for row in reader if row]
+        columns = {name: list(values) for name, values in zip(header, zip(*rows))} if rows else {name: [] for name in header}
+    else:
+        columns = json.loads(body)
+        if not isinstance(columns, dict):
+            raise ValueError("Expected a JSON object of column arrays.")
+
+    missing = [name for name in COHORT_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    if len({len(columns[name]) for name in COHORT_COLUMNS}) != 1:
+        raise ValueError("All columns must have the same length.")
+    return columns
+
+@app.post("/recommendation-levels/batch")
+async def recommendation_levels_batch(request: Request):
+    """
+    Score a whole roster at once with the vectorized rule-based recommender.
+
+    Body: JSON {"weight": [...], "height": [...], "age": [...], "hypertension": [...], "diabetes": [...]}
+    or a CSV upload (Content-Type: text/csv) with those columns.
+    Returns BMI and recommendation-level arrays in input order.
+    """
+    try:
+        columns = parse_cohort_columns(await request.body(), request.headers.get("content-type", ""))
+        hypertension = [str(value).strip() for value in columns["hypertension"]]
+        diabetes = [str(value).strip() for value in columns["diabetes"]]
+        bmi, levels = RuleBasedRecommender.get_recommendation_levels_batch(
+            columns["weight"], columns["height"], columns["age"], hypertension, diabetes
+        )
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cohort data: {str(e)}")
+
+    # Serialize directly: FastAPI's encoder is far slower on million-element lists
+    return Response(
+        content=json.dumps({
+            "count": int(levels.size),
+            "bmi": bmi.tolist(),
+            "recommendation_level": levels.tolist()
+        }),
+        media_type="application/json"
+    )
+
+
+async def generate_plan_for_row(row):
+    """Bulk pipeline for one input row: same rules, prompts and generator as /generate-workout."""
+    user_input = UserInput(**row)
+    bmi, recommendation_level, _, prompts = build_workout_prompts(user_input)
+    sections, _ = await generate_sections(user_input, bmi, recommendation_level, prompts, priority=PRIORITY_BULK,
+                                          endpoint="/jobs/generate-workout")
+    for section in sections.values():
+        if workout_generator.is_error(section):
+            raise RuntimeError(section)
+    return {
+        "input": row,
+        "bmi": bmi,
+        "recommendation_level": recommendation_level,
+        **sections
+    }
+
+job_manager = JobManager(generate_plan_for_row)
+
+@app.post("/jobs/generate-workout")
+async def create_generate_workout_job(request: Request, concurrency: Optional[int] = None, stream: bool = False):
+    """
+    Start a bulk plan-generation job from a CSV (Content-Type: text/csv) or NDJSON body of
+    UserInput rows, with at most `concurrency` rows in flight.
+
+    Returns the job status, or with `stream=true` the NDJSON results as each row finishes
+    (the job ID is sent in the X-Job-Id header). `concurrency` is capped at JOBS_MAX_CONCURRENCY.
+    """
+    if concurrency is not None and concurrency < 1:
+        raise HTTPException(status_code=400, detail="concurrency must be at least 1.")
+    try:
+        status = await job_manager.create_job(
+            request.stream(), request.headers.get("content-type", ""), concurrency
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid job input: {str(e)}")
+
+    if stream:
+        return StreamingResponse(
+            job_manager.stream_results(status["job_id"]),
+            media_type="application/x-ndjson",
+            headers={"X-Job-Id": status["job_id"]}
+        )
+    return status
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Job state and progress (total, completed, failed)."""
+    status = await job_manager.get_status(job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return status
 
-        # Retrieve session data
-        user_data = session_manager.get_session(session_id)
-        if not user_data:
-            raise HTTPException(status_code=404, detail="Session not found.")
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str):
+    """Stream the job's NDJSON results, following the file while the job is still running."""
+    if not await job_manager.get_status(job_id):
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return StreamingResponse(job_manager.stream_results(job_id), media_type="application/x-ndjson")
 
-        # Generate GPT-based nutrition tips
-        nutrition_prompt = PromptTemplates.nutrition_tips_prompt(user_data)
-        nutrition_tips = workout_generator.generate_response(nutrition_prompt)
+@app.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: str, concurrency: Optional[int] = None):
+    """
+    Resume an interrupted job from its checkpoint; rows that already succeeded are skipped.
+    `concurrency` is capped at JOBS_MAX_CONCURRENCY.
+    """
+    if concurrency is not None and concurrency < 1:
+        raise HTTPException(status_code=400, detail="concurrency must be at least 1.")
+    status = await job_manager.resume_job(job_id, concurrency)
+    if not status:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return status
+
+
+@app.post("/generate-nutrition")
+async def generate_nutrition(
+    session_id: str = Header(..., alias="session_id"),
+    cache_bypass: Optional[str] = Header(default=None)
+):
+    """
+    Generate nutrition tips based on stored session data.
+    Tips already generated for the session from the same inputs (e.g. by /generate-workout)
+    are returned without a GPT call (response_source "session"), as are tips found in the
+    precomputed PlanStore (response_source "precomputed").
+    """
+    if not session_id:
+        raise HTTPException(status_code=400, detail="Session ID is required")
+
+    # Retrieve session data
+    user_data = await session_manager.get_session_async(session_id)
+    if not user_data:
+        raise HTTPException(status_code=404, detail="Session not found.")
+
+    try:
+        bmi = user_data.get("bmi") or RuleBasedRecommender.calculate_bmi(user_data["weight"], user_data["height"])
+        nutrition_prompt = PromptTemplates.nutrition_tips_prompt(user_data, bmi)
+        fingerprint = SessionArtifacts.fingerprint(PromptTemplates.SECTION_TEMPLATES["nutrition_tips"], nutrition_prompt)
+        use_cache = not is_cache_bypassed(cache_bypass)
+
+        nutrition_tips = session_artifacts.lookup(user_data, "nutrition_tips", fingerprint) if use_cache else None
+        response_source = "session"
+        if nutrition_tips is None and use_cache:
+            nutrition_tips = plan_store.lookup(fingerprint)
+            response_source = "precomputed"
+            if nutrition_tips is not None:
+                await session_artifacts.store(
+                    session_id, {"nutrition_tips": nutrition_tips}, {"nutrition_tips": fingerprint}, source="precomputed"
+                )
+        if nutrition_tips is None:
+            # Generate GPT-based nutrition tips without blocking the event loop
+            nutrition_tips = await workout_generator.generate_response_async(
+                nutrition_prompt, use_cache=use_cache,
+                template=PromptTemplates.SECTION_TEMPLATES["nutrition_tips"], endpoint="/generate-nutrition",
+                deadline=request_deadline("/generate-nutrition")
+            )
+            response_source = "gpt"
+            if workout_generator.is_error(nutrition_tips):
+                nutrition_tips = fallback_engine.nutrition_tips(UserInput(**user_data), bmi)
+                response_source = "local"
+            else:
+                await session_artifacts.store(
+                    session_id, {"nutrition_tips": nutrition_tips}, {"nutrition_tips": fingerprint}
+                )
 
         return {
             "session_id": session_id,
-            "nutrition_tips": nutrition_tips
+            "nutrition_tips": nutrition_tips,
+            "response_source": response_source
         }
 
     except Exception as e:
-        print("ERROR in /generate-nutrition:", str(e))
+        logger.exception("/generate-nutrition failed")
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 @app.post("/user-concerns/{session_id}")
-async def user_concerns(session_id: str = Path(...), concern_request: UserConcernRequest = None):
+async def user_concerns(
+    session_id: str = Path(...),
+    concern_request: UserConcernRequest = None,
+    cache_bypass: Optional[str] = Header(default=None)
+):
     """
     Handles user concerns and generates a structured GPT response,
     referencing past user details if available.
     """
 
     # Retrieve user session data
-    session_data = session_manager.get_session(session_id)
+    session_data = await session_manager.get_session_async(session_id)
     if not session_data:
         raise HTTPException(status_code=404, detail="Session not found.")
 
@@ -153,56 +706,355 @@ async def user_concerns(session_id: str = Path(...), concern_request: UserConcer
     if not concern_request or not concern_request.concern:
         raise HTTPException(status_code=400, detail="User concern is required.")
 
-    # Fetch user's previous details for GPT reference
-    user_profile_summary = f"""
-    **User Profile (For Context):**
-    - **Fitness Goal:** {session_data.get("fitness_goal", "Not provided")}
-    - **Experience Level:** {session_data.get("experience_level", "Not provided")}
-    - **Workout Preference:** {session_data.get("workout_preference", "Not provided")}
-    - **Workout Location:** {session_data.get("workout_location", "Not provided")}
-    - **Medical Conditions:** Hypertension: {session_data.get("hypertension", "No")}, Diabetes: {session_data.get("diabetes", "No")}
-    """
+    deadline = request_deadline("/user-concerns")
+    use_cache = not is_cache_bypassed(cache_bypass)
+    semantic_hit = None
+    if not use_cache:
+        semantic_cache.record_bypass()
+    else:
+        # Paraphrases of questions already answered for the same profile are served locally
+        semantic_hit = await semantic_cache.lookup_async(concern_request.concern, session_data)
 
-    # Generate GPT prompt for user concern
-    concern_prompt = PromptTemplates.custom_user_concerns(concern_request.concern)
+    response_source = "gpt"
+    if semantic_hit is not None:
+        gpt_response = semantic_hit["response"]
+        response_source = "semantic_cache"
+        if semantic_cache.should_verify():
+            start_background_task(verify_semantic_hit(concern_request.concern, session_data, semantic_hit))
+    else:
+        # Combine the user's previous details and earlier conversation (for GPT reference) with the concern prompt
+        final_prompt, has_history = conversation_memory.build_prompt(session_data, concern_request.concern)
 
-    # Combine user context with concern prompt
-    final_prompt = f"""
-    {user_profile_summary}
+        async def answer():
+            # Send prompt to GPT asynchronously for response generation
+            response = await workout_generator.generate_response_async(
+                final_prompt, use_cache=use_cache,
+                template="user_concern_prompt", endpoint="/user-concerns", deadline=deadline,
+                variant="followup" if has_history else None
+            )
+            # Only answers to prompts without conversation history (no summary, no turns) are reusable for other users
+            if not has_history and not workout_generator.is_error(response):
+                await semantic_cache.add_async(concern_request.concern, session_data, response)
+            return response
 
-    {concern_prompt}
-    """
+        generation = asyncio.ensure_future(answer())
+        if await within_budget("/user-concerns", generation):
+            gpt_response = generation.result()
+        else:
+            # Past the budget: known concern categories get the built-in guidance, anything else no answer
+            # yet. Either way the GPT answer is stored for GET /user-concerns/{session_id}/{concern_id}.
+            concern_id = uuid.uuid4().hex
+            await update_pending_concern(session_id, concern_id, {
+                "concern": concern_request.concern, "status": "pending", "response": None
+            })
+            start_background_task(answer_concern_later(session_id, concern_id, concern_request.concern, generation))
+            gpt_response = PromptTemplates.concern_guidance(concern_request.concern, default=None)
+            response_source = "local" if gpt_response is not None else "pending"
+            return {
+                "session_id": session_id,
+                "user_concern": concern_request.concern,
+                "response": gpt_response,
+                "response_source": response_source,
+                "pending": True,
+                "concern_id": concern_id
+            }
 
-    # Send prompt to GPT asynchronously for response generation
-    gpt_response = await workout_generator.generate_response_async(final_prompt)
+    # Remember the exchange; older turns are summarized in the background
+    if not workout_generator.is_error(gpt_response):
+        await conversation_memory.record_turn(session_id, session_data, concern_request.concern, gpt_response)
 
     return {
         "session_id": session_id,
         "user_concern": concern_request.concern,
-        "response": gpt_response
+        "response": gpt_response,
+        "response_source": response_source,
+        "pending": False
+    }
+
+async def update_pending_concern(session_id, concern_id, entry):
+    """Store an entry under the session's "pending_concerns", keeping the most recent PENDING_CONCERNS_KEPT."""
+    session_data = await session_manager.get_session_async(session_id)
+    if not session_data:
+        return
+    pending = {**session_data.get("pending_concerns", {}), concern_id: entry}
+    pending = dict(list(pending.items())[-PENDING_CONCERNS_KEPT:])
+    await session_manager.create_session_async(session_id, {**session_data, "pending_concerns": pending})
+
+async def answer_concern_later(session_id, concern_id, concern, generation):
+    """Store the GPT answer to a concern that missed the latency budget, and remember the exchange."""
+    try:
+        response = await generation
+    except Exception as e:
+        logger.error("Answering concern later failed: %s", e)
+        response = None
+    if response is None or workout_generator.is_error(response):
+        await update_pending_concern(session_id, concern_id, {"concern": concern, "status": "failed", "response": None})
+        return
+    await update_pending_concern(session_id, concern_id, {"concern": concern, "status": "ready", "response": response})
+    session_data = await session_manager.get_session_async(session_id)
+    if session_data:
+        await conversation_memory.record_turn(session_id, session_data, concern, response)
+
+@app.get("/user-concerns/{session_id}/{concern_id}")
+async def get_concern_answer(session_id: str, concern_id: str):
+    """
+    Answer to a /user-concerns request that missed the latency budget ("pending": true and a
+    "concern_id" in its response). "status" is "pending" until GPT answers, then "ready" with
+    the response, or "failed".
+    """
+    session_data = await session_manager.get_session_async(session_id)
+    if not session_data:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    entry = (session_data.get("pending_concerns") or {}).get(concern_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Concern not found.")
+    return {
+        "session_id": session_id,
+        "concern_id": concern_id,
+        "user_concern": entry["concern"],
+        "status": entry["status"],
+        "response": entry["response"],
+        "response_source": "gpt" if entry["status"] == "ready" else None
+    }
+
+def start_background_task(coroutine):
+    task = asyncio.create_task(coroutine)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def verify_semantic_hit(concern, session_data, hit):
+    """Re-answer a sampled semantic-cache hit at background priority and audit the served answer against it."""
+    fresh = await workout_generator.generate_response_async(
+        PromptTemplates.user_concern_prompt(session_data, concern), use_cache=False,
+        priority=PRIORITY_BACKGROUND, template="user_concern_prompt", endpoint="/user-concerns"
+    )
+    if not workout_generator.is_error(fresh):
+        await semantic_cache.record_verification_async(concern, session_data, hit, fresh)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Counters for the GPT response cache, single-flight deduplication, GPT scheduler, token usage, conversation summaries, semantic cache, video prefetch, session artifacts, plan store, YouTube caches and YouTube quota."""
+    return {
+        **workout_generator.get_stats(),
+        "conversation_memory": conversation_memory.get_stats(),
+        "semantic_cache": semantic_cache.get_stats(),
+        "video_prefetch": video_prefetcher.get_stats(),
+        "session_artifacts": session_artifacts.get_stats(),
+        "plan_store": plan_store.get_stats(),
+        "youtube_search": YouTubeSearch.search_cache.get_stats(),
+        "youtube_details": YouTubeSearch.details_cache.get_stats(),
+        "youtube_quota": YouTubeSearch.quota.get_stats(),
+    }
+
+def cache_hit_ratios():
+    return {
+        ("response",): workout_generator.cache.get_stats()["hit_ratio"],
+        ("semantic",): semantic_cache.get_stats()["hit_ratio"],
+        ("session_artifacts",): session_artifacts.get_stats()["hit_ratio"],
+        ("plan_store",): plan_store.get_stats()["hit_ratio"],
+        ("youtube_search",): YouTubeSearch.search_cache.get_stats()["hit_ratio"],
+        ("youtube_details",): YouTubeSearch.details_cache.get_stats()["hit_ratio"],
+    }
+
+REGISTRY.gauge("sessions", "Sessions in the session store.", lambda: session_manager.backend.count())
+REGISTRY.gauge("cache_hit_ratio", "Hit ratio of each cache since start.", cache_hit_ratios, ("cache",))
+REGISTRY.gauge(
+    "gpt_scheduler_queue_depth", "GPT calls waiting for admission, by priority class.",
+    lambda: {(name,): depth for name, depth in workout_generator.scheduler.get_stats()["queue_depth"].items()},
+    ("priority",)
+)
+REGISTRY.gauge("gpt_in_flight", "Distinct GPT calls in flight (after single-flight deduplication).",
+               workout_generator.in_flight_count)
+REGISTRY.gauge("background_tasks", "Fire-and-forget tasks still running (upgrades, prefetches, audits).",
+               lambda: len(background_tasks))
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: request and GPT latency histograms, token and error counters, store and cache gauges."""
+    return Response(content=REGISTRY.render(), media_type=REGISTRY.CONTENT_TYPE)
+
+@app.get("/cache/semantic/audit")
+async def semantic_cache_audit():
+    """Recent semantic-cache hits, near misses and verification results, for reviewing false hits."""
+    return {"events": semantic_cache.recent_audit()}
+
+@app.get("/session/{session_id}/plan")
+async def get_session_plan(session_id: str):
+    """
+    Sections stored for the session. After a local fallback "source" is "local" while the
+    GPT version is pending ("pending": true) and "gpt" once it has replaced it.
+    """
+    session_data = await session_manager.get_session_async(session_id)
+    if not session_data:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    artifacts = session_data.get("artifacts") or {}
+    if not artifacts:
+        raise HTTPException(status_code=404, detail="No stored plan for this session.")
+    sources = {artifact["source"] for artifact in artifacts.values()}
+    return {
+        "session_id": session_id,
+        "source": sources.pop() if len(sources) == 1 else "mixed",
+        **session_data.get("plan", {"generation_mode": None, "pending": False}),
+        "sections": {section: artifact["content"] for section, artifact in artifacts.items()}
     }
 
+@app.patch("/session/{session_id}")
+async def update_session_profile(
+    profile_update: ProfileUpdate,
+    session_id: str = Path(...),
+    cache_bypass: Optional[str] = Header(default=None)
+):
+    """
+    Update some profile fields and regenerate only what depends on them.
+
+    BMI and recommendation level are recomputed only when their inputs changed. A section
+    is re-rendered only when one of the inputs its template reads changed
+    (PromptTemplates.section_inputs), and sent to GPT only when the new prompt differs from
+    the one its stored copy came from (e.g. a weight change that keeps the BMI band leaves
+    the analysis and nutrition prompts byte-identical), or found in the precomputed
+    PlanStore. Everything else is served from the session. The response lists
+    regenerated_sections, precomputed_sections and reused_sections.
+    """
+    session_data = await session_manager.get_session_async(session_id)
+    if not session_data:
+        raise HTTPException(status_code=404, detail="Session not found.")
+
+    profile = {name: session_data[name] for name in UserInput.model_fields if name in session_data}
+    try:
+        user_input = UserInput(**{**profile, **profile_update.dict(exclude_none=True)})
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid profile update: {str(e)}")
+
+    try:
+        updated = {name for name, value in user_input.dict().items() if profile.get(name) != value}
+
+        # **Recompute derived values only when their inputs changed**
+        bmi, recommendation_level = session_data.get("bmi"), session_data.get("recommendation_level")
+        if bmi is None or updated & set(DERIVED_INPUTS["bmi"]):
+            bmi = RuleBasedRecommender.calculate_bmi(user_input.weight, user_input.height)
+        if recommendation_level is None or updated & set(DERIVED_INPUTS["recommendation_level"]):
+            recommendation_level = RuleBasedRecommender.get_recommendation_level(
+                user_input.weight, user_input.height, user_input.age, user_input.hypertension, user_input.diabetes
+            )
+        updated |= {name for name, value in (("bmi", bmi), ("recommendation_level", recommendation_level))
+                    if session_data.get(name) != value}
+
+        # **Sections whose template reads a changed input are re-rendered; the rest keep their stored copy**
+        artifacts = session_data.get("artifacts") or {}
+        old_inputs = PromptTemplates.section_inputs(
+            profile, session_data.get("recommendation_level"), session_data.get("bmi") or bmi
+        ) if len(profile) == len(UserInput.model_fields) else {}
+        new_inputs = PromptTemplates.section_inputs(user_input.dict(), recommendation_level, bmi)
+        use_cache = not is_cache_bypassed(cache_bypass)
+
+        sections, fingerprints, stale, precomputed = {}, {}, {}, {}
+        for section in SECTIONS:
+            artifact = artifacts.get(section)
+            reads = old_inputs.get(section, frozenset()) | new_inputs[section]
+            if use_cache and artifact and artifact["source"] != "local" and not reads & updated:
+                sections[section], fingerprints[section] = artifact["content"], artifact["fingerprint"]
+                continue
+            prompt = PromptTemplates.section_prompt(section, user_input, recommendation_level, bmi)
+            fingerprints[section] = SessionArtifacts.fingerprint(PromptTemplates.SECTION_TEMPLATES[section], prompt)
+            stored = session_artifacts.lookup(session_data, section, fingerprints[section]) if use_cache else None
+            if stored is None and use_cache:
+                stored = plan_store.lookup(fingerprints[section])
+                if stored is not None:
+                    precomputed[section] = stored
+            if stored is not None:
+                sections[section] = stored
+            else:
+                stale[section] = prompt
+
+        # **Regenerate the stale sections (failures are filled in locally)**
+        local_sections = []
+        if stale:
+            generated, _ = await generate_sections(
+                user_input, bmi, recommendation_level, stale, use_cache=use_cache, endpoint="/session",
+                deadline=request_deadline("/session")
+            )
+            local_sections = [name for name, section in generated.items() if workout_generator.is_error(section)]
+            if local_sections:
+                local = fallback_engine.build_sections(user_input, recommendation_level, bmi)
+                generated = {**generated, **{name: local[name] for name in local_sections}}
+            sections.update(generated)
+
+        # Re-read so concurrent updates (conversation turns, prefetched videos) are kept
+        latest = await session_manager.get_session_async(session_id) or session_data
+        latest = {**latest, **user_input.dict(), "bmi": bmi, "recommendation_level": recommendation_level}
+        if "workout_plan" in stale:
+            # Videos were prefetched for the old plan's exercises; the quota spent on them stays spent
+            latest.pop("exercise_videos", None)
+        latest = SessionArtifacts.merged(
+            latest, {name: sections[name] for name in stale if name not in local_sections}, fingerprints
+        )
+        latest = SessionArtifacts.merged(
+            latest, {name: sections[name] for name in local_sections}, fingerprints, source="local"
+        )
+        latest = SessionArtifacts.merged(latest, precomputed, fingerprints, source="precomputed")
+        await session_manager.create_session_async(session_id, latest)
+        session_artifacts.stats["stored"] += len(stale)
+        if "workout_plan" in stale or "workout_plan" in precomputed:
+            video_prefetcher.schedule(session_id, sections["workout_plan"], start_background_task)
+
+        return {
+            "session_id": session_id,
+            "updated_fields": sorted(updated),
+            "bmi": bmi,
+            "recommendation_level": recommendation_level,
+            "fitness_analysis": sections["fitness_analysis"],
+            "workout_plan": sections["workout_plan"],
+            "nutrition_tips": sections["nutrition_tips"],
+            "regenerated_sections": list(stale),
+            "reused_sections": [section for section in SECTIONS if section not in stale and section not in precomputed],
+            "precomputed_sections": list(precomputed),
+            "local_sections": local_sections
+        }
+
+    except Exception as e:
+        logger.exception("PATCH /session failed")
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
 @app.get("/session/{session_id}")
 async def get_session(session_id: str):
     """Retrieve user session data."""
-    session_data = session_manager.get_session(session_id)
+    session_data = await session_manager.get_session_async(session_id)
     if not session_data:
         raise HTTPException(status_code=404, detail="Session not found.")
-    return {"session_id": session_id, "user_data": session_data}
+    return {"session_id": session_id, "user_data": dict(session_data)}
 
 
 @app.delete("/session/{session_id}")
 async def clear_session(session_id: str):
     """Clear user session data."""
-    session_manager.delete_session(session_id)
+    await session_manager.delete_session_async(session_id)
     return {"message": "Session cleared", "session_id": session_id}
 
 
+youtube_search = None
+
+def get_youtube_search():
+    """Process-wide YouTube client, created on first use (raises if no API key is configured)."""
+    global youtube_search
+    if youtube_search is None:
+        youtube_search = YouTubeSearch()
+    return youtube_search
+
+video_prefetcher = VideoPrefetcher(session_manager, get_youtube_search)
+
 class YouTubeSearchRequest(BaseModel):
     query: str
     max_results: Optional[int] = 5
     video_duration: Optional[str] = 'medium'
     relevance_keywords: Optional[List[str]] = None
+    include_details: Optional[bool] = False  # Enrich results with one batched videos.list call
+    exercise: Optional[str] = None  # Plan exercise the query is for; served from the session's prefetched videos
+
+class YouTubeVideosRequest(BaseModel):
+    video_ids: List[str]
+
+MAX_BATCH_VIDEO_IDS = 500
 
 @app.post("/youtube-search")
 async def search_workout_videos(
@@ -211,33 +1063,37 @@ async def search_workout_videos(
 ):
     """
     Search for workout videos on YouTube based on user preferences and session data.
+    Videos prefetched for a plan exercise (see VideoPrefetcher) are returned from the session.
     """
     try:
-        # Initialize YouTube search
-        youtube_search = YouTubeSearch()
-        
+        youtube = get_youtube_search()
+        videos = None
+
         # If session exists, enhance search with user preferences
         if session_id:
-            session_data = session_manager.get_session(session_id)
+            session_data = await session_manager.get_session_async(session_id)
             if session_data:
                 # Add relevant keywords based on user preferences
-                relevance_keywords = [
-                    session_data.get('fitness_goal', ''),
-                    session_data.get('experience_level', ''),
-                    session_data.get('workout_preference', '')
-                ]
-                # Filter out empty strings
-                relevance_keywords = [kw for kw in relevance_keywords if kw]
+                relevance_keywords = session_relevance_keywords(session_data)
                 if relevance_keywords:
                     search_request.relevance_keywords = relevance_keywords
+                if search_request.exercise:
+                    prefetched = session_data.get("exercise_videos", {}).get(exercise_key(search_request.exercise))
+                    if prefetched is not None:
+                        videos = prefetched[:search_request.max_results]
 
         # Perform search
-        videos = await youtube_search.search_workout_videos(
-            query=search_request.query,
-            max_results=search_request.max_results,
-            relevance_keywords=search_request.relevance_keywords,
-            video_duration=search_request.video_duration
-        )
+        if videos is None:
+            videos = await youtube.search_workout_videos(
+                query=search_request.query,
+                max_results=search_request.max_results,
+                relevance_keywords=search_request.relevance_keywords,
+                video_duration=search_request.video_duration
+            )
+
+        if search_request.include_details and videos:
+            batch = await youtube.get_videos_details([video['video_id'] for video in videos])
+            videos = [{**video, 'details': item.get('details')} for video, item in zip(videos, batch)]
 
         return {
             "session_id": session_id,
@@ -253,9 +1109,27 @@ async def get_video_details(video_id: str):
     Get detailed information about a specific YouTube video.
     """
     try:
-        youtube_search = YouTubeSearch()
-        video_details = await youtube_search.get_video_details(video_id)
+        video_details = await get_youtube_search().get_video_details(video_id)
         return video_details
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching video details: {str(e)}")
+
+@app.post("/youtube-videos")
+async def get_videos_details(videos_request: YouTubeVideosRequest):
+    """
+    Get details for many YouTube videos at once (batched 50 IDs per upstream call).
+    Results keep the input order; missing videos are reported per item instead of failing the batch.
+    """
+    if len(videos_request.video_ids) > MAX_BATCH_VIDEO_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_VIDEO_IDS} video IDs per request.")
+
+    try:
+        videos = await get_youtube_search().get_videos_details(videos_request.video_ids)
+        return {
+            "videos": videos,
+            "missing": [item["video_id"] for item in videos if "error" in item]
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching video details: {str(e)}")
@@ -0,0 +1,220 @@
+import json
+import os
+
+from backend.utils.durations import parse_weeks
+
+LIBRARY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "exercise_library.json")
+
+LEVELS = {"beginner": 0, "intermediate": 1, "expert": 2}
+
+# **Session layouts (patterns per training day)**
+STRENGTH_DAYS = [["legs", "push", "pull", "core", "legs", "push"], ["legs", "pull", "push", "core", "pull", "legs"]]
+CARDIO_DAYS = [["cardio", "conditioning", "core", "cardio", "conditioning", "core"]]
+LOW_IMPACT_DAYS = [["cardio", "core"]]
+
+# **Prescriptions: pattern -> (sets, reps) per experience level**
+PRESCRIPTIONS = {
+    "warmup": [("1", "5-8 min")] * 3,
+    "cooldown": [("1", "5-10 min")] * 3,
+    "legs": [("3", "10-12"), ("4", "8-10"), ("5", "4-6")],
+    "push": [("3", "10-12"), ("4", "8-10"), ("5", "4-6")],
+    "pull": [("3", "10-12"), ("4", "8-10"), ("5", "5-8")],
+    "core": [("3", "30 s"), ("3", "45 s"), ("4", "60 s")],
+    "cardio": [("1", "20-25 min"), ("1", "30-35 min"), ("1", "40-45 min")],
+    "conditioning": [("4 rounds", "20 s on / 40 s off"), ("6 rounds", "30 s on / 30 s off"), ("8 rounds", "40 s on / 20 s off")],
+}
+
+NOTES = {
+    "warmup": ["Start slowly and raise your heart rate gradually.", "Prepare the joints you will load today.", "Dynamic mobility for the day's lifts."],
+    "cooldown": ["Breathe slowly and relax into each stretch.", "Hold each stretch 20-30 s.", "Down-regulate: nasal breathing, long holds."],
+    "legs": ["Keep your chest up and knees in line with your toes; move slowly.", "Controlled lowering, full range of motion.", "Work at RPE 8; add load when all reps feel solid."],
+    "push": ["Keep your core tight and lower with control.", "Pause briefly at the bottom of each rep.", "RPE 8; progressive overload week to week."],
+    "pull": ["Squeeze your shoulder blades together at the end of each rep.", "Control the lowering phase.", "RPE 8; vary grip to spread the load."],
+    "core": ["Keep your lower back flat and breathe steadily.", "Brace as if expecting a punch.", "Add load or lever length as it gets easy."],
+    "cardio": ["Keep a pace where you can still talk.", "Moderate steady pace (zone 2).", "Include 2-3 tempo blocks near threshold."],
+    "conditioning": ["Go at a pace you can sustain for every round.", "Hard but repeatable efforts.", "Near-maximal efforts; full recovery between rounds."],
+}
+
+MEALS = {
+    "muscle gain": [("Breakfast", "Oats with milk, whey or Greek yogurt, banana, nuts"),
+                    ("Lunch", "Rice or quinoa, chicken or tofu, mixed vegetables, olive oil"),
+                    ("Dinner", "Salmon or lean beef, potatoes, green salad"),
+                    ("Snacks", "Cottage cheese with fruit, peanut butter toast, protein shake")],
+    "weight loss": [("Breakfast", "Veggie omelette or Greek yogurt with berries"),
+                    ("Lunch", "Large salad with grilled chicken, beans or lentils"),
+                    ("Dinner", "Baked fish or tofu, steamed vegetables, small portion of brown rice"),
+                    ("Snacks", "Apple with a few almonds, carrot sticks with hummus")],
+    "weight gain": [("Breakfast", "Whole-grain toast, eggs, avocado, whole milk"),
+                    ("Lunch", "Pasta with lean mince, vegetables, olive oil"),
+                    ("Dinner", "Chicken thighs, rice, roasted vegetables"),
+                    ("Snacks", "Trail mix, smoothies with oats and nut butter, cheese and crackers")],
+}
+DEFAULT_MEALS = [("Breakfast", "Oats or whole-grain toast with eggs and fruit"),
+                 ("Lunch", "Whole grains, lean protein, plenty of vegetables"),
+                 ("Dinner", "Lean protein, vegetables, a portion of starchy carbs"),
+                 ("Snacks", "Fruit, yogurt, a handful of nuts")]
+
+
+class FallbackPlanEngine:
+    """
+    Deterministic, local version of the /generate-workout sections, used when GPT misses
+    its latency budget or fails. Builds the plan from the same inputs as
+    PromptTemplates.workout_plan_prompt (location, preference, experience, duration,
+    medical conditions) plus the RuleBasedRecommender level, using the exercise library
+    in backend/data/exercise_library.json. No I/O after the first load.
+    """
+
+    _library = None
+
+    @classmethod
+    def library(cls):
+        """Exercises grouped by pattern, loaded once."""
+        if cls._library is None:
+            with open(LIBRARY_PATH, encoding="utf-8") as library_file:
+                data = json.load(library_file)
+            library = {}
+            for row in data["exercises"]:
+                exercise = dict(zip(data["fields"], row))
+                exercise["locations"] = exercise["locations"].split()
+                exercise["min_level"] = LEVELS[exercise["min_level"]]
+                library.setdefault(exercise["pattern"], []).append(exercise)
+            cls._library = library
+        return cls._library
+
+    @staticmethod
+    def _bmi_status(bmi_value):
+        return (
+            "underweight" if bmi_value < 18.5 else
+            "normal weight" if bmi_value < 25 else
+            "overweight" if bmi_value < 30 else
+            "obese"
+        )
+
+    @staticmethod
+    def _has_medical_condition(user_input):
+        return user_input.hypertension.lower() == "yes" or user_input.diabetes.lower() == "yes"
+
+    def _pick(self, pattern, location, level, low_impact, index, used=()):
+        candidates = [
+            exercise for exercise in self.library()[pattern]
+            if location in exercise["locations"] and exercise["min_level"] <= level
+            and not (low_impact and exercise["impact"] == "high")
+        ] or [exercise for exercise in self.library()[pattern] if exercise["impact"] == "low"]
+        # Most advanced suitable exercises first, then rotate through them by slot,
+        # skipping exercises already in the session while there are alternatives
+        candidates.sort(key=lambda exercise: -exercise["min_level"])
+        for offset in range(len(candidates)):
+            exercise = candidates[(index + offset) % len(candidates)]
+            if exercise["name"] not in used:
+                return exercise
+        return None
+
+    def _row(self, day, exercise, level):
+        sets, reps = PRESCRIPTIONS[exercise["pattern"]][level]
+        note = NOTES[exercise["pattern"]][level]
+        return f"| {day} | {exercise['name']} | {sets} | {reps} | {exercise['equipment']} | {note} |"
+
+    def workout_plan(self, user_input, recommendation_level):
+        level = LEVELS.get(user_input.experience_level.lower(), 0)
+        location = "home" if user_input.workout_location.lower() == "home" else "gym"
+        preference = user_input.workout_preference.lower()
+        weeks = parse_weeks(user_input.duration)
+        medical = self._has_medical_condition(user_input)
+        restricted = recommendation_level in [0, 1]
+        low_impact = medical or restricted
+
+        if restricted:
+            layouts, days, main_count = LOW_IMPACT_DAYS, 3, 2
+        else:
+            if preference == "strength training":
+                layouts = STRENGTH_DAYS
+            elif preference == "cardio":
+                layouts = CARDIO_DAYS
+            else:
+                layouts = [STRENGTH_DAYS[0], CARDIO_DAYS[0], STRENGTH_DAYS[1]]
+            days, main_count = 3 + level, 4 + level
+
+        rows = ["| Day | Exercise | Sets | Reps | Equipment Needed | Additional Notes |",
+                "|---|---|---|---|---|---|"]
+        for day in range(days):
+            layout = layouts[day % len(layouts)]
+            label = f"Day {day + 1}"
+            rows.append(self._row(label, self._pick("warmup", location, level, low_impact, day), level))
+            used = set()
+            for slot in range(main_count):
+                exercise = self._pick(layout[slot % len(layout)], location, level, low_impact, day + slot, used)
+                if exercise is not None:
+                    used.add(exercise["name"])
+                    rows.append(self._row(label, exercise, level))
+            rows.append(self._row(label, self._pick("cooldown", location, level, low_impact, day), level))
+
+        progression = ["| Week | Focus |", "|---|---|"]
+        for week in range(1, weeks + 1):
+            if week % 4 == 0:
+                focus = "Deload: keep the exercises, cut sets by one and reduce the load about 20%."
+            elif week == 1:
+                focus = "Learn the movements at the prescribed sets and reps; stop 2-3 reps short of failure."
+            else:
+                focus = "Add 1-2 reps per set, or 2.5-5% load once every set hits the top of the rep range; add 5 min to cardio sessions."
+            progression.append(f"| {week} | {focus} |")
+
+        advisory = []
+        if restricted:
+            advisory.append("Exercise is not recommended without medical clearance. Keep to gentle, low-impact activity and consult a doctor before starting.")
+        elif medical:
+            advisory.append("You have hypertension or diabetes: keep every exercise low-impact, avoid breath-holding and maximal efforts, and consult a medical professional before starting this program.")
+        advisory.append("Drink water before, during and after training, and keep at least one full rest day between hard sessions.")
+
+        return "\n".join([
+            f"### Your {user_input.duration} {user_input.workout_preference} Plan ({user_input.experience_level}, {user_input.workout_location})",
+            f"A {days}-day weekly routine built for your goal of {user_input.fitness_goal.lower()}. Repeat it every week and progress as shown below.",
+            "",
+            *rows,
+            "",
+            "### Progression & Scaling",
+            *progression,
+            "",
+            "### Medical & Recovery Advisory",
+            *(f"- {line}" for line in advisory),
+        ])
+
+    def fitness_analysis(self, user_input, recommendation_level, bmi_value):
+        lines = [
+            "### Your Fitness Overview",
+            f"- **BMI:** {bmi_value} ({self._bmi_status(bmi_value)})",
+            f"- **Age:** {user_input.age}",
+            f"- **Experience:** {user_input.experience_level}, training at {user_input.workout_location.lower()}",
+        ]
+        if self._has_medical_condition(user_input):
+            lines.append("- **Health:** you have hypertension or diabetes, so consult a doctor before starting any intense workouts.")
+        else:
+            lines.append("- **Health:** no medical restrictions were reported.")
+        if recommendation_level in [0, 1]:
+            lines.append("- **Recommendation:** exercise is not recommended until you have spoken with a doctor.")
+        else:
+            lines.append("- **Recommendation:** you are safe to exercise with a structured, gradual progression.")
+        return "\n".join(lines)
+
+    def nutrition_tips(self, user_input, bmi_value):
+        meals = MEALS.get(user_input.fitness_goal.lower(), DEFAULT_MEALS)
+        lines = [
+            "### Your Nutrition Plan",
+            f"Built for your goal of {user_input.fitness_goal.lower()} at a BMI of {bmi_value} ({self._bmi_status(bmi_value)}).",
+            "",
+            "| Meal | Recommendation |",
+            "|---|---|",
+            *(f"| {meal} | {recommendation} |" for meal, recommendation in meals),
+            "",
+            "- Aim for 2.5-3L of water per day.",
+        ]
+        if self._has_medical_condition(user_input):
+            lines.append("- Choose low-sodium, heart-healthy meals that keep blood sugar steady, and check your plan with a medical professional.")
+        return "\n".join(lines)
+
+    def build_sections(self, user_input, recommendation_level, bmi_value):
+        """All three /generate-workout sections, keyed like generate_sections()."""
+        return {
+            "fitness_analysis": self.fitness_analysis(user_input, recommendation_level, bmi_value),
+            "workout_plan": self.workout_plan(user_input, recommendation_level),
+            "nutrition_tips": self.nutrition_tips(user_input, bmi_value),
+        }
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class RuleBasedRecommender:
     """
     Rule-based recommendation system to classify users (0-6)
@@ -61,3 +64,70 @@ class RuleBasedRecommender:
             return 5
 
         return 6  # Default case (Good fitness condition)
+
+
+    # **Vectorized cohort scoring (must stay in lockstep with the scalar rules above)**
+
+    @staticmethod
+    def _round_half_even_1dp(values):
+        """
+        Round to one decimal exactly like Python's round(x, 1).
+        np.round(x * 10) / 10 agrees except when x * 10 lands on (or within float error of)
+        a .5 tie, so those rare elements are re-rounded with the scalar builtin.
+        """
+        scaled = values * 10
+        rounded = np.rint(scaled) / 10
+        near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+        for i in np.flatnonzero(near_tie):
+            rounded[i] = round(float(values[i]), 1)
+        return rounded
+
+    @staticmethod
+    def _as_flag(values):
+        """Boolean mask of "Yes" answers (booleans are accepted as-is)."""
+        values = np.asarray(values)
+        if values.dtype == bool:
+            return values
+        return values == "Yes"
+
+    @staticmethod
+    def calculate_bmi_batch(weight, height):
+        """
+        Vectorized calculate_bmi over column arrays (weight in kg, height in cm).
+        """
+        weight = np.asarray(weight, dtype=np.float64)
+        height = np.asarray(height, dtype=np.float64)
+        if np.any(height <= 0):
+            raise ValueError("Height must be greater than zero.")
+
+        height_m = height / 100
+        bmi = weight / (height_m ** 2)
+        return RuleBasedRecommender._round_half_even_1dp(bmi)
+
+    @staticmethod
+    def get_recommendation_levels_batch(weight, height, age, hypertension, diabetes):
+        """
+        Vectorized get_recommendation_level over column arrays.
+        Returns (bmi, levels) arrays; conditions are evaluated in the same order as the scalar rules.
+        """
+        bmi = RuleBasedRecommender.calculate_bmi_batch(weight, height)
+        age = np.asarray(age, dtype=np.float64)
+        has_hypertension = RuleBasedRecommender._as_flag(hypertension)
+        has_diabetes = RuleBasedRecommender._as_flag(diabetes)
+        any_condition = has_hypertension | has_diabetes
+
+        conditions = [
+            # 0: no exercise recommended
+            (bmi >= 40) | (bmi < 16) | (has_hypertension & has_diabetes) | ((age > 65) & any_condition),
+            # 1-2: light activity with medical advice
+            (bmi >= 35) | ((age >= 60) & (bmi >= 30)),
+            any_condition,
+            # 3-4: standard exercise recommendations
+            (bmi >= 25) & (bmi < 35),
+            (bmi >= 18.5) & (bmi < 25),
+            # 5: underweight or special cases
+            bmi < 18.5,
+            age < 18,
+        ]
+        levels = np.select(conditions, [0, 1, 2, 3, 4, 5, 5], default=6).astype(np.int8)
+        return bmi, levels
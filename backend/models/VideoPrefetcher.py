@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import os
+import re
+
+from backend.models.youtube_search import SEARCH_QUOTA_COST, VIDEOS_LIST_QUOTA_COST
+
+_MARKDOWN = re.compile(r"[*_`]")
+
+logger = logging.getLogger(__name__)
+
+
+def exercise_key(exercise):
+    """Normalized exercise name used to store and look up prefetched videos."""
+    return " ".join(_MARKDOWN.sub("", exercise).lower().split())
+
+
+def exercise_video_query(exercise, experience_level):
+    """The search query the frontend (YoutubeVideo.js) sends for an exercise."""
+    level = experience_level or "beginners"
+    return f"{exercise} for {level} {experience_level} form technique"
+
+
+def session_relevance_keywords(session_data):
+    """Keywords /youtube-search adds for requests that carry a session."""
+    keywords = [
+        session_data.get("fitness_goal", ""),
+        session_data.get("experience_level", ""),
+        session_data.get("workout_preference", "")
+    ]
+    return [kw for kw in keywords if kw]
+
+
+class VideoPrefetcher:
+    """
+    Warms the YouTube caches for the exercises in a freshly generated workout plan.
+
+    Exercise names are read from the plan's markdown table, deduplicated and searched
+    in plan order with the same query, keywords and result count the frontend uses, so
+    later /youtube-search calls hit YouTubeSearch's TTL cache. Details for the found
+    videos are fetched with batched videos.list calls. Results are also stored on the
+    session under "exercise_videos" ({exercise key: videos}) so /youtube-search can
+    answer straight from the session.
+
+    Each session may spend at most YOUTUBE_PREFETCH_QUOTA API quota units (default 300,
+    i.e. the first three uncached exercises; a search costs 100, a videos.list call 1;
+    cache hits are free; 0 turns prefetching off). Across all sessions, prefetching only
+    spends while the process's total YouTube usage for the day (YouTubeSearch.quota,
+    interactive searches included) stays within YOUTUBE_PREFETCH_DAILY_QUOTA (default
+    2000), so the rest of the key's daily quota is left for searches users actually make.
+    At most YOUTUBE_PREFETCH_CONCURRENCY searches run at once (default 3) and
+    YOUTUBE_PREFETCH_RESULTS videos are fetched per exercise (default 10, matching the frontend).
+
+    Only the interactive plan endpoints schedule prefetches; bulk job rows (/jobs) never do.
+    """
+
+    def __init__(self, session_manager, get_youtube_search):
+        self.session_manager = session_manager
+        self.get_youtube_search = get_youtube_search
+        self.quota_per_session = int(os.getenv("YOUTUBE_PREFETCH_QUOTA", "300"))
+        self.daily_quota = int(os.getenv("YOUTUBE_PREFETCH_DAILY_QUOTA", "2000"))
+        self.concurrency = int(os.getenv("YOUTUBE_PREFETCH_CONCURRENCY", "3"))
+        self.max_results = int(os.getenv("YOUTUBE_PREFETCH_RESULTS", "10"))
+        self._running = {}  # session_id -> task
+        self._reserved = 0  # units of prefetch calls in flight, not yet charged to the daily quota
+        self.stats = {"runs": 0, "exercises_prefetched": 0, "searches": 0, "quota_used": 0, "skipped_for_quota": 0,
+                      "skipped_for_daily_quota": 0, "errors": 0}
+
+    @staticmethod
+    def extract_exercises(workout_plan):
+        """Unique exercise names from the "Exercise" column of the plan's markdown table(s), in order."""
+        exercises = {}
+        column = None
+        for line in workout_plan.splitlines():
+            line = line.strip()
+            if not line.startswith("|"):
+                column = None
+                continue
+            cells = [cell.strip() for cell in line.strip("|").split("|")]
+            if column is None:
+                names = [exercise_key(cell) for cell in cells]
+                column = names.index("exercise") if "exercise" in names else None
+                continue
+            if column >= len(cells) or set(cells[column]) <= set("-: "):
+                continue  # separator row
+            name = _MARKDOWN.sub("", cells[column]).strip()
+            if name:
+                exercises.setdefault(exercise_key(name), name)
+        return list(exercises.values())
+
+    def _reserve_daily(self, units, youtube):
+        """Reserve units against the daily prefetch ceiling; False when they would exceed it."""
+        if youtube.quota.used() + self._reserved + units > self.daily_quota:
+            self.stats["skipped_for_daily_quota"] += 1
+            return False
+        self._reserved += units
+        return True
+
+    def schedule(self, session_id, workout_plan, start_task):
+        """Start prefetching for a session (ignored if one is already running for it)."""
+        if self.quota_per_session <= 0 or session_id in self._running:
+            return
+        task = start_task(self.prefetch(session_id, workout_plan))
+        self._running[session_id] = task
+        task.add_done_callback(lambda _: self._running.pop(session_id, None))
+
+    async def prefetch(self, session_id, workout_plan):
+        try:
+            youtube = self.get_youtube_search()
+        except ValueError:
+            return  # no YouTube API key configured
+        session_data = await self.session_manager.get_session_async(session_id)
+        if not session_data:
+            return
+        self.stats["runs"] += 1
+
+        state = session_data.get("video_prefetch", {"quota_used": 0})
+        stored = session_data.get("exercise_videos", {})
+        keywords = session_relevance_keywords(session_data)
+        pending = [name for name in self.extract_exercises(workout_plan) if exercise_key(name) not in stored]
+
+        found = {}
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+
+        async def search(name):
+            query = exercise_video_query(name, session_data.get("experience_level", ""))
+            cached = youtube.search_cache_key(query, keywords, "medium", self.max_results) in youtube.search_cache
+            reserved = 0
+            try:
+                if not cached:
+                    # Reserve the quota before awaiting so concurrent searches cannot overspend
+                    if state["quota_used"] + SEARCH_QUOTA_COST > self.quota_per_session:
+                        self.stats["skipped_for_quota"] += 1
+                        return
+                    if not self._reserve_daily(SEARCH_QUOTA_COST, youtube):
+                        return
+                    reserved = SEARCH_QUOTA_COST
+                    state["quota_used"] += SEARCH_QUOTA_COST
+                    self.stats["quota_used"] += SEARCH_QUOTA_COST
+                    self.stats["searches"] += 1
+                async with semaphore:
+                    found[exercise_key(name)] = await youtube.search_workout_videos(
+                        query=query, max_results=self.max_results, relevance_keywords=keywords, video_duration="medium"
+                    )
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning("Prefetching videos for %s failed: %s", name, e)
+            finally:
+                # Charged to youtube.quota by now, or never spent if cancelled while waiting for the semaphore
+                self._reserved -= reserved
+
+        await asyncio.gather(*(search(name) for name in pending))
+
+        # Warm the details cache with batched videos.list calls
+        video_ids = [
+            video["video_id"] for videos in found.values() for video in videos
+            if video["video_id"] not in youtube.details_cache
+        ]
+        video_ids = list(dict.fromkeys(video_ids))
+        calls = -(-len(video_ids) // 50)
+        units = calls * VIDEOS_LIST_QUOTA_COST
+        if calls and state["quota_used"] + units <= self.quota_per_session and self._reserve_daily(units, youtube):
+            state["quota_used"] += units
+            self.stats["quota_used"] += units
+            try:
+                await youtube.get_videos_details(video_ids)
+            finally:
+                self._reserved -= units
+
+        self.stats["exercises_prefetched"] += len(found)
+        latest = await self.session_manager.get_session_async(session_id)
+        if latest:
+            await self.session_manager.create_session_async(session_id, {
+                **latest,
+                "exercise_videos": {**latest.get("exercise_videos", {}), **found},
+                "video_prefetch": {"quota_used": max(state["quota_used"], latest.get("video_prefetch", {}).get("quota_used", 0))},
+            })
+
+    def get_stats(self):
+        return {**self.stats, "in_progress": len(self._running), "daily_quota": self.daily_quota}
@@ -1,24 +1,128 @@
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import asyncio
+import httpx
 import os
+import threading
+from datetime import datetime
 from typing import List, Dict, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from backend.utils.TTLCache import TTLCache
+from backend.utils.Tracing import Tracing
+
+YOUTUBE_API_URL = os.getenv("YOUTUBE_API_URL", "https://www.googleapis.com/youtube/v3")
+VIDEOS_LIST_MAX_IDS = 50  # videos.list accepts at most 50 IDs per call
+
+# YouTube Data API quota cost per call
+SEARCH_QUOTA_COST = 100
+VIDEOS_LIST_QUOTA_COST = 1
+QUOTA_COSTS = {'search': SEARCH_QUOTA_COST, 'videos': VIDEOS_LIST_QUOTA_COST}
+
+try:
+    # The Data API quota resets at midnight Pacific Time
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except ZoneInfoNotFoundError:
+    QUOTA_TIMEZONE = None  # no tz database: count local days instead
+
+
+class DailyQuota:
+    """Quota units spent by this process on the current quota day (all callers combined)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._day = None
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def _roll(self):
+        day = datetime.now(QUOTA_TIMEZONE).date()
+        if day != self._day:
+            self._day, self._used = day, 0
+
+    def spend(self, units: int):
+        with self._lock:
+            self._roll()
+            self._used += units
+
+    def used(self) -> int:
+        with self._lock:
+            self._roll()
+            return self._used
+
+    def get_stats(self) -> Dict:
+        used = self.used()
+        return {'limit': self.limit, 'used_today': used, 'remaining_today': max(0, self.limit - used)}
+
 
 class YouTubeSearch:
     """
     A class to handle YouTube search operations using the YouTube Data API.
+
+    Requests go straight to the Data API REST endpoints over a process-wide
+    httpx.AsyncClient, so no discovery document is fetched and connections are
+    reused. Results are kept in a TTL cache (YOUTUBE_CACHE_SIZE entries,
+    YOUTUBE_CACHE_TTL seconds) to save quota and latency on repeated lookups.
+    YOUTUBE_API_URL overrides the API base URL (e.g. a local stand-in for benchmarks).
+    Every API call is charged to `quota`, the process-wide count of units spent today
+    against the key's YOUTUBE_DAILY_QUOTA (default 10000, the Data API default).
     """
+
+    _http_client = None
+    _lock = threading.Lock()
+
+    search_cache = TTLCache(
+        max_entries=int(os.getenv("YOUTUBE_CACHE_SIZE", "2048")),
+        ttl_seconds=float(os.getenv("YOUTUBE_CACHE_TTL", "3600")),
+    )
+    details_cache = TTLCache(
+        max_entries=int(os.getenv("YOUTUBE_CACHE_SIZE", "2048")),
+        ttl_seconds=float(os.getenv("YOUTUBE_CACHE_TTL", "3600")),
+    )
+    quota = DailyQuota(int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000")))
+
     def __init__(self, api_key: Optional[str] = None):
         """
         Initialize the YouTube API client.
-        
+
         Args:
             api_key (str, optional): YouTube Data API key. If not provided, will try to get from environment.
         """
         self.api_key = api_key or os.getenv('YOUTUBE_API_KEY')
         if not self.api_key:
             raise ValueError("YouTube API key is required. Set YOUTUBE_API_KEY environment variable or pass it directly.")
-        
-        self.youtube = build('youtube', 'v3', developerKey=self.api_key)
+
+    @classmethod
+    def _get_http_client(cls) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use."""
+        if cls._http_client is None:
+            with cls._lock:
+                if cls._http_client is None:
+                    cls._http_client = httpx.AsyncClient(
+                        base_url=YOUTUBE_API_URL,
+                        timeout=httpx.Timeout(15.0, connect=5.0),
+                        limits=httpx.Limits(max_connections=50, max_keepalive_connections=10),
+                    )
+        return cls._http_client
+
+    @classmethod
+    async def aclose(cls):
+        """Close the shared HTTP client (called on application shutdown)."""
+        if cls._http_client is not None:
+            await cls._http_client.aclose()
+            cls._http_client = None
+
+    async def _get(self, resource: str, params: Dict) -> Dict:
+        self.quota.spend(QUOTA_COSTS.get(resource, 1))
+        with Tracing.span("youtube_call", resource=resource):
+            response = await self._get_http_client().get(f"/{resource}", params={**params, 'key': self.api_key})
+            response.raise_for_status()
+            return response.json()
+
+    @staticmethod
+    def search_cache_key(query: str, relevance_keywords: Optional[List[str]], video_duration: str, max_results: int):
+        """Cache key on the normalized query, keywords, duration filter and result count."""
+        normalized_query = " ".join(query.lower().split())
+        keywords = tuple(" ".join(kw.lower().split()) for kw in (relevance_keywords or []) if kw)
+        return (normalized_query, keywords, video_duration, max_results)
 
     async def search_workout_videos(
         self,
@@ -29,16 +133,21 @@ class YouTubeSearch:
     ) -> List[Dict]:
         """
         Search for workout videos on YouTube based on specific criteria.
-        
+
         Args:
             query (str): The main search query
             max_results (int): Maximum number of results to return
             relevance_keywords (List[str], optional): Additional keywords to filter results
             video_duration (str): Duration filter ('short', 'medium', 'long')
-            
+
         Returns:
             List[Dict]: List of video information including id, title, description, and thumbnail
         """
+        cache_key = self.search_cache_key(query, relevance_keywords, video_duration, max_results)
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
             # Enhance search query with relevance keywords if provided
             if relevance_keywords:
@@ -56,7 +165,7 @@ class YouTubeSearch:
             }
 
             # Execute search request
-            search_response = self.youtube.search().list(**search_params).execute()
+            search_response = await self._get('search', search_params)
 
             # Process and format results
             videos = []
@@ -71,41 +180,104 @@ class YouTubeSearch:
                 }
                 videos.append(video_data)
 
+            self.search_cache.set(cache_key, videos)
             return videos
 
-        except HttpError as e:
+        except httpx.HTTPError as e:
             raise Exception(f"An error occurred while searching YouTube: {str(e)}")
 
+    @staticmethod
+    def _format_video_details(video_id: str, video_data: Dict) -> Dict:
+        return {
+            'video_id': video_id,
+            'title': video_data['snippet']['title'],
+            'description': video_data['snippet']['description'],
+            'duration': video_data['contentDetails']['duration'],
+            'view_count': video_data['statistics']['viewCount'],
+            'like_count': video_data.get('statistics', {}).get('likeCount', 'N/A'),
+            'channel_title': video_data['snippet']['channelTitle'],
+            'thumbnail_url': video_data['snippet']['thumbnails']['high']['url']
+        }
+
     async def get_video_details(self, video_id: str) -> Dict:
         """
         Get detailed information about a specific video.
-        
+
         Args:
             video_id (str): YouTube video ID
-            
+
         Returns:
             Dict: Detailed video information
         """
+        cached = self.details_cache.get(video_id)
+        if cached is not None:
+            return cached
+
         try:
-            video_response = self.youtube.videos().list(
-                part='snippet,contentDetails,statistics',
-                id=video_id
-            ).execute()
+            video_response = await self._get('videos', {
+                'part': 'snippet,contentDetails,statistics',
+                'id': video_id
+            })
 
             if not video_response.get('items'):
                 raise ValueError(f"No video found with ID: {video_id}")
 
-            video_data = video_response['items'][0]
-            return {
-                'video_id': video_id,
-                'title': video_data['snippet']['title'],
-                'description': video_data['snippet']['description'],
-                'duration': video_data['contentDetails']['duration'],
-                'view_count': video_data['statistics']['viewCount'],
-                'like_count': video_data.get('statistics', {}).get('likeCount', 'N/A'),
-                'channel_title': video_data['snippet']['channelTitle'],
-                'thumbnail_url': video_data['snippet']['thumbnails']['high']['url']
-            }
+            details = self._format_video_details(video_id, video_response['items'][0])
+            self.details_cache.set(video_id, details)
+            return details
+
+        except httpx.HTTPError as e:
+            raise Exception(f"An error occurred while fetching video details: {str(e)}")
+
+    async def _fetch_details_chunk(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch up to 50 videos with one videos.list call; returns {video_id: item or error}."""
+        try:
+            video_response = await self._get('videos', {
+                'part': 'snippet,contentDetails,statistics',
+                'id': ','.join(video_ids)
+            })
+        except httpx.HTTPError as e:
+            error = f"An error occurred while fetching video details: {str(e)}"
+            return {video_id: {'video_id': video_id, 'error': error} for video_id in video_ids}
+
+        results = {}
+        for video_data in video_response.get('items', []):
+            try:
+                details = self._format_video_details(video_data['id'], video_data)
+            except KeyError as e:
+                results[video_data['id']] = {'video_id': video_data['id'], 'error': f"Incomplete video data: missing {e}"}
+                continue
+            self.details_cache.set(video_data['id'], details)
+            results[video_data['id']] = {'video_id': video_data['id'], 'details': details}
+        return results
+
+    async def get_videos_details(self, video_ids: List[str]) -> List[Dict]:
+        """
+        Get detailed information for many videos using batched videos.list calls.
+
+        IDs not already cached are split into chunks of 50 and fetched concurrently.
+
+        Args:
+            video_ids (List[str]): YouTube video IDs
+
+        Returns:
+            List[Dict]: One item per input ID, in input order, holding either
+            'details' or an 'error' message (e.g. for missing videos)
+        """
+        results = {}
+        to_fetch = []
+        for video_id in dict.fromkeys(video_ids):  # dedupe, keep order
+            cached = self.details_cache.get(video_id)
+            if cached is not None:
+                results[video_id] = {'video_id': video_id, 'details': cached}
+            else:
+                to_fetch.append(video_id)
+
+        chunks = [to_fetch[i:i + VIDEOS_LIST_MAX_IDS] for i in range(0, len(to_fetch), VIDEOS_LIST_MAX_IDS)]
+        for chunk_results in await asyncio.gather(*(self._fetch_details_chunk(chunk) for chunk in chunks)):
+            results.update(chunk_results)
 
-        except HttpError as e:
-            raise Exception(f"An error occurred while fetching video details: {str(e)}")
\ No newline at end of file
+        return [
+            results.get(video_id) or {'video_id': video_id, 'error': f"No video found with ID: {video_id}"}
+            for video_id in video_ids
+        ]
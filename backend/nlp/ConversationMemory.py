@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import os
+
+from backend.nlp.GPTScheduler import PRIORITY_BACKGROUND
+from backend.nlp.PromptTemplates import PromptTemplates
+from backend.nlp.TokenCounter import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationMemory:
+    """
+    Bounded chat history for /user-concerns, stored in the session under "conversation":
+
+        {"summary": str, "summarized_turns": int, "turns": [{"concern", "response"}, ...]}
+
+    `turns` holds exchanges not yet folded into the summary. A prompt gets the summary
+    plus the most recent turns verbatim, as many as fit in the token budget, so prompt
+    size stays flat however long the chat runs. Turns that fall out of that window are
+    folded into the summary by a background GPT call after the response is returned.
+
+    Configured through environment variables:
+    - CONCERN_HISTORY_TURNS: recent turns kept verbatim (default 4)
+    - CONCERN_CONTEXT_TOKENS: token budget for summary + recent turns (default 1200)
+    - CONCERN_SUMMARY_TOKENS: max_tokens for the summary call (default 250)
+    """
+
+    def __init__(self, workout_generator, session_manager):
+        self.workout_generator = workout_generator
+        self.session_manager = session_manager
+        self.max_turns = int(os.getenv("CONCERN_HISTORY_TURNS", "4"))
+        self.context_tokens = int(os.getenv("CONCERN_CONTEXT_TOKENS", "1200"))
+        self.summary_tokens = int(os.getenv("CONCERN_SUMMARY_TOKENS", "250"))
+        self._summarizing = {}  # session_id -> background summary task
+        self.stats = {"summaries": 0, "summary_failures": 0, "turns_summarized": 0}
+
+    @staticmethod
+    def get(session_data):
+        conversation = session_data.get("conversation") or {}
+        return {
+            "summary": conversation.get("summary", ""),
+            "summarized_turns": conversation.get("summarized_turns", 0),
+            "turns": list(conversation.get("turns", [])),
+        }
+
+    def context_window(self, conversation):
+        """Returns (summary, recent turns that fit the budget, number of older turns left out)."""
+        summary = conversation["summary"]
+        budget = self.context_tokens - TokenCounter.count(summary)
+        window = []
+        for turn in reversed(conversation["turns"][-self.max_turns:]):
+            tokens = TokenCounter.count(PromptTemplates.conversation_context("", [turn]))
+            if tokens > budget:
+                break
+            budget -= tokens
+            window.insert(0, turn)
+        return summary, window, len(conversation["turns"]) - len(window)
+
+    def build_prompt(self, session_data, user_concern):
+        """
+        /user-concerns prompt with the profile, the bounded conversation context and the new concern.
+        Returns (prompt, has_history); has_history is True when the prompt carries a summary or
+        earlier turns, i.e. when the answer may depend on this conversation.
+        """
+        summary, window, _ = self.context_window(self.get(session_data))
+        prompt = PromptTemplates.user_concern_prompt(session_data, user_concern, summary, window)
+        return prompt, bool(summary or window)
+
+    async def record_turn(self, session_id, session_data, user_concern, response):
+        """Append an exchange to the session and fold overflowed turns into the summary in the background."""
+        # Re-read so a summary written while the response was generated is not overwritten
+        session_data = await self.session_manager.get_session_async(session_id) or session_data
+        conversation = self.get(session_data)
+        conversation["turns"].append({"concern": user_concern, "response": response})
+        await self.session_manager.create_session_async(session_id, {**session_data, "conversation": conversation})
+
+        if self.context_window(conversation)[2] > 0 and session_id not in self._summarizing:
+            task = asyncio.create_task(self._summarize(session_id))
+            self._summarizing[session_id] = task
+            task.add_done_callback(lambda _: self._summarizing.pop(session_id, None))
+
+    async def _summarize(self, session_id):
+        session_data = await self.session_manager.get_session_async(session_id)
+        if not session_data:
+            return
+        conversation = self.get(session_data)
+        overflow = self.context_window(conversation)[2]
+        if overflow <= 0:
+            return
+
+        folded = conversation["turns"][:overflow]
+        summary = await self.workout_generator.generate_response_async(
+            PromptTemplates.conversation_summary_prompt(
+                conversation["summary"], folded, max_words=int(self.summary_tokens * 0.6)
+            ),
+            temperature=0.2, max_tokens=self.summary_tokens, priority=PRIORITY_BACKGROUND,
+            template="conversation_summary_prompt", endpoint="/user-concerns"
+        )
+        if self.workout_generator.is_error(summary):
+            self.stats["summary_failures"] += 1
+            logger.error("Summarizing conversation failed: %s", summary)
+            return
+
+        # Re-read: turns may have been added (or the session reset) while the summary was generated
+        session_data = await self.session_manager.get_session_async(session_id)
+        if not session_data:
+            return
+        latest = self.get(session_data)
+        if latest["summarized_turns"] != conversation["summarized_turns"] or latest["turns"][:overflow] != folded:
+            return
+        latest["summary"] = summary.strip()
+        latest["summarized_turns"] += overflow
+        latest["turns"] = latest["turns"][overflow:]
+        await self.session_manager.create_session_async(session_id, {**session_data, "conversation": latest})
+        self.stats["summaries"] += 1
+        self.stats["turns_summarized"] += overflow
+
+    def get_stats(self):
+        return {**self.stats, "in_progress": len(self._summarizing)}
+
+    async def cancel_all(self):
+        """Stop pending summaries (on shutdown); they are redone on the next overflow."""
+        tasks = list(self._summarizing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,21 +1,138 @@
-import openai
+import httpx
 import os
+import threading
+
 
 class GPTClient:
+    """
+    OpenAI chat client backed by long-lived, process-wide connection pools.
+
+    Pool sizing is configurable through environment variables:
+    - OPENAI_MAX_CONNECTIONS (default 100)
+    - OPENAI_MAX_KEEPALIVE_CONNECTIONS (default 20)
+    - OPENAI_KEEPALIVE_EXPIRY seconds (default 30)
+    - OPENAI_TIMEOUT seconds (default 60)
+    - OPENAI_MAX_RETRIES: SDK-level retries on the async client (default 0, since
+      GPTScheduler handles rate-limit retries itself)
+
+    The openai package is imported when the first client is created (or by warm_up()),
+    not at import time, to keep API cold starts short.
+    """
+
+    ERROR_PREFIX = "Error generating response:"
+
+    _async_client = None
+    _sync_client = None
+    _lock = threading.Lock()
+
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY", "your-openai-api-key")
-        openai.api_key = self.api_key
+
+    @staticmethod
+    def _pool_limits():
+        """HTTP connection pool limits shared by the sync and async transports."""
+        return httpx.Limits(
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30")),
+        )
+
+    @staticmethod
+    def _timeout():
+        return httpx.Timeout(float(os.getenv("OPENAI_TIMEOUT", "60")), connect=10.0)
+
+    def _get_async_client(self):
+        """Return the shared AsyncOpenAI client, creating it on first use."""
+        if GPTClient._async_client is None:
+            with GPTClient._lock:
+                if GPTClient._async_client is None:
+                    import openai
+                    GPTClient._async_client = openai.AsyncOpenAI(
+                        api_key=self.api_key,
+                        max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "0")),
+                        http_client=httpx.AsyncClient(limits=self._pool_limits(), timeout=self._timeout()),
+                    )
+        return GPTClient._async_client
+
+    def _get_sync_client(self):
+        """Return the shared blocking OpenAI client, creating it on first use."""
+        if GPTClient._sync_client is None:
+            with GPTClient._lock:
+                if GPTClient._sync_client is None:
+                    import openai
+                    GPTClient._sync_client = openai.OpenAI(
+                        api_key=self.api_key,
+                        http_client=httpx.Client(limits=self._pool_limits(), timeout=self._timeout()),
+                    )
+        return GPTClient._sync_client
+
+    def warm_up(self):
+        """Import openai and build the shared async client ahead of the first request (blocking)."""
+        self._get_async_client()
+
+    @staticmethod
+    def is_rate_limit(error):
+        """Whether error is an OpenAI 429; an error can only come from openai once a client has imported it."""
+        import openai
+        return isinstance(error, openai.RateLimitError)
+
+    @staticmethod
+    def _request_kwargs(prompt, model, temperature, max_tokens):
+        return {
+            "model": model,
+            "messages": [{"role": "system", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+
+    async def create_completion_async(self, prompt, model="gpt-4o", temperature=0.7, max_tokens=500):
+        """Raw chat completion on the event loop; raises OpenAI errors (e.g. RateLimitError)."""
+        client = self._get_async_client()
+        return await client.chat.completions.create(
+            **self._request_kwargs(prompt, model, temperature, max_tokens)
+        )
+
+    async def generate_response_async(self, prompt, model="gpt-4o", temperature=0.7, max_tokens=500):
+        """Handles OpenAI API requests natively on the event loop (no executor thread)."""
+        try:
+            response = await self.create_completion_async(prompt, model, temperature, max_tokens)
+            return response.choices[0].message.content or ""
+        except Exception as e:
+            return f"{GPTClient.ERROR_PREFIX} {str(e)}"
+
+    async def stream_response_async(self, prompt, model="gpt-4o", temperature=0.7, max_tokens=500):
+        """Yields response text deltas as the upstream stream produces them."""
+        try:
+            client = self._get_async_client()
+            stream = await client.chat.completions.create(
+                **self._request_kwargs(prompt, model, temperature, max_tokens), stream=True
+            )
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+        except Exception as e:
+            yield f"{GPTClient.ERROR_PREFIX} {str(e)}"
 
     def generate_response(self, prompt, model="gpt-4o", temperature=0.7, max_tokens=500):
-        """Handles OpenAI API requests using the updated OpenAI client"""
+        """Blocking wrapper for callers outside the event loop, reusing the shared pool."""
         try:
-            client = openai.OpenAI(api_key=self.api_key)  # New API usage
+            client = self._get_sync_client()
             response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "system", "content": prompt}],
-                temperature=temperature,
-                max_tokens=max_tokens,
+                **self._request_kwargs(prompt, model, temperature, max_tokens)
             )
-            return response.choices[0].message.content  # New response format
+            return response.choices[0].message.content or ""
         except Exception as e:
-            return f"Error generating response: {str(e)}"
+            return f"{GPTClient.ERROR_PREFIX} {str(e)}"
+
+    @classmethod
+    async def aclose(cls):
+        """Close the shared connection pools (called on application shutdown)."""
+        if cls._async_client is not None:
+            await cls._async_client.close()
+            cls._async_client = None
+        if cls._sync_client is not None:
+            cls._sync_client.close()
+            cls._sync_client = None
@@ -0,0 +1,383 @@
+import asyncio
+import collections
+import heapq
+import itertools
+import os
+import random
+import time
+
+from backend.nlp.TokenCounter import TokenCounter
+from backend.utils.Metrics import GPT_CANCELLED, GPT_CANCELLED_TOKENS, GPT_HEDGES, GPT_TRUNCATED, GPT_UPSTREAM_SECONDS
+
+# **Priority classes (lower value is admitted first)**
+PRIORITY_INTERACTIVE = 0  # user-facing requests: /user-concerns, /generate-workout
+PRIORITY_BULK = 1  # bulk jobs
+PRIORITY_BACKGROUND = 2  # warm-up, summaries and other work nobody is waiting on
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BULK: "bulk", PRIORITY_BACKGROUND: "background"}
+
+HEDGE_WINDOW = 200  # recent successful call latencies kept per template
+
+
+class SchedulerClosed(RuntimeError):
+    """Raised to callers still waiting for admission when the scheduler is closed."""
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; a limit of 0 means unlimited."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self):
+        return self.capacity <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` can be consumed (requests larger than the bucket wait for a full one)."""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        if not self.unlimited:
+            self._refill()
+            self.tokens -= amount
+
+    def adjust(self, delta):
+        """Charge (positive) or refund (negative) the difference between estimated and actual usage."""
+        if not self.unlimited:
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class GPTScheduler:
+    """
+    Admission control in front of GPTClient.
+
+    Requests wait in a priority queue until both the requests-per-minute and the
+    tokens-per-minute buckets can cover them (estimated prompt tokens + max_tokens;
+    the estimate is corrected from the reported usage afterwards). A 429 pauses all
+    admissions for the server's Retry-After (or an exponential backoff) plus jitter,
+    and the request is retried.
+
+    A call may carry a deadline (a time.monotonic() value): past it the call is given
+    up wherever it is, waiting for admission or in flight, and the in-flight request is
+    cancelled (closing its connection). Interactive calls can be hedged: when one runs
+    longer than the template's recent p95 latency, an identical second request is sent
+    and the first success wins; the other is cancelled. Cancelled calls are counted with
+    an estimate of the tokens they did not spend (gpt_cancelled_tokens_saved_total).
+
+    Configured through environment variables:
+    - OPENAI_RPM / OPENAI_TPM: account limits (default 0 = unlimited)
+    - OPENAI_RATE_LIMIT_RETRIES: retries after a 429 (default 5)
+    - GPT_HEDGE: "1" enables hedged interactive calls (default off)
+    - GPT_HEDGE_PERCENTILE: latency percentile after which the hedge is sent (default 95)
+    - GPT_HEDGE_MIN_SAMPLES: successful calls of a template seen before it is hedged (default 20)
+    """
+
+    def __init__(self, gpt_client):
+        self.gpt_client = gpt_client
+        self.request_bucket = TokenBucket(int(os.getenv("OPENAI_RPM", "0")))
+        self.token_bucket = TokenBucket(int(os.getenv("OPENAI_TPM", "0")))
+        self.max_retries = int(os.getenv("OPENAI_RATE_LIMIT_RETRIES", "5"))
+        self.hedging = os.getenv("GPT_HEDGE", "0").strip().lower() in ("1", "true", "yes")
+        self.hedge_percentile = float(os.getenv("GPT_HEDGE_PERCENTILE", "95"))
+        self.hedge_min_samples = int(os.getenv("GPT_HEDGE_MIN_SAMPLES", "20"))
+
+        self._queue = []  # heap of (priority, seq, estimated_tokens, future)
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+        self._paused_until = 0.0
+
+        self._latencies = {}  # template -> recent successful call seconds
+        self._output_tokens = {}  # template -> [completion tokens, calls]
+
+        self.stats = {"admitted": 0, "rate_limited": 0, "retries": 0, "gave_up": 0, "truncated": 0,
+                      "deadline_exceeded": 0, "hedged": 0, "hedge_wins": 0, "cancelled": 0, "cancelled_tokens_saved": 0}
+        self._wait = {name: {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0} for name in PRIORITY_NAMES.values()}
+
+    @staticmethod
+    def estimate_tokens(prompt, max_tokens):
+        """Prompt tokens (plus chat framing overhead) and the full output budget."""
+        return TokenCounter.count(prompt) + 4 + max_tokens
+
+    # **Admission**
+
+    def _ensure_dispatcher(self):
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done() or self._dispatcher.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def acquire(self, estimated_tokens, priority=PRIORITY_INTERACTIVE, seq=None, deadline=None):
+        """
+        Wait until the request may be sent. Returns the queue sequence number (reuse it on retry).
+        Raises asyncio.TimeoutError if the deadline passes first.
+        """
+        seq = next(self._seq) if seq is None else seq
+        self._ensure_dispatcher()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, seq, estimated_tokens, future))
+        self._wakeup.set()
+
+        started = time.monotonic()
+        try:
+            if deadline is None:
+                await future
+            else:
+                # On timeout the future is cancelled and the dispatcher drops it
+                await asyncio.wait_for(future, max(0.0, deadline - started))
+        finally:
+            waited = time.monotonic() - started
+            wait = self._wait[PRIORITY_NAMES.get(priority, "background")]
+            wait["count"] += 1
+            wait["total_seconds"] += waited
+            wait["max_seconds"] = max(wait["max_seconds"], waited)
+        return seq
+
+    async def aclose(self):
+        """Stop the dispatcher and fail the calls still waiting for admission (application shutdown)."""
+        dispatcher, self._dispatcher = self._dispatcher, None
+        if dispatcher is not None and not dispatcher.done():
+            dispatcher.cancel()
+            try:
+                await dispatcher
+            except asyncio.CancelledError:
+                pass
+        queued, self._queue = self._queue, []
+        for _, _, _, future in queued:
+            if not future.done():
+                future.set_exception(SchedulerClosed("GPT scheduler closed"))
+
+    async def _dispatch(self):
+        while True:
+            # Drop requests whose callers gave up
+            while self._queue and self._queue[0][3].cancelled():
+                heapq.heappop(self._queue)
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            _, _, estimated_tokens, future = self._queue[0]
+            delay = max(
+                self._paused_until - time.monotonic(),
+                self.request_bucket.wait_time(1),
+                self.token_bucket.wait_time(estimated_tokens),
+            )
+            if delay > 0:
+                # Sleep, but wake early if a higher-priority request arrives
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._queue)
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(estimated_tokens)
+            self.stats["admitted"] += 1
+            future.set_result(None)
+
+    # **Requests**
+
+    @staticmethod
+    def _retry_after(error):
+        """Seconds the server asked us to wait, if it said."""
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except ValueError:
+            pass
+        return None
+
+    def _pause(self, attempt, error):
+        delay = self._retry_after(error) or min(60.0, 2.0 ** attempt)
+        delay += random.uniform(0, delay * 0.25)  # jitter so queued callers do not stampede
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    async def generate(self, prompt, model, temperature, max_tokens, priority=PRIORITY_INTERACTIVE, template=None,
+                       deadline=None):
+        """
+        Scheduled chat completion; returns the text or GPTClient's error string.
+        Past `deadline` (a time.monotonic() value) the call is given up and an error string returned.
+        """
+        estimated = self.estimate_tokens(prompt, max_tokens)
+        seq = None
+        template = template or "unlabelled"
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    seq = await self.acquire(estimated, priority, seq, deadline)
+                except SchedulerClosed as e:
+                    return f"{self.gpt_client.ERROR_PREFIX} {str(e)}"
+                except (asyncio.CancelledError, asyncio.TimeoutError):
+                    # Nothing was sent: the prompt and the reply are both saved
+                    self.record_cancelled(template, "queued", estimated - max_tokens
+                                          + self.expected_output_tokens(template, max_tokens))
+                    raise
+                try:
+                    response = await self._send(prompt, model, temperature, max_tokens, priority, template, deadline)
+                except asyncio.TimeoutError:
+                    raise
+                except Exception as e:
+                    if not self.gpt_client.is_rate_limit(e):
+                        return f"{self.gpt_client.ERROR_PREFIX} {str(e)}"
+                    self.stats["rate_limited"] += 1
+                    self._pause(attempt, e)
+                    if attempt == self.max_retries:
+                        self.stats["gave_up"] += 1
+                        return f"{self.gpt_client.ERROR_PREFIX} {str(e)}"
+                    self.stats["retries"] += 1
+                    continue
+
+                usage = getattr(response, "usage", None)
+                if usage is not None and usage.total_tokens:
+                    self.token_bucket.adjust(usage.total_tokens - estimated)
+                return response.choices[0].message.content or ""
+        except asyncio.TimeoutError:
+            self.stats["deadline_exceeded"] += 1
+            return f"{self.gpt_client.ERROR_PREFIX} deadline exceeded"
+
+    async def _call(self, prompt, model, temperature, max_tokens, template):
+        """One upstream request, timed into GPT_UPSTREAM_SECONDS (successes also feed hedge_delay and the savings estimate)."""
+        started = time.perf_counter()
+        try:
+            response = await self.gpt_client.create_completion_async(prompt, model, temperature, max_tokens)
+        except asyncio.CancelledError:
+            GPT_UPSTREAM_SECONDS.observe(time.perf_counter() - started, template, model, "cancelled")
+            raise
+        except Exception as e:
+            outcome = "rate_limited" if self.gpt_client.is_rate_limit(e) else "error"
+            GPT_UPSTREAM_SECONDS.observe(time.perf_counter() - started, template, model, outcome)
+            raise
+        elapsed = time.perf_counter() - started
+        GPT_UPSTREAM_SECONDS.observe(elapsed, template, model, "ok")
+        if response.choices and response.choices[0].finish_reason == "length":
+            # The reply hit max_tokens: the route's output budget is too small for it
+            self.stats["truncated"] += 1
+            GPT_TRUNCATED.inc(template, model)
+        self._latencies.setdefault(template, collections.deque(maxlen=HEDGE_WINDOW)).append(elapsed)
+        usage = getattr(response, "usage", None)
+        if usage is not None and usage.completion_tokens:
+            totals = self._output_tokens.setdefault(template, [0, 0])
+            totals[0] += usage.completion_tokens
+            totals[1] += 1
+        return response
+
+    async def _send(self, prompt, model, temperature, max_tokens, priority, template, deadline):
+        """
+        One admitted attempt, hedged when enabled: a second identical request goes out once
+        the first has run past the hedge delay, and the first success wins. Requests still
+        running when this returns or raises (loser, deadline, caller cancelled) are cancelled.
+        """
+        started = time.monotonic()
+        hedge_delay = self.hedge_delay(template) if priority == PRIORITY_INTERACTIVE else None
+        tasks = [asyncio.create_task(self._call(prompt, model, temperature, max_tokens, template))]
+        winner, failure = None, None
+        try:
+            while True:
+                pending = [task for task in tasks if not task.done()]
+                if not pending:
+                    break
+                now = time.monotonic()
+                timeout = None if deadline is None else deadline - now
+                if hedge_delay is not None:
+                    until_hedge = started + hedge_delay - now
+                    timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+                done, _ = await asyncio.wait(pending, timeout=None if timeout is None else max(0.0, timeout),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        break
+                    failure = failure or task.exception()
+                if winner is not None:
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise asyncio.TimeoutError()
+                if not done and hedge_delay is not None:
+                    hedge_delay = None  # at most one hedge per attempt
+                    if self._admit_hedge(self.estimate_tokens(prompt, max_tokens)):
+                        self.stats["hedged"] += 1
+                        tasks.append(asyncio.create_task(self._call(prompt, model, temperature, max_tokens, template)))
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    self.record_cancelled(template, "hedge_loser" if winner is not None else "in_flight",
+                                          self.expected_output_tokens(template, max_tokens))
+            if len(tasks) > 1:
+                hedge_won = winner is tasks[1]
+                self.stats["hedge_wins"] += int(hedge_won)
+                GPT_HEDGES.inc(template, "none" if winner is None else "hedge" if hedge_won else "primary")
+        if winner is None:
+            raise failure
+        return winner.result()
+
+    # **Hedging and cancellation accounting**
+
+    def hedge_delay(self, template):
+        """Seconds after which a call of this template is hedged (None: hedging off or too few samples)."""
+        samples = self._latencies.get(template)
+        if not self.hedging or samples is None or len(samples) < self.hedge_min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))]
+
+    def _admit_hedge(self, estimated_tokens):
+        """Hedges skip the queue but only go out when the rate limits have room right now."""
+        if self._paused_until > time.monotonic() or self.request_bucket.wait_time(1) or \
+                self.token_bucket.wait_time(estimated_tokens):
+            return False
+        self.request_bucket.consume(1)
+        self.token_bucket.consume(estimated_tokens)
+        return True
+
+    def expected_output_tokens(self, template, max_tokens):
+        """Mean completion tokens of recent calls of this template, capped at max_tokens."""
+        total, calls = self._output_tokens.get(template or "unlabelled", (0, 0))
+        return min(max_tokens, round(total / calls)) if calls else max_tokens
+
+    def record_cancelled(self, template, stage, tokens_saved):
+        template = template or "unlabelled"
+        self.stats["cancelled"] += 1
+        self.stats["cancelled_tokens_saved"] += tokens_saved
+        GPT_CANCELLED.inc(template, stage)
+        GPT_CANCELLED_TOKENS.inc(template, amount=tokens_saved)
+
+    def get_stats(self):
+        """Queue depth per priority class, admission wait times, rate-limit, deadline, hedging and cancellation counters."""
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, _, future in self._queue:
+            if not future.cancelled():
+                depth[PRIORITY_NAMES.get(priority, "background")] += 1
+        wait = {
+            name: {
+                "count": values["count"],
+                "avg_seconds": round(values["total_seconds"] / values["count"], 4) if values["count"] else 0.0,
+                "max_seconds": round(values["max_seconds"], 4),
+            }
+            for name, values in self._wait.items()
+        }
+        return {
+            **self.stats,
+            "hedge_win_rate": round(self.stats["hedge_wins"] / self.stats["hedged"], 4) if self.stats["hedged"] else 0.0,
+            "queue_depth": depth,
+            "wait": wait,
+            "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 3),
+        }
@@ -1,11 +1,258 @@
 import asyncio
+import json
+import time
+from pydantic import BaseModel, ValidationError
 from backend.nlp.GPTClient import GPTClient
+from backend.nlp.GPTScheduler import GPTScheduler, PRIORITY_INTERACTIVE, SchedulerClosed
+from backend.nlp.ModelRouter import ModelRouter
+from backend.nlp.TokenCounter import TokenCounter, TokenUsage
+from backend.utils.Metrics import GPT_ERRORS, GPT_UPSTREAM_SECONDS
+from backend.utils.ResponseCache import ResponseCache
+from backend.utils.Tracing import Tracing
+
+class CombinedPlanResponse(BaseModel):
+    """Schema of the single-call (combined) generation mode."""
+    fitness_analysis: str
+    workout_plan: str
+    nutrition_tips: str
 
 class GPTWorkoutGenerator:
-    def __init__(self):
+    def __init__(self, cache=None):
         self.gpt_client = GPTClient()
+        self.scheduler = GPTScheduler(self.gpt_client)
+        self.router = ModelRouter()
+        self.cache = cache if cache is not None else ResponseCache()
+        self.token_usage = TokenUsage()
+
+        # Single-flight: identical in-flight requests share one upstream task ({"task", "waiters"})
+        self._in_flight = {}
+        self.single_flight_stats = {"upstream_calls": 0, "deduplicated": 0}
+
+    @staticmethod
+    def is_error(response):
+        """True for the error strings GPTClient returns instead of raising."""
+        return response.startswith(GPTClient.ERROR_PREFIX)
+
+    def resolve(self, model, temperature, max_tokens, template=None, endpoint=None, duration=None, variant=None):
+        """
+        (metrics label, model, temperature, max_tokens) for a call: whatever the caller leaves as
+        None comes from the template's route (ModelRouter), with the budget scaled to `duration`.
+        """
+        route = self.router.route(template, endpoint, duration, variant)
+        return (
+            route["label"],
+            model or route["model"],
+            route["temperature"] if temperature is None else temperature,
+            max_tokens or route["max_tokens"],
+        )
+
+    async def generate_response_async(self, prompt, model=None, temperature=None, max_tokens=None, use_cache=True,
+                                      priority=PRIORITY_INTERACTIVE, template=None, endpoint=None, deadline=None,
+                                      duration=None, variant=None):
+        """
+        Asynchronous GPT response generation, served from the cache or coalesced with identical in-flight calls.
+        Model, temperature and max_tokens default to the route of the template (see ModelRouter).
+        Past `deadline` (a time.monotonic() value) an error string is returned instead of waiting longer.
+        """
+        label, model, temperature, max_tokens = self.resolve(
+            model, temperature, max_tokens, template, endpoint, duration, variant
+        )
+        key = ResponseCache.make_key(prompt, model, temperature, max_tokens)
+
+        if self.cache.enabled:
+            if use_cache:
+                cached = await self.cache.get_async(key)
+                if cached is not None:
+                    return cached
+            else:
+                self.cache.record_bypass()
+
+        return await self._single_flight(key, prompt, model, temperature, max_tokens, priority, (label, endpoint),
+                                         deadline)
+
+    async def generate_combined_async(self, prompt, model=None, temperature=None, max_tokens=None, use_cache=True,
+                                      priority=PRIORITY_INTERACTIVE, endpoint=None, deadline=None, duration=None):
+        """
+        Single-call generation of all three sections from PromptTemplates.combined_plan_prompt.
+        Returns a CombinedPlanResponse, or None when the reply is not valid JSON for the schema
+        (the caller then falls back to the three-call path).
+        """
+        _, model, temperature, max_tokens = self.resolve(
+            model, temperature, max_tokens, "combined_plan_prompt", endpoint, duration
+        )
+        response = await self.generate_response_async(prompt, model, temperature, max_tokens, use_cache, priority,
+                                                      "combined_plan_prompt", endpoint, deadline)
+        if self.is_error(response):
+            return None
+
+        try:
+            return self.parse_combined(response)
+        except (ValueError, ValidationError):
+            # Do not keep serving a reply that cannot be parsed
+            self.cache.delete(ResponseCache.make_key(prompt, model, temperature, max_tokens))
+            return None
+
+    @staticmethod
+    def parse_combined(response):
+        """Validate a combined-mode reply, tolerating code fences or text around the JSON object."""
+        start, end = response.find("{"), response.rfind("}")
+        if start == -1 or end == -1:
+            raise ValueError("No JSON object in response")
+        data = json.loads(response[start:end + 1])
+        if not isinstance(data, dict):
+            raise ValueError("Response JSON is not an object")
+        return CombinedPlanResponse(**data)
+
+    async def stream_response_async(self, prompt, model=None, temperature=None, max_tokens=None, use_cache=True,
+                                    priority=PRIORITY_INTERACTIVE, template=None, endpoint=None, deadline=None,
+                                    duration=None, variant=None):
+        """
+        Yields response text deltas; a cached response is yielded as a single delta.
+        Past `deadline` the upstream stream is closed and an error string is yielded.
+        """
+        template, model, temperature, max_tokens = self.resolve(
+            model, temperature, max_tokens, template, endpoint, duration, variant
+        )
+        key = ResponseCache.make_key(prompt, model, temperature, max_tokens)
+
+        if self.cache.enabled:
+            if use_cache:
+                cached = await self.cache.get_async(key)
+                if cached is not None:
+                    yield cached
+                    return
+            else:
+                self.cache.record_bypass()
+
+        # Streams are admitted by the scheduler but not retried
+        try:
+            await self.scheduler.acquire(self.scheduler.estimate_tokens(prompt, max_tokens), priority, deadline=deadline)
+        except asyncio.TimeoutError:
+            self.scheduler.stats["deadline_exceeded"] += 1
+            yield f"{GPTClient.ERROR_PREFIX} deadline exceeded"
+            return
+        except SchedulerClosed as e:
+            yield f"{GPTClient.ERROR_PREFIX} {str(e)}"
+            return
+
+        parts = []
+        failed = False
+        finished = False
+        started = time.perf_counter()
+        upstream = self.gpt_client.stream_response_async(prompt, model, temperature, max_tokens)
+        try:
+            with Tracing.span("gpt_stream", template=template, endpoint=endpoint):
+                while True:
+                    try:
+                        if deadline is None:
+                            delta = await anext(upstream)
+                        else:
+                            delta = await asyncio.wait_for(anext(upstream), max(0.0, deadline - time.monotonic()))
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        self.scheduler.stats["deadline_exceeded"] += 1
+                        self._record_stream_cancelled(template, max_tokens, parts)
+                        delta = f"{GPTClient.ERROR_PREFIX} deadline exceeded"
+                    failed = failed or delta.startswith(GPTClient.ERROR_PREFIX)
+                    parts.append(delta)
+                    yield delta
+                    if failed:
+                        break
+            finished = not failed
+        finally:
+            if not finished:
+                # Deadline, upstream error or the consumer went away: close the upstream stream
+                await upstream.aclose()
+                if not failed:
+                    self._record_stream_cancelled(template, max_tokens, parts)
+        GPT_UPSTREAM_SECONDS.observe(time.perf_counter() - started, template or "unlabelled", model,
+                                     "error" if failed else "ok")
+
+        # Only complete, successful streams are cached
+        if failed:
+            GPT_ERRORS.inc(template or "unlabelled")
+        else:
+            response = "".join(parts)
+            self.token_usage.record(prompt, response, template, endpoint, model)
+            if self.cache.enabled:
+                await self.cache.set_async(key, response)
+
+    def _record_stream_cancelled(self, template, max_tokens, parts):
+        """Count a stream closed early, saving the expected reply length minus what was already received."""
+        received = TokenCounter.count("".join(parts))
+        expected = self.scheduler.expected_output_tokens(template, max_tokens)
+        self.scheduler.record_cancelled(template, "in_flight", max(0, expected - received))
+
+    async def _single_flight(self, key, prompt, model, temperature, max_tokens, priority, labels=(None, None),
+                             deadline=None):
+        """
+        Await the shared upstream task for key, starting it if none is in flight.
+        The task itself runs without a deadline, since callers joining later may have later ones: each
+        caller waits only until its own deadline, and when the last caller waiting on a task gives up
+        (cancelled or past its deadline), the task is cancelled.
+        """
+        flight = self._in_flight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(self._fetch(key, prompt, model, temperature, max_tokens, priority, labels))
+            flight = self._in_flight[key] = {"task": task, "waiters": 0}
+            task.add_done_callback(lambda done: self._release(key, done))
+            self.single_flight_stats["upstream_calls"] += 1
+        else:
+            self.single_flight_stats["deduplicated"] += 1
+
+        flight["waiters"] += 1
+        try:
+            # Shield so one caller cancelling does not cancel the call for the others
+            if deadline is None:
+                return await asyncio.shield(flight["task"])
+            return await asyncio.wait_for(asyncio.shield(flight["task"]), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self.scheduler.stats["deadline_exceeded"] += 1
+            return f"{GPTClient.ERROR_PREFIX} deadline exceeded"
+        finally:
+            flight["waiters"] -= 1
+            if not flight["waiters"] and not flight["task"].done():
+                flight["task"].cancel()
+
+    def _release(self, key, task):
+        flight = self._in_flight.get(key)
+        if flight is not None and flight["task"] is task:
+            del self._in_flight[key]
+
+    def in_flight_count(self):
+        """Distinct upstream calls in flight (after single-flight deduplication)."""
+        return len(self._in_flight)
+
+    async def _fetch(self, key, prompt, model, temperature, max_tokens, priority, labels=(None, None)):
+        with Tracing.span("gpt_call", template=labels[0], endpoint=labels[1]):
+            response = await self.scheduler.generate(prompt, model, temperature, max_tokens, priority, labels[0])
+
+        # Never cache upstream failures
+        if response.startswith(GPTClient.ERROR_PREFIX):
+            GPT_ERRORS.inc(labels[0] or "unlabelled")
+        else:
+            self.token_usage.record(prompt, response, *labels, model)
+            if self.cache.enabled:
+                await self.cache.set_async(key, response)
+        return response
+
+    def get_stats(self):
+        """Cache, single-flight, scheduler and token-usage counters, and the model routing table."""
+        return {
+            "cache": self.cache.get_stats(),
+            "single_flight": {**self.single_flight_stats, "in_flight": self.in_flight_count()},
+            "scheduler": self.scheduler.get_stats(),
+            "tokens": self.token_usage.get_stats(),
+            "model_routes": self.router.get_stats()["routes"],
+        }
+
+    def warm_up(self):
+        """Build the OpenAI client and load the token encoding before the first call (blocking; run it in a thread)."""
+        self.gpt_client.warm_up()
+        TokenCounter.backend()
 
-    async def generate_response_async(self, prompt):
-        """Asynchronous GPT response generation"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.gpt_client.generate_response, prompt)
+    async def aclose(self):
+        """Stop the scheduler and release the shared OpenAI connection pools."""
+        await self.scheduler.aclose()
+        await GPTClient.aclose()
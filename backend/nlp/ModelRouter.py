@@ -0,0 +1,89 @@
+import json
+import logging
+import os
+
+from backend.utils.durations import parse_weeks
+
+logger = logging.getLogger(__name__)
+
+# **Default routes, keyed by PromptTemplates function (optionally ":variant"), then endpoint, then "default"**
+# max_tokens is the output budget; routes with tokens_per_week add that much per week of the
+# requested plan duration, up to max_tokens_cap.
+DEFAULT_ROUTES = {
+    "user_fitness_analysis": {"model": "gpt-4o-mini", "temperature": 0.5, "max_tokens": 450},
+    "workout_plan_prompt": {"model": "gpt-4o", "temperature": 0.7, "max_tokens": 900,
+                            "tokens_per_week": 250, "max_tokens_cap": 4000},
+    "nutrition_tips_prompt": {"model": "gpt-4o", "temperature": 0.7, "max_tokens": 800},
+    "combined_plan_prompt": {"model": "gpt-4o", "temperature": 0.7, "max_tokens": 1700,
+                             "tokens_per_week": 250, "max_tokens_cap": 5000},
+    "user_concern_prompt": {"model": "gpt-4o-mini", "temperature": 0.7, "max_tokens": 500},
+    "user_concern_prompt:followup": {"model": "gpt-4o", "temperature": 0.7, "max_tokens": 500},
+    "conversation_summary_prompt": {"model": "gpt-4o-mini", "temperature": 0.2, "max_tokens": 250},
+    "default": {"model": "gpt-4o", "temperature": 0.7, "max_tokens": 500},
+}
+
+class ModelRouter:
+    """
+    Picks the model, temperature and output budget of a GPT call from a routing table.
+
+    Routes are looked up by template (with ":variant" first when a variant is given, e.g.
+    follow-up concerns that carry conversation history), then by endpoint, then "default".
+    Short tasks (fitness analysis, first-turn concerns, summaries) go to a faster model by
+    default, and the workout plan budget grows with the requested duration (read by
+    backend.utils.durations.parse_weeks, as FallbackPlanEngine lays plans out) so
+    multi-week plans are not cut off. Each call is labelled with its route name in the GPT latency,
+    token and truncation metrics.
+
+    Configured through environment variables:
+    - MODEL_ROUTES: JSON object, or path to a JSON file, of routes to add or override, e.g.
+      {"workout_plan_prompt": {"model": "gpt-4.1"}, "/user-concerns": {"max_tokens": 300}};
+      fields not given keep their default
+    """
+
+    def __init__(self, routes=None):
+        self.routes = {name: dict(route) for name, route in DEFAULT_ROUTES.items()}
+        overrides = routes if routes is not None else self._load_overrides(os.getenv("MODEL_ROUTES"))
+        for name, route in overrides.items():
+            self.routes[name] = {**self.routes.get(name, self.routes["default"]), **route}
+
+    @staticmethod
+    def _load_overrides(config):
+        if not config:
+            return {}
+        try:
+            if config.lstrip().startswith("{"):
+                overrides = json.loads(config)
+            else:
+                with open(config, encoding="utf-8") as source:
+                    overrides = json.load(source)
+            if not isinstance(overrides, dict) or not all(isinstance(route, dict) for route in overrides.values()):
+                raise ValueError("expected an object of route objects")
+        except (OSError, ValueError) as e:
+            logger.error("Ignoring MODEL_ROUTES: %s", e)
+            return {}
+        return overrides
+
+    def route_name(self, template=None, endpoint=None, variant=None):
+        for name in (variant and template and f"{template}:{variant}", template, endpoint):
+            if name and name in self.routes:
+                return name
+        return "default"
+
+    def route(self, template=None, endpoint=None, duration=None, variant=None):
+        """
+        {"name", "label", "model", "temperature", "max_tokens"} for a call. label names the call in
+        metrics: the route when it is specific to the template, else the template itself.
+        """
+        name = self.route_name(template, endpoint, variant)
+        route = self.routes[name]
+        max_tokens = int(route["max_tokens"])
+        if duration and route.get("tokens_per_week"):
+            weeks = parse_weeks(duration)
+            max_tokens = min(int(route.get("max_tokens_cap", max_tokens)),
+                             max_tokens + int(round(route["tokens_per_week"] * weeks)))
+        label = name if template is None or name in (template, f"{template}:{variant}") else template
+        return {"name": name, "label": label, "model": route["model"], "temperature": float(route["temperature"]),
+                "max_tokens": max_tokens}
+
+    def get_stats(self):
+        return {"routes": {name: dict(route) for name, route in self.routes.items()}}
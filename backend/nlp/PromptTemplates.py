@@ -1,4 +1,319 @@
+import re
+import textwrap
+
+# Emoji, pictographs and the variation selector / zero-width joiner that decorate them
+_DECORATION = re.compile("[\U0001F000-\U0001FAFF\u2600-\u27BF\uFE0F\u200D]")
+_SPACES = re.compile(r"[ \t]+")
+
+
+def compile_template(text):
+    """
+    Normalize a prompt template once at import time: dedent, drop emoji and markdown
+    bold markers, collapse runs of spaces and blank lines. The model reads the
+    instructions the same way, but every call sends fewer input tokens.
+    """
+    text = _DECORATION.sub("", textwrap.dedent(text)).replace("**", "")
+    lines = []
+    for line in text.splitlines():
+        line = _SPACES.sub(" ", line).strip()
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return "\n".join(lines).strip()
+
+
+# **Reusable instruction fragments**
+
+_EXPERIENCE_MODIFIER = {
+    "beginner": "Use simple and easy-to-follow exercise instructions with clear explanations.",
+    "intermediate": "Use structured progressive overload training to help the user build strength and endurance.",
+    "expert": "Include advanced strength training techniques, high-intensity conditioning, and periodization strategies."
+}
+_DEFAULT_EXPERIENCE = "Provide a well-balanced structured training plan."
+_HOME_LOCATION = "Design the workout using bodyweight exercises, resistance bands, and dumbbells (if available). Avoid exercises requiring large gym machines."
+_GYM_LOCATION = "Include full gym workouts with machines, barbells, and free weights to maximize strength and conditioning."
+_STRENGTH_PREFERENCE = "Focus on heavy compound movements like squats, deadlifts, bench press, and overhead press. Use progressive overload principles and ensure proper recovery."
+_CARDIO_PREFERENCE = "Prioritize endurance-based exercises such as HIIT, steady-state running, cycling, and jump rope. Optimize for cardiovascular improvement and stamina."
+_HYBRID_PREFERENCE = "Design a hybrid training plan that includes both strength training and cardiovascular workouts for balanced fitness development."
+
+_GOAL_BASED_NUTRITION = {
+    "muscle gain": compile_template("** Muscle Gain:** High-protein diet with complex carbohydrates and healthy fats."),
+    "weight loss": compile_template("** Weight Loss:** Caloric deficit, fiber-rich foods, and lean proteins."),
+    "weight gain": compile_template("** Healthy Weight Gain:** Increase healthy calorie intake through nutrient-dense foods.")
+}
+_DEFAULT_NUTRITION = compile_template("** General Nutrition Plan:** Balanced macronutrients.")
+
+_BMI_GUIDANCE = {
+    "underweight": compile_template("** Underweight:** Prioritize calorie-dense, high-protein meals to support weight gain."),
+    "normal": compile_template("** Normal Weight:** Maintain a balanced macronutrient intake for overall health."),
+    "overweight": compile_template("** Overweight:** Focus on portion control, high-fiber meals, and steady energy balance."),
+    "obese": compile_template("**Obese:** Reduce calorie intake, prioritize whole foods, and maintain hydration.")
+}
+
+_NO_MEDICAL_WARNING = compile_template(" **No medical restrictions detected. Proceed with workouts safely.**")
+_MEDICAL_WARNING = compile_template(" **Medical conditions detected. Consult a doctor before starting any intense workouts.**")
+_SAFE_TO_EXERCISE = compile_template(" **Safe to exercise with structured progression.**")
+_EXERCISE_NOT_RECOMMENDED = compile_template(" **Exercise Not Recommended. Consult a doctor before engaging in workouts.**")
+_WORKOUT_MEDICAL_ADVISORY = compile_template(" **Medical Advisory:** The user has hypertension or diabetes. Ensure all exercises are safe and avoid excessive high-intensity stress. Always recommend consulting a medical professional before starting this program.")
+_NUTRITION_MEDICAL_ADVISORY = compile_template(" **Medical Advisory:** The user has hypertension or diabetes. Recommend heart-healthy, low-sodium, and balanced blood sugar meals. Advise consultation with a medical professional.")
+_COMBINED_MEDICAL_ADVISORY = "The user has hypertension or diabetes: keep exercises safe, avoid excessive high-intensity stress, recommend heart-healthy, low-sodium, blood-sugar-friendly meals, and advise consulting a medical professional."
+_COMBINED_NO_MEDICAL_ADVISORY = "No medical restrictions detected."
+
+_CONCERN_GUIDANCE = {
+    "injury prevention": compile_template("** Injury Prevention Tips:** Ensure proper warm-up, maintain good form, and avoid overtraining."),
+    "motivation": compile_template("** Staying Motivated:** Set realistic goals, track progress, and find a supportive workout environment."),
+    "workout recovery": compile_template("** Recovery & Rest:** Prioritize sleep, stretch regularly, and stay hydrated for optimal muscle recovery."),
+    "nutrition guidance": compile_template("** Nutrition Basics:** Balance protein, carbs, and healthy fats for sustained energy and performance."),
+    "supplements": compile_template("** Supplement Use:** Consult a professional before taking supplements to ensure they match your fitness goals."),
+    "joint health": compile_template("** Joint Protection:** Strengthen stabilizing muscles, use controlled movements, and avoid excessive impact."),
+    "mental health": compile_template("** Mental Well-being:** Regular exercise can reduce stress, improve focus, and enhance overall mood."),
+    "muscle soreness": compile_template("** Managing Soreness:** Use foam rolling, gentle stretching, and adequate hydration for faster recovery.")
+}
+_GENERAL_CONCERN_GUIDANCE = compile_template("**📌 General Wellness Advice:** Stay consistent, listen to your body, and adapt workouts as needed.")
+
+# **Templates (compiled once at import, filled with str.format)**
+
+_FITNESS_ANALYSIS_TEMPLATE = compile_template("""
+    ## Generate a User Fitness Overview (DO NOT Include a Workout Plan)
+
+    **User Profile:**
+    - **BMI Status:** {bmi_status}
+    - **Hypertension:** {hypertension}
+    - **Diabetes:** {diabetes}
+    - **Age:** {age}
+    - **Workout Location:** {workout_location}
+    - **Workout Experience Level:** {experience_level}
+
+    **Medical & Health Advisory:**
+    {medical_warning}
+
+    **Exercise Recommendation:**
+    {exercise_advisory}
+
+    ### **Instructions for GPT:**
+    - **DO NOT generate any workout plan here.**
+    - **ONLY summarize the user's current fitness condition.**
+    - **Provide a clear and concise analysis of their fitness level.**
+    - **Avoid excessive detail—keep it structured and to the point.**
+    - **Format the output cleanly in markdown for readability.**
+    - **Use human friendly lanuage tone, do not address as user,or individual use you (you have)**
+""")
+
+_WORKOUT_PLAN_TEMPLATE = compile_template("""
+    ## Generate a Structured {duration} Workout Plan
+
+    **User Details:**
+    - **Fitness Goal:** {fitness_goal}
+    - **Workout Experience Level:** {experience_level}
+    - **Workout Preference:** {workout_preference}
+    - **Workout Location:** {workout_location}
+
+    **Instructions for GPT:**
+    - **You MUST return the output in the following structured format:**
+
+    ### **Output Pattern & Flow**
+    1. **Introduction (1-2 lines MAX)**
+    - Summarize the workout goal and experience level.
+    - Do **not** include fitness assessment—only a brief context.
+
+    2️ **Table Format Workout Plan**
+    - Provide a **markdown table** with the following columns:
+        - `Day`, `Exercise`, `Sets`, `Reps`, `Equipment Needed`, `Additional Notes`
+    - Ensure a mix of **warm-up, main exercises, and cool-down/stretching** for each session.
+    - **If the user is a beginner**, provide **brief step-by-step execution instructions** in "Additional Notes".
+    - **If the user is an expert**, use **advanced fitness terminology** and strategies such as **periodization and progressive overload**.
+
+    3️ **Progression & Scaling**
+    - Explain how intensity increases weekly for progression.
+    - Include guidance on when to increase weights or reps.
+
+    4️ **Medical & Recovery Advisory (If Applicable)**
+    - **If user has hypertension/diabetes**, include a line advising them to consult a medical professional.
+    - Emphasize the importance of **hydration, mobility work, and recovery**.
+
+    **Additional Guidelines for GPT:**
+    - Use **structured markdown formatting** with a **clean and professional layout**.
+    - **DO NOT** provide random tips or unrelated fitness advice—stay within the structured scope.
+    - Ensure each workout day is well-defined and **logically progressive**.
+    - Keep the response **clear, structured, and professional**.
+    - **Your response must ONLY include the requested information—nothing extra.**
+    - in the final output there need to be a table that represent whole time of the workout plan
+    - in the final output if there is a medical condition like hypertension or diabetes, there need to be a line that advise the user to consult a medical professional
+
+    {experience_instructions}
+    {location_instruction}
+    {workout_instruction}
+    {medical_advisory}
+""")
+
+_NUTRITION_TEMPLATE = compile_template("""
+    ## 🍽 Generate a Structured Nutrition Plan (No Workout Plan)
+
+    **User Profile:**
+    - **BMI Status:** {bmi_guidance}
+    - **Fitness Goal:** {fitness_goal}
+    - **Hypertension:** {hypertension}
+    - **Diabetes:** {diabetes}
+
+    {nutrition_focus}
+
+    ** Hydration Tip:** Aim for 2.5-3L water per day.
+
+    {medical_advisory}
+
+    ### **Instructions for GPT:**
+    - **ONLY generate a structured nutrition plan based on BMI and fitness goals.**
+    - **DO NOT provide a workout plan or fitness assessment.**
+    - **Provide a markdown table with meal recommendations, divided into Breakfast, Lunch, Dinner, and Snacks.**
+    - **Ensure the meal plan aligns with the user’s dietary needs and medical conditions.**
+    - **Keep the response structured, clear, and professional.**
+""")
+
+_COMBINED_TEMPLATE = compile_template("""
+    ## Generate a Fitness Overview, a {duration} Workout Plan and a Nutrition Plan
+
+    **User Profile:**
+    - **BMI Status:** {bmi_status}
+    - **Age:** {age}
+    - **Hypertension:** {hypertension}
+    - **Diabetes:** {diabetes}
+    - **Fitness Goal:** {fitness_goal}
+    - **Workout Experience Level:** {experience_level}
+    - **Workout Preference:** {workout_preference}
+    - **Workout Location:** {workout_location}
+
+    **Medical Advisory:** {medical_advisory}
+    **Exercise Recommendation:** {exercise_advisory}
+
+    ### **Return ONLY a JSON object with exactly these string fields (markdown inside each value):**
+    - `fitness_analysis`: a concise, structured summary of the user's current fitness condition. No workout plan. Address the user as "you".
+    - `workout_plan`: a 1-2 line introduction, then a markdown table covering the whole plan with columns `Day`, `Exercise`, `Sets`, `Reps`, `Equipment Needed`, `Additional Notes` (warm-up, main exercises and cool-down each session), then progression guidance and a recovery/medical advisory. {experience_instructions} {location_instruction} {workout_instruction}
+    - `nutrition_tips`: a markdown table of meal recommendations divided into Breakfast, Lunch, Dinner and Snacks. {nutrition_focus} Aim for 2.5-3L water per day. No workout plan.
+
+    Do not wrap the JSON in code fences and do not add any text outside it.
+""")
+
+_USER_PROFILE_SUMMARY_TEMPLATE = compile_template("""
+    **User Profile (For Context):**
+    - **Fitness Goal:** {fitness_goal}
+    - **Experience Level:** {experience_level}
+    - **Workout Preference:** {workout_preference}
+    - **Workout Location:** {workout_location}
+    - **Medical Conditions:** Hypertension: {hypertension}, Diabetes: {diabetes}
+""")
+
+_USER_CONCERN_TEMPLATE = compile_template("""
+    ## 🏋️ Addressing Your Concern: {concern_title}
+
+    {specific_guidance}
+
+    ### **Instructions for GPT:**
+    - **Provide a structured, friendly response addressing this concern.**
+    - **Avoid technical jargon—keep the explanation simple and actionable.**
+    - **Ensure the tone is warm, supportive, and motivating.**
+    - **Use direct language, referring to the user as 'you' instead of 'individual' or 'user'.**
+    - **Format the response clearly using markdown for better readability.**
+    - **Limit the response to practical, easy-to-follow advice without unnecessary details.**
+""")
+
+_CONVERSATION_SUMMARY_BLOCK = compile_template("""
+    **Earlier in this conversation (summary):**
+    {summary}
+""")
+
+_CONVERSATION_TURN = compile_template("""
+    **You asked:** {concern}
+    **Coach answered:** {response}
+""")
+
+_CONVERSATION_SUMMARY_TEMPLATE = compile_template("""
+    ## Update the Conversation Summary
+
+    **Current summary:**
+    {summary}
+
+    **New exchanges to fold in:**
+    {turns}
+
+    ### **Instructions for GPT:**
+    - **Return ONLY the updated summary as short bullet points, at most {max_words} words.**
+    - **Keep the user's questions, stated problems, constraints and any advice they were given.**
+    - **Drop greetings, repetition and formatting.**
+""")
+
+
+class _FieldRecorder(dict):
+    """Profile stand-in that records which fields a template reads, by attribute or by key."""
+
+    def __init__(self, fields):
+        super().__init__(fields)
+        self.read = set()
+
+    def __getitem__(self, name):
+        self.read.add(name)
+        return super().__getitem__(name)
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def get(self, name, default=None):
+        self.read.add(name)
+        return super().get(name, default)
+
+
 class PromptTemplates:
+    # Response section -> template that produces it (labels for token accounting)
+    SECTION_TEMPLATES = {
+        "fitness_analysis": "user_fitness_analysis",
+        "workout_plan": "workout_plan_prompt",
+        "nutrition_tips": "nutrition_tips_prompt",
+    }
+
+    # Derived values each section template takes as arguments besides the profile
+    SECTION_DERIVED_INPUTS = {
+        "fitness_analysis": frozenset({"bmi", "recommendation_level"}),
+        "workout_plan": frozenset(),
+        "nutrition_tips": frozenset({"bmi"}),
+    }
+
+    # Input-token ceilings per template (offline TokenCounter estimate, worst case over the
+    # categorical profile grid, ~10% headroom); checked by backend/benchmarks/prompt_tokens.py
+    TOKEN_BUDGETS = {
+        "user_fitness_analysis": 210,
+        "workout_plan_prompt": 640,
+        "nutrition_tips_prompt": 245,
+        "combined_plan_prompt": 470,
+        "user_concern_prompt": 215,
+    }
+
+    @staticmethod
+    def _has_medical_condition(hypertension, diabetes):
+        return hypertension.lower() == "yes" or diabetes.lower() == "yes"
+
+    @staticmethod
+    def _workout_instructions(user_input):
+        """
+        Experience, location and preference instructions shared by the workout prompts.
+        """
+
+        # **Experience-Based Customization**
+        experience_instructions = _EXPERIENCE_MODIFIER.get(user_input.experience_level.lower(), _DEFAULT_EXPERIENCE)
+
+        # **Workout Location Adjustments**
+        location_instruction = _HOME_LOCATION if user_input.workout_location.lower() == "home" else _GYM_LOCATION
+
+        # **Workout Preference Customization**
+        if user_input.workout_preference.lower() == "strength training":
+            workout_instruction = _STRENGTH_PREFERENCE
+        elif user_input.workout_preference.lower() == "cardio":
+            workout_instruction = _CARDIO_PREFERENCE
+        else:
+            workout_instruction = _HYBRID_PREFERENCE
+
+        return experience_instructions, location_instruction, workout_instruction
+
     @staticmethod
     def user_fitness_analysis(user_input, recommendation_level, bmi_value):
         """
@@ -14,42 +329,26 @@ class PromptTemplates:
         )
 
         # **Medical Condition Advisory**
-        medical_warning = " **No medical restrictions detected. Proceed with workouts safely.**"
-        if user_input.hypertension.lower() == "yes" or user_input.diabetes.lower() == "yes":
-            medical_warning = " **Medical conditions detected. Consult a doctor before starting any intense workouts.**"
+        medical_warning = _NO_MEDICAL_WARNING
+        if PromptTemplates._has_medical_condition(user_input.hypertension, user_input.diabetes):
+            medical_warning = _MEDICAL_WARNING
 
         # **Exercise Recommendation Based on Rule-Based Level**
-        exercise_advisory = " **Safe to exercise with structured progression.**"
+        exercise_advisory = _SAFE_TO_EXERCISE
         if recommendation_level in [0, 1]:
-            exercise_advisory = " **Exercise Not Recommended. Consult a doctor before engaging in workouts.**"
+            exercise_advisory = _EXERCISE_NOT_RECOMMENDED
 
         # **Final Instruction for GPT**
-        return f"""
-        ## Generate a User Fitness Overview (DO NOT Include a Workout Plan)
-
-        **User Profile:**
-        - **BMI Status:** {bmi_status}
-        - **Hypertension:** {user_input.hypertension}
-        - **Diabetes:** {user_input.diabetes}
-        - **Age:** {user_input.age}
-        - **Workout Location:** {user_input.workout_location}
-        - **Workout Experience Level:** {user_input.experience_level}
-
-        **Medical & Health Advisory:**  
-        {medical_warning}
-
-        **Exercise Recommendation:**  
-        {exercise_advisory}
-
-        ### **Instructions for GPT:**
-        - **DO NOT generate any workout plan here.**  
-        - **ONLY summarize the user's current fitness condition.**  
-        - **Provide a clear and concise analysis of their fitness level.**  
-        - **Avoid excessive detail—keep it structured and to the point.**  
-        - **Format the output cleanly in markdown for readability.**  
-        - **Use human friendly lanuage tone, do not address as user,or individual use you (you have)**
-        """
-
+        return _FITNESS_ANALYSIS_TEMPLATE.format(
+            bmi_status=bmi_status,
+            hypertension=user_input.hypertension,
+            diabetes=user_input.diabetes,
+            age=user_input.age,
+            workout_location=user_input.workout_location,
+            experience_level=user_input.experience_level,
+            medical_warning=medical_warning,
+            exercise_advisory=exercise_advisory
+        )
 
     @staticmethod
     def workout_plan_prompt(user_input):
@@ -57,82 +356,29 @@ class PromptTemplates:
         Generates a structured GPT instruction prompt for workout plan creation based on user input.
         """
 
-        # **Experience-Based Customization**
-        experience_modifier = {
-            "beginner": "Use simple and easy-to-follow exercise instructions with clear explanations.",
-            "intermediate": "Use structured progressive overload training to help the user build strength and endurance.",
-            "expert": "Include advanced strength training techniques, high-intensity conditioning, and periodization strategies."
-        }
-        experience_instructions = experience_modifier.get(user_input.experience_level.lower(), "Provide a well-balanced structured training plan.")
-
-        # **Workout Location Adjustments**
-        if user_input.workout_location.lower() == "home":
-            location_instruction = "Design the workout using bodyweight exercises, resistance bands, and dumbbells (if available). Avoid exercises requiring large gym machines."
-        else:
-            location_instruction = "Include full gym workouts with machines, barbells, and free weights to maximize strength and conditioning."
-
-        # **Workout Preference Customization**
-        if user_input.workout_preference.lower() == "strength training":
-            workout_instruction = "Focus on heavy compound movements like squats, deadlifts, bench press, and overhead press. Use progressive overload principles and ensure proper recovery."
-        elif user_input.workout_preference.lower() == "cardio":
-            workout_instruction = "Prioritize endurance-based exercises such as HIIT, steady-state running, cycling, and jump rope. Optimize for cardiovascular improvement and stamina."
-        else:
-            workout_instruction = "Design a hybrid training plan that includes both strength training and cardiovascular workouts for balanced fitness development."
+        experience_instructions, location_instruction, workout_instruction = PromptTemplates._workout_instructions(user_input)
 
         # **Medical Advisory (Dynamically Included)**
         medical_advisory = ""
-        if user_input.hypertension.lower() == "yes" or user_input.diabetes.lower() == "yes":
-            medical_advisory = " **Medical Advisory:** The user has hypertension or diabetes. Ensure all exercises are safe and avoid excessive high-intensity stress. Always recommend consulting a medical professional before starting this program."
+        if PromptTemplates._has_medical_condition(user_input.hypertension, user_input.diabetes):
+            medical_advisory = _WORKOUT_MEDICAL_ADVISORY
 
         # **Final Instruction for GPT**
-        return f"""
-        ## Generate a Structured {user_input.duration} Workout Plan
-
-        **User Details:**
-        - **Fitness Goal:** {user_input.fitness_goal}
-        - **Workout Experience Level:** {user_input.experience_level}
-        - **Workout Preference:** {user_input.workout_preference}
-        - **Workout Location:** {user_input.workout_location}
-
-        **Instructions for GPT:**
-        - **You MUST return the output in the following structured format:**
-        
-        ### **Output Pattern & Flow**
-         **Introduction (1-2 lines MAX)**  
-        - Summarize the workout goal and experience level.  
-        - Do **not** include fitness assessment—only a brief context.  
-        
-        2️ **Table Format Workout Plan**  
-        - Provide a **markdown table** with the following columns:  
-            - `Day`, `Exercise`, `Sets`, `Reps`, `Equipment Needed`, `Additional Notes`  
-        - Ensure a mix of **warm-up, main exercises, and cool-down/stretching** for each session.  
-        - **If the user is a beginner**, provide **brief step-by-step execution instructions** in "Additional Notes".  
-        - **If the user is an expert**, use **advanced fitness terminology** and strategies such as **periodization and progressive overload**.  
-        
-        3️ **Progression & Scaling**  
-        - Explain how intensity increases weekly for progression.  
-        - Include guidance on when to increase weights or reps.  
-        
-        4️ **Medical & Recovery Advisory (If Applicable)**  
-        - **If user has hypertension/diabetes**, include a line advising them to consult a medical professional.  
-        - Emphasize the importance of **hydration, mobility work, and recovery**.  
-        
-        **Additional Guidelines for GPT:**
-        - Use **structured markdown formatting** with a **clean and professional layout**.  
-        - **DO NOT** provide random tips or unrelated fitness advice—stay within the structured scope.  
-        - Ensure each workout day is well-defined and **logically progressive**.  
-        - Keep the response **clear, structured, and professional**.  
-        - **Your response must ONLY include the requested information—nothing extra.**  
-
-        - in the final output there need to be a table that represent whole time of the workout plan
-        - in the final output if there is a medical condition like hypertension or diabetes, there need to be a line that advise the user to consult a medical professional 
-
-        {experience_instructions}
-        {location_instruction}
-        {workout_instruction}
-        {medical_advisory}
-        """
+        return _WORKOUT_PLAN_TEMPLATE.format(
+            duration=user_input.duration,
+            fitness_goal=user_input.fitness_goal,
+            experience_level=user_input.experience_level,
+            workout_preference=user_input.workout_preference,
+            workout_location=user_input.workout_location,
+            experience_instructions=experience_instructions,
+            location_instruction=location_instruction,
+            workout_instruction=workout_instruction,
+            medical_advisory=medical_advisory
+        ).rstrip()
 
+    @staticmethod
+    def _nutrition_focus(fitness_goal):
+        return _GOAL_BASED_NUTRITION.get(fitness_goal.lower(), _DEFAULT_NUTRITION)
 
     @staticmethod
     def nutrition_tips_prompt(user_data, bmi_value):
@@ -141,12 +387,6 @@ class PromptTemplates:
         """
 
         # **BMI Classification and Nutrition Adjustment**
-        bmi_guidance = {
-            "underweight": "** Underweight:** Prioritize calorie-dense, high-protein meals to support weight gain.",
-            "normal": "** Normal Weight:** Maintain a balanced macronutrient intake for overall health.",
-            "overweight": "** Overweight:** Focus on portion control, high-fiber meals, and steady energy balance.",
-            "obese": "**Obese:** Reduce calorie intake, prioritize whole foods, and maintain hydration."
-        }
         bmi_status = (
             "underweight" if bmi_value < 18.5 else
             "normal" if 18.5 <= bmi_value < 25 else
@@ -155,41 +395,109 @@ class PromptTemplates:
         )
 
         # **Nutrition Focus Based on Fitness Goal**
-        goal_based_nutrition = {
-            "muscle gain": "** Muscle Gain:** High-protein diet with complex carbohydrates and healthy fats.",
-            "weight loss": "** Weight Loss:** Caloric deficit, fiber-rich foods, and lean proteins.",
-            "weight gain": "** Healthy Weight Gain:** Increase healthy calorie intake through nutrient-dense foods."
-        }
-        nutrition_focus = goal_based_nutrition.get(user_data["fitness_goal"].lower(), "** General Nutrition Plan:** Balanced macronutrients.")
+        nutrition_focus = PromptTemplates._nutrition_focus(user_data["fitness_goal"])
 
         # **Medical Advisory (Dynamically Included)**
         medical_advisory = ""
-        if user_data["hypertension"].lower() == "yes" or user_data["diabetes"].lower() == "yes":
-            medical_advisory = " **Medical Advisory:** The user has hypertension or diabetes. Recommend heart-healthy, low-sodium, and balanced blood sugar meals. Advise consultation with a medical professional."
+        if PromptTemplates._has_medical_condition(user_data["hypertension"], user_data["diabetes"]):
+            medical_advisory = _NUTRITION_MEDICAL_ADVISORY
 
         # **Final Instruction for GPT**
-        return f"""
-        ## 🍽 Generate a Structured Nutrition Plan (No Workout Plan)
+        return _NUTRITION_TEMPLATE.format(
+            bmi_guidance=_BMI_GUIDANCE[bmi_status],
+            fitness_goal=user_data["fitness_goal"],
+            hypertension=user_data["hypertension"],
+            diabetes=user_data["diabetes"],
+            nutrition_focus=nutrition_focus,
+            medical_advisory=medical_advisory
+        )
 
-        **User Profile:**
-        - **BMI Status:** {bmi_guidance[bmi_status]}
-        - **Fitness Goal:** {user_data["fitness_goal"]}
-        - **Hypertension:** {user_data["hypertension"]}
-        - **Diabetes:** {user_data["diabetes"]}
+    @staticmethod
+    def section_prompt(section, user_input, recommendation_level, bmi_value):
+        """
+        Prompt for one /generate-workout section. `user_input` may be a UserInput or a dict of its fields.
+        """
+        if section == "fitness_analysis":
+            return PromptTemplates.user_fitness_analysis(user_input, recommendation_level, bmi_value)
+        if section == "workout_plan":
+            return PromptTemplates.workout_plan_prompt(user_input)
+        user_data = user_input if isinstance(user_input, dict) else user_input.dict()
+        return PromptTemplates.nutrition_tips_prompt(user_data, bmi_value)
 
-        {nutrition_focus}
+    @staticmethod
+    def section_inputs(profile, recommendation_level, bmi_value):
+        """
+        Inputs each section's prompt depends on: the profile fields its template actually
+        read while rendering for this profile, plus the derived values it takes.
+        Returns {section: frozenset of names}.
+        """
+        inputs = {}
+        for section in PromptTemplates.SECTION_TEMPLATES:
+            recorder = _FieldRecorder(profile)
+            PromptTemplates.section_prompt(section, recorder, recommendation_level, bmi_value)
+            inputs[section] = frozenset(recorder.read) | PromptTemplates.SECTION_DERIVED_INPUTS[section]
+        return inputs
+
+    @staticmethod
+    def combined_plan_prompt(user_input, recommendation_level, bmi_value):
+        """
+        Single prompt producing the fitness analysis, workout plan and nutrition plan as one JSON object.
+        The user profile is stated once instead of being repeated across three prompts.
+        """
 
-        ** Hydration Tip:** Aim for 2.5-3L water per day.
+        bmi_status = (
+            "underweight" if bmi_value < 18.5 else
+            "normal weight" if 18.5 <= bmi_value < 25 else
+            "overweight" if 25 <= bmi_value < 30 else
+            "obese"
+        )
+        medical_advisory = (
+            _COMBINED_MEDICAL_ADVISORY
+            if PromptTemplates._has_medical_condition(user_input.hypertension, user_input.diabetes)
+            else _COMBINED_NO_MEDICAL_ADVISORY
+        )
+        exercise_advisory = _EXERCISE_NOT_RECOMMENDED if recommendation_level in [0, 1] else _SAFE_TO_EXERCISE
+        experience_instructions, location_instruction, workout_instruction = PromptTemplates._workout_instructions(user_input)
+
+        return _COMBINED_TEMPLATE.format(
+            duration=user_input.duration,
+            bmi_status=bmi_status,
+            age=user_input.age,
+            hypertension=user_input.hypertension,
+            diabetes=user_input.diabetes,
+            fitness_goal=user_input.fitness_goal,
+            experience_level=user_input.experience_level,
+            workout_preference=user_input.workout_preference,
+            workout_location=user_input.workout_location,
+            medical_advisory=medical_advisory,
+            exercise_advisory=exercise_advisory,
+            experience_instructions=experience_instructions,
+            location_instruction=location_instruction,
+            workout_instruction=workout_instruction,
+            nutrition_focus=PromptTemplates._nutrition_focus(user_input.fitness_goal)
+        )
 
-        {medical_advisory}
+    @staticmethod
+    def user_profile_summary(session_data):
+        """
+        Compact profile context prepended to /user-concerns prompts.
+        """
+        return _USER_PROFILE_SUMMARY_TEMPLATE.format(
+            fitness_goal=session_data.get("fitness_goal", "Not provided"),
+            experience_level=session_data.get("experience_level", "Not provided"),
+            workout_preference=session_data.get("workout_preference", "Not provided"),
+            workout_location=session_data.get("workout_location", "Not provided"),
+            hypertension=session_data.get("hypertension", "No"),
+            diabetes=session_data.get("diabetes", "No")
+        )
 
-        ### **Instructions for GPT:**
-        - **ONLY generate a structured nutrition plan based on BMI and fitness goals.**
-        - **DO NOT provide a workout plan or fitness assessment.**
-        - **Provide a markdown table with meal recommendations, divided into Breakfast, Lunch, Dinner, and Snacks.**
-        - **Ensure the meal plan aligns with the user’s dietary needs and medical conditions.**
-        - **Keep the response structured, clear, and professional.**
+    @staticmethod
+    def concern_guidance(user_concern, default=_GENERAL_CONCERN_GUIDANCE):
+        """
+        Built-in one-line advice for a known concern category ("motivation", "joint health", ...);
+        `default` for anything else. Served when GPT misses the /user-concerns latency budget.
         """
+        return _CONCERN_GUIDANCE.get(user_concern.strip().lower(), default)
 
     @staticmethod
     def custom_user_concerns(user_concern):
@@ -197,34 +505,41 @@ class PromptTemplates:
         Generates a structured response addressing user concerns related to fitness, health, or training.
         """
 
-        # **Common Concerns Mapping**
-        concern_guidance = {
-            "injury prevention": "** Injury Prevention Tips:** Ensure proper warm-up, maintain good form, and avoid overtraining.",
-            "motivation": "** Staying Motivated:** Set realistic goals, track progress, and find a supportive workout environment.",
-            "workout recovery": "** Recovery & Rest:** Prioritize sleep, stretch regularly, and stay hydrated for optimal muscle recovery.",
-            "nutrition guidance": "** Nutrition Basics:** Balance protein, carbs, and healthy fats for sustained energy and performance.",
-            "supplements": "** Supplement Use:** Consult a professional before taking supplements to ensure they match your fitness goals.",
-            "joint health": "** Joint Protection:** Strengthen stabilizing muscles, use controlled movements, and avoid excessive impact.",
-            "mental health": "** Mental Well-being:** Regular exercise can reduce stress, improve focus, and enhance overall mood.",
-            "muscle soreness": "** Managing Soreness:** Use foam rolling, gentle stretching, and adequate hydration for faster recovery."
-        }
-
         # **Fetch Concern Advice or Default to General Guidance**
-        specific_guidance = concern_guidance.get(
-            user_concern.lower(),  
-            "**📌 General Wellness Advice:** Stay consistent, listen to your body, and adapt workouts as needed."
+        specific_guidance = PromptTemplates.concern_guidance(user_concern)
+
+        return _USER_CONCERN_TEMPLATE.format(
+            concern_title=user_concern.title(),
+            specific_guidance=specific_guidance
         )
 
-        return f"""
-        ## 🏋️ Addressing Your Concern: {user_concern.title()}
+    @staticmethod
+    def conversation_context(summary, turns):
+        """
+        Earlier /user-concerns exchanges: the rolling summary, then recent turns verbatim.
+        """
+        blocks = [_CONVERSATION_SUMMARY_BLOCK.format(summary=summary)] if summary else []
+        blocks += [_CONVERSATION_TURN.format(concern=turn["concern"], response=turn["response"]) for turn in turns]
+        return "\n\n".join(blocks)
 
-        {specific_guidance}
+    @staticmethod
+    def conversation_summary_prompt(summary, turns, max_words=150):
+        """
+        Folds exchanges that left the context window into the rolling summary.
+        """
+        return _CONVERSATION_SUMMARY_TEMPLATE.format(
+            summary=summary or "(none yet)",
+            turns=PromptTemplates.conversation_context("", turns),
+            max_words=max_words
+        )
 
-        ### **Instructions for GPT:**
-        - **Provide a structured, friendly response addressing this concern.**
-        - **Avoid technical jargon—keep the explanation simple and actionable.**
-        - **Ensure the tone is warm, supportive, and motivating.**
-        - **Use direct language, referring to the user as 'you' instead of 'individual' or 'user'.**
-        - **Format the response clearly using markdown for better readability.**
-        - **Limit the response to practical, easy-to-follow advice without unnecessary details.**
+    @staticmethod
+    def user_concern_prompt(session_data, user_concern, summary="", turns=()):
+        """
+        Full /user-concerns prompt: profile context, earlier conversation (if any), then the concern instructions.
         """
+        blocks = [PromptTemplates.user_profile_summary(session_data)]
+        if summary or turns:
+            blocks.append(PromptTemplates.conversation_context(summary, turns))
+        blocks.append(PromptTemplates.custom_user_concerns(user_concern))
+        return "\n\n".join(blocks)
@@ -0,0 +1,105 @@
+import os
+import re
+import threading
+
+from backend.utils.Metrics import GPT_TOKENS
+
+# Offline approximation of a BPE tokenizer: common English words are one token and long
+# ones split every ~8 letters, digits go in groups of up to 3, punctuation runs in pairs
+_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|\s+|[^\sA-Za-z\d]+")
+
+
+class TokenCounter:
+    """
+    Counts prompt and completion tokens.
+
+    Uses tiktoken (TOKEN_ENCODING, default "o200k_base") when it is installed and its
+    encoding file is available locally; otherwise falls back to a deterministic offline
+    estimate that stays within a few percent of BPE on English prompt text. Set
+    TOKEN_COUNTER=offline to always use the estimate (e.g. for reproducible budgets).
+    """
+
+    _encoding = None
+    _loaded = False
+    _lock = threading.Lock()
+
+    @staticmethod
+    def count_offline(text):
+        tokens = 0
+        for piece in _PIECES.findall(text):
+            if piece[0].isalpha():
+                tokens += (len(piece) + 7) // 8
+            elif piece[0].isspace():
+                tokens += 1 if "\n" in piece else 0  # a lone space merges into the next word
+            elif piece[0].isdigit():
+                tokens += 1
+            else:
+                tokens += (len(piece) + 1) // 2
+        return tokens
+
+    @classmethod
+    def _get_encoding(cls):
+        if not cls._loaded:
+            with cls._lock:
+                if not cls._loaded:
+                    if os.getenv("TOKEN_COUNTER", "auto") != "offline":
+                        try:
+                            import tiktoken
+                            cls._encoding = tiktoken.get_encoding(os.getenv("TOKEN_ENCODING", "o200k_base"))
+                        except Exception:
+                            cls._encoding = None  # not installed or no cached encoding (offline)
+                    cls._loaded = True
+        return cls._encoding
+
+    @classmethod
+    def backend(cls):
+        return "tiktoken" if cls._get_encoding() is not None else "offline"
+
+    @classmethod
+    def count(cls, text):
+        if not text:
+            return 0
+        encoding = cls._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return cls.count_offline(text)
+
+
+class TokenUsage:
+    """
+    Input/output token totals per template and per endpoint, for upstream calls only
+    (cache hits and coalesced callers cost nothing and are not counted).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_template = {}
+        self.by_endpoint = {}
+        self.by_model = {}
+
+    @staticmethod
+    def _add(table, label, input_tokens, output_tokens):
+        entry = table.setdefault(label, {"calls": 0, "input_tokens": 0, "output_tokens": 0})
+        entry["calls"] += 1
+        entry["input_tokens"] += input_tokens
+        entry["output_tokens"] += output_tokens
+
+    def record(self, prompt, response, template=None, endpoint=None, model=None):
+        input_tokens = TokenCounter.count(prompt)
+        output_tokens = TokenCounter.count(response)
+        GPT_TOKENS.inc(template or "unlabelled", model or "unknown", "input", amount=input_tokens)
+        GPT_TOKENS.inc(template or "unlabelled", model or "unknown", "output", amount=output_tokens)
+        with self._lock:
+            self._add(self.by_template, template or "unlabelled", input_tokens, output_tokens)
+            self._add(self.by_endpoint, endpoint or "unlabelled", input_tokens, output_tokens)
+            self._add(self.by_model, model or "unknown", input_tokens, output_tokens)
+        return input_tokens, output_tokens
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "counter": TokenCounter.backend(),
+                "by_template": {label: dict(entry) for label, entry in self.by_template.items()},
+                "by_endpoint": {label: dict(entry) for label, entry in self.by_endpoint.items()},
+                "by_model": {label: dict(entry) for label, entry in self.by_model.items()},
+            }
@@ -0,0 +1,203 @@
+"""
+Offline precompute of /generate-workout sections into a PlanStore file.
+
+The workout_plan and nutrition_tips prompts depend only on categorical inputs (fitness
+goal, workout preference, location, duration, experience level, medical flags) and the
+BMI band, so a finite set of prompts covers most requests. This command enumerates that
+grid (GRID, narrowed or extended with --values) or, with --profiles, takes the top-K
+prompts per section seen in a CSV/NDJSON export of real profiles. Each distinct prompt
+is generated once through GPTWorkoutGenerator at bulk priority, with at most
+--concurrency calls in flight and --rpm calls started per minute, and the results are
+written to the store /generate-workout serves from (PLAN_STORE_PATH).
+
+fitness_analysis reads the exact age, so it is only precomputed from --profiles.
+The store is checkpointed every --checkpoint new sections; --resume keeps the sections
+of an existing store built from the current templates and model routes and only
+generates the rest.
+
+Usage: python -m backend.precompute --output plans.store [--profiles profiles.ndjson --top-k 500]
+       [--sections workout_plan,nutrition_tips] [--values duration=1 week,1 month] [--rpm 60]
+       [--concurrency 4] [--resume] [--dry-run]
+"""
+import argparse
+import asyncio
+import collections
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+from pydantic import ValidationError
+
+from backend.main import UserInput, build_workout_prompts
+from backend.nlp.GPTScheduler import PRIORITY_BULK
+from backend.nlp.GPTWorkoutGenerator import GPTWorkoutGenerator
+from backend.nlp.PromptTemplates import PromptTemplates
+from backend.utils.PlanStore import PlanStore
+from backend.utils.SessionArtifacts import SECTIONS, SessionArtifacts
+
+# Values the frontend form offers (free-text fields: the common answers)
+GRID = {
+    "fitness_goal": ("Muscle Gain", "Weight Loss", "Weight Gain"),
+    "workout_preference": ("strength training", "cardio", "mix"),
+    "workout_location": ("Gym", "Home"),
+    "duration": ("1 week", "2 weeks", "1 month", "2 months", "3 months"),
+    "experience_level": ("beginner", "intermediate", "expert"),
+    "hypertension": ("No", "Yes"),
+    "diabetes": ("No", "Yes"),
+}
+# One weight per BMI band (underweight, normal, overweight, obese) at GRID_HEIGHT
+GRID_HEIGHT = 170
+BAND_WEIGHTS = (50, 65, 80, 95)
+GRID_SECTIONS = ("workout_plan", "nutrition_tips")
+
+
+def grid_profiles(values):
+    """UserInputs over every combination of the grid values and BMI bands."""
+    fields = list(values)
+    for combination in itertools.product(*(values[field] for field in fields)):
+        for weight in BAND_WEIGHTS:
+            yield UserInput(weight=weight, height=GRID_HEIGHT, gender=1, age=30, **dict(zip(fields, combination)))
+
+
+def read_profiles(path):
+    """Rows of a CSV (by extension) or NDJSON profile export."""
+    with open(path, newline="", encoding="utf-8") as source:
+        rows = csv.DictReader(source) if path.endswith(".csv") else (json.loads(line) for line in source if line.strip())
+        yield from rows
+
+
+def candidates(profiles, sections, top_k=None):
+    """
+    {fingerprint: (section, prompt, duration)} for the distinct prompts of these profiles; with
+    top_k, only the top_k most frequent prompts of each section. Returns (candidates, invalid rows).
+    """
+    counts = {section: collections.Counter() for section in sections}
+    prompts, invalid = {}, 0
+    for profile in profiles:
+        try:
+            user_input = profile if isinstance(profile, UserInput) else UserInput(**profile)
+        except (ValidationError, TypeError):
+            invalid += 1
+            continue
+        _, _, _, section_prompts = build_workout_prompts(user_input)
+        section_prompts = {section: section_prompts[section] for section in sections}
+        for section, fingerprint in SessionArtifacts.section_fingerprints(section_prompts).items():
+            counts[section][fingerprint] += 1
+            prompts.setdefault(fingerprint, (section, section_prompts[section], user_input.duration))
+    selected = {}
+    for section, counter in counts.items():
+        for fingerprint, _ in counter.most_common(top_k):
+            selected[fingerprint] = prompts[fingerprint]
+    return selected, invalid
+
+
+class RatePacer:
+    """Spaces call starts at least 60 / per_minute seconds apart (0 = unpaced)."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+async def generate(pending, entries, args, meta):
+    """Generate the pending {fingerprint: (section, prompt, duration)} into entries, checkpointing the store."""
+    generator = GPTWorkoutGenerator()
+    pacer = RatePacer(args.rpm)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    progress = {"generated": 0, "failed": 0, "since_checkpoint": 0}
+
+    async def one(fingerprint, section, prompt, duration):
+        async with semaphore:
+            await pacer.wait()
+            content = await generator.generate_response_async(
+                prompt, priority=PRIORITY_BULK, template=PromptTemplates.SECTION_TEMPLATES[section],
+                endpoint="precompute", duration=duration
+            )
+        if generator.is_error(content):
+            progress["failed"] += 1
+            print(f"{section} {fingerprint}: {content}", file=sys.stderr)
+            return
+        entries[fingerprint] = content
+        progress["generated"] += 1
+        progress["since_checkpoint"] += 1
+        if progress["since_checkpoint"] >= args.checkpoint:
+            progress["since_checkpoint"] = 0
+            await asyncio.to_thread(PlanStore.write, args.output, dict(entries), meta)
+            print(f"checkpoint: {len(entries)} sections ({progress['generated']}/{len(pending)} new)", file=sys.stderr)
+
+    try:
+        await asyncio.gather(*(one(fingerprint, *item) for fingerprint, item in pending.items()))
+    finally:
+        await generator.aclose()
+    return progress
+
+
+def parse_values(overrides):
+    values = dict(GRID)
+    for override in overrides:
+        field, _, listed = override.partition("=")
+        if field not in GRID or not listed:
+            raise SystemExit(f"--values expects FIELD=a,b,c with FIELD one of: {', '.join(GRID)}")
+        values[field] = tuple(value.strip() for value in listed.split(","))
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default=os.getenv("PLAN_STORE_PATH") or "plans.store", help="store file to write")
+    parser.add_argument("--profiles", help="CSV or NDJSON export of real profiles (default: enumerate the grid)")
+    parser.add_argument("--top-k", type=int, help="with --profiles: keep the K most frequent prompts per section")
+    parser.add_argument("--sections", default=",".join(GRID_SECTIONS))
+    parser.add_argument("--values", action="append", default=[], help="replace a grid dimension: FIELD=a,b,c")
+    parser.add_argument("--rpm", type=float, default=60, help="GPT calls started per minute (0 = unpaced)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--checkpoint", type=int, default=100, help="rewrite the store every N new sections")
+    parser.add_argument("--resume", action="store_true", help="keep the sections of an existing current store")
+    parser.add_argument("--dry-run", action="store_true", help="only count the prompts that would be generated")
+    args = parser.parse_args()
+
+    sections = tuple(args.sections.split(","))
+    if set(sections) - set(SECTIONS):
+        raise SystemExit(f"--sections must be among: {', '.join(SECTIONS)}")
+    if args.profiles is None and "fitness_analysis" in sections:
+        raise SystemExit("fitness_analysis depends on the exact age; precompute it from --profiles")
+
+    started = time.perf_counter()
+    if args.profiles:
+        selected, invalid = candidates(read_profiles(args.profiles), sections, args.top_k)
+    else:
+        selected, invalid = candidates(grid_profiles(parse_values(args.values)), sections)
+
+    entries = {}
+    if args.resume and os.path.exists(args.output):
+        _, entries = PlanStore.read_entries(args.output)
+    pending = {fingerprint: item for fingerprint, item in selected.items() if fingerprint not in entries}
+    meta = {"source": "profiles" if args.profiles else "grid", "sections": list(sections)}
+
+    summary = {
+        "output": args.output, "candidates": len(selected), "invalid_profiles": invalid,
+        "reused": len(selected) - len(pending), "pending": len(pending),
+        "pending_by_section": dict(collections.Counter(item[0] for item in pending.values())),
+    }
+    if not args.dry_run:
+        progress = asyncio.run(generate(pending, entries, args, meta)) if pending else {"generated": 0, "failed": 0}
+        PlanStore.write(args.output, entries, meta)
+        summary.update(generated=progress["generated"], failed=progress["failed"], entries=len(entries),
+                       bytes=os.path.getsize(args.output))
+    summary["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+import asyncio
+import csv
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process job locks
+    fcntl = None
+
+
+class JobManager:
+    """
+    Runs bulk jobs: every input row goes through an async `process_row` callback with a
+    bounded number of rows in flight, and each result is appended to an NDJSON file as
+    soon as it finishes.
+
+    Layout under JOBS_DIR (default "jobs"):
+        <job_id>/input.ndjson    normalized input rows, one JSON object per line
+        <job_id>/results.ndjson  {"row", "status", ...} lines in completion order (the checkpoint)
+        <job_id>/status.json     job metadata and last known progress
+        <job_id>/lock            flock held by the process running the job
+
+    Resuming a job re-runs only the rows without an "ok" result line, so a crashed or
+    interrupted job picks up where it left off. Readers should keep the last line per row.
+
+    Several app processes (e.g. uvicorn workers) can share JOBS_DIR: the running process
+    holds an exclusive lock on the job's lock file, which the OS drops if it dies. Other
+    processes report such a job as running rather than interrupted and refuse to resume
+    it, so a job is never run twice into the same results file.
+
+    Rows in flight default to JOBS_CONCURRENCY (4); a requested concurrency is clamped to
+    JOBS_MAX_CONCURRENCY (16), since every row holds upstream GPT calls open.
+    """
+
+    def __init__(self, process_row, jobs_dir=None, default_concurrency=None, max_concurrency=None):
+        self.process_row = process_row
+        self.jobs_dir = jobs_dir or os.getenv("JOBS_DIR", "jobs")
+        self.max_concurrency = int(max_concurrency or os.getenv("JOBS_MAX_CONCURRENCY", "16"))
+        self.default_concurrency = self._clamp(default_concurrency or os.getenv("JOBS_CONCURRENCY", "4"))
+        self._running = {}  # job_id -> asyncio.Task
+        self._progress = {}  # job_id -> {"completed", "failed"}
+        self._conditions = {}  # job_id -> asyncio.Condition notified on every new result
+        self._locks = {}  # job_id -> open lock file of a job running in this process
+
+    def _path(self, job_id, name):
+        return os.path.join(self.jobs_dir, job_id, name)
+
+    def _clamp(self, concurrency):
+        return max(1, min(int(concurrency), self.max_concurrency))
+
+    # **Job creation**
+
+    async def create_job(self, chunks, content_type, concurrency=None):
+        """
+        Store an uploaded CSV or NDJSON body (an async iterator of byte chunks) and start the job.
+        """
+        job_id = str(uuid.uuid4())
+        os.makedirs(os.path.join(self.jobs_dir, job_id))
+        is_csv = content_type.startswith("text/csv")
+        raw_path = self._path(job_id, "upload.csv" if is_csv else "upload.ndjson")
+
+        with open(raw_path, "wb") as upload:
+            async for chunk in chunks:
+                await asyncio.to_thread(upload.write, chunk)
+
+        try:
+            total = await asyncio.to_thread(self._normalize_upload, job_id, raw_path, is_csv)
+        except (ValueError, csv.Error):
+            shutil.rmtree(os.path.join(self.jobs_dir, job_id), ignore_errors=True)
+            raise
+        status = {
+            "job_id": job_id,
+            "state": "running",
+            "total": total,
+            "completed": 0,
+            "failed": 0,
+            "concurrency": self._clamp(concurrency or self.default_concurrency),
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        lock = await asyncio.to_thread(self._acquire_lock, job_id)
+        status["owner_pid"] = os.getpid()
+        await asyncio.to_thread(self._write_status, job_id, status)
+        self._start(job_id, status, lock)
+        return status
+
+    def _normalize_upload(self, job_id, raw_path, is_csv):
+        """Rewrite the upload as one JSON object per line; returns the row count."""
+        total = 0
+        with open(raw_path, encoding="utf-8-sig", newline="") as raw, \
+                open(self._path(job_id, "input.ndjson"), "w", encoding="utf-8") as normalized:
+            rows = csv.DictReader(raw) if is_csv else (json.loads(line) for line in raw if line.strip())
+            for row in rows:
+                normalized.write(json.dumps(row) + "\n")
+                total += 1
+        os.remove(raw_path)
+        return total
+
+    # **Ownership**
+
+    def _acquire_lock(self, job_id):
+        """Open and exclusively lock the job's lock file; None if another process holds it."""
+        try:
+            lock = open(self._path(job_id, "lock"), "a")
+        except FileNotFoundError:
+            return None  # unknown job
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                return None
+        return lock
+
+    def _owned_elsewhere(self, job_id):
+        """True while another process holds the job's lock (i.e. is running it)."""
+        if job_id in self._running or fcntl is None:
+            return False
+        try:
+            with open(self._path(job_id, "lock"), "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        except FileNotFoundError:
+            pass
+        return False
+
+    # **Running and resuming**
+
+    def _start(self, job_id, status, lock):
+        self._locks[job_id] = lock
+        self._conditions.setdefault(job_id, asyncio.Condition())
+        self._running[job_id] = asyncio.create_task(self._run(job_id, status))
+
+    async def resume_job(self, job_id, concurrency=None):
+        """Restart a job that is not running anywhere, skipping rows that already succeeded."""
+        if job_id in self._running:
+            return await self.get_status(job_id)
+        lock = await asyncio.to_thread(self._acquire_lock, job_id)
+        if lock is None:
+            return await self.get_status(job_id)  # unknown, or running in another process
+        status = await asyncio.to_thread(self._read_status, job_id)
+        if status is None:
+            lock.close()
+            return None
+        if concurrency:
+            status["concurrency"] = self._clamp(concurrency)
+        status["state"] = "running"
+        status["finished_at"] = None
+        status["owner_pid"] = os.getpid()
+        await asyncio.to_thread(self._write_status, job_id, status)
+        self._start(job_id, status, lock)
+        return status
+
+    async def _run(self, job_id, status):
+        self._progress[job_id] = {"completed": 0, "failed": 0}
+        # Workers share one results file. A thread lock rather than an asyncio one, so an append left
+        # running in its thread by a cancelled worker still finishes before the next write or the close.
+        results, append_lock = None, threading.Lock()
+        try:
+            succeeded, failed = await asyncio.to_thread(self._read_checkpoint, job_id)
+            self._progress[job_id] = {"completed": len(succeeded), "failed": len(failed)}
+            pending = asyncio.Queue()
+            for index, row in await asyncio.to_thread(self._read_pending_rows, job_id, succeeded):
+                pending.put_nowait((index, row))
+
+            results = await asyncio.to_thread(self._open_results, job_id)
+            workers = [
+                asyncio.create_task(self._worker(job_id, pending, results, append_lock, failed))
+                for _ in range(self._clamp(status["concurrency"]))
+            ]
+            await asyncio.gather(*workers)
+            status["state"] = "completed"
+        except asyncio.CancelledError:
+            status["state"] = "interrupted"
+            raise
+        except Exception as e:
+            status["state"] = "failed"
+            status["error"] = str(e)
+        finally:
+            status.update(self._progress.pop(job_id))
+            status["finished_at"] = time.time()
+            # Shielded so a second cancellation cannot skip the final status or leave the file open or the lock held
+            await asyncio.shield(asyncio.to_thread(
+                self._finish, job_id, status, self._locks.pop(job_id), results, append_lock
+            ))
+            self._running.pop(job_id, None)
+            condition = self._conditions.pop(job_id)
+            async with condition:
+                condition.notify_all()
+
+    async def _worker(self, job_id, pending, results, append_lock, failed):
+        progress = self._progress[job_id]
+        while not pending.empty():
+            index, row = pending.get_nowait()
+            try:
+                line = {"row": index, "status": "ok", "result": await self.process_row(row)}
+            except Exception as e:
+                line = {"row": index, "status": "error", "error": str(e)}
+
+            await asyncio.to_thread(self._append_line, results, append_lock, json.dumps(line))
+            if line["status"] == "ok":
+                progress["completed"] += 1
+                if index in failed:
+                    failed.discard(index)
+                    progress["failed"] -= 1
+            elif index not in failed:
+                failed.add(index)
+                progress["failed"] += 1
+
+            condition = self._conditions[job_id]
+            async with condition:
+                condition.notify_all()
+
+    def _open_results(self, job_id):
+        """Open the results file for appending, terminating any torn line left by a crash."""
+        path = self._path(job_id, "results.ndjson")
+        results = open(path, "a+b")
+        if results.tell() > 0:
+            results.seek(-1, os.SEEK_END)
+            if results.read(1) != b"\n":
+                results.write(b"\n")
+        results.close()
+        return open(path, "a", encoding="utf-8")
+
+    @staticmethod
+    def _append_line(results, lock, line):
+        with lock:
+            results.write(line + "\n")
+            results.flush()
+
+    def _read_checkpoint(self, job_id):
+        """Rows whose latest result is ok / error."""
+        latest = {}
+        path = self._path(job_id, "results.ndjson")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as results:
+                for line in results:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from a crash
+                    latest[entry["row"]] = entry["status"]
+        succeeded = {row for row, state in latest.items() if state == "ok"}
+        failed = {row for row, state in latest.items() if state != "ok"}
+        return succeeded, failed
+
+    def _read_pending_rows(self, job_id, succeeded):
+        with open(self._path(job_id, "input.ndjson"), encoding="utf-8") as rows:
+            return [(index, json.loads(line)) for index, line in enumerate(rows) if index not in succeeded]
+
+    # **Status and results**
+
+    def _read_status(self, job_id):
+        try:
+            with open(self._path(job_id, "status.json"), encoding="utf-8") as status_file:
+                return json.load(status_file)
+        except FileNotFoundError:
+            return None
+
+    def _write_status(self, job_id, status):
+        tmp_path = self._path(job_id, "status.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as status_file:
+            json.dump(status, status_file)
+        os.replace(tmp_path, self._path(job_id, "status.json"))
+
+    def _finish(self, job_id, status, lock, results, append_lock):
+        """Close the results file once any append in flight is done, write the final status, then give up ownership."""
+        try:
+            if results is not None:
+                with append_lock:
+                    results.close()
+            self._write_status(job_id, status)
+        finally:
+            lock.close()
+
+    async def get_status(self, job_id):
+        """
+        Job metadata with live progress. Jobs left "running" by a process that no longer
+        holds their lock report "interrupted"; progress of jobs running in another process
+        is read from their results file.
+        """
+        status = await asyncio.to_thread(self._read_status, job_id)
+        if status is None:
+            return None
+        if job_id in self._running:
+            status.update(self._progress.get(job_id, {}))
+        elif status["state"] == "running":
+            if not await asyncio.to_thread(self._owned_elsewhere, job_id):
+                status["state"] = "interrupted"
+            succeeded, failed = await asyncio.to_thread(self._read_checkpoint, job_id)
+            status.update(completed=len(succeeded), failed=len(failed))
+        return status
+
+    async def stream_results(self, job_id):
+        """
+        Yield NDJSON result lines as they are written, following the file until the job stops.
+        """
+        path = self._path(job_id, "results.ndjson")
+        offset = 0
+        while True:
+            condition = self._conditions.get(job_id)
+            running = job_id in self._running or await asyncio.to_thread(self._owned_elsewhere, job_id)
+            chunk, offset = await asyncio.to_thread(self._read_from, path, offset)
+            if chunk:
+                yield chunk
+            if not running:
+                return
+            if not chunk and condition is None:
+                await asyncio.sleep(1.0)  # running in another process: poll the file
+            elif not chunk:
+                # Timeout guards against a notification landing between the read and the wait
+                async with condition:
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        pass
+
+    @staticmethod
+    def _read_from(path, offset):
+        """Read complete lines from offset; returns (text, new offset)."""
+        if not os.path.exists(path):
+            return "", offset
+        with open(path, "rb") as results:
+            results.seek(offset)
+            data = results.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        return complete.decode("utf-8"), offset + len(complete)
+
+    async def cancel_all(self):
+        """Stop running jobs (on shutdown); they are left resumable."""
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,207 @@
+import hashlib
+import inspect
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+
+from backend.nlp import PromptTemplates as prompt_templates_module
+from backend.nlp.ModelRouter import ModelRouter
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FCPLANS\0"
+FORMAT_VERSION = 1
+# magic, format version, generation hash, entry count, metadata length
+_HEADER = struct.Struct("<8sH16sII")
+# section fingerprint (8 bytes), content offset, compressed length
+_INDEX_RECORD = struct.Struct("<8sQI")
+
+
+def generation_hash(routes):
+    """
+    First 16 bytes of the sha256 of the PromptTemplates source and the model route table;
+    changes with any template edit and any change of model, temperature or output budget.
+    """
+    digest = hashlib.sha256()
+    with open(inspect.getsourcefile(prompt_templates_module), "rb") as source:
+        digest.update(source.read())
+    digest.update(json.dumps(routes, sort_keys=True).encode("utf-8"))
+    return digest.digest()[:16]
+
+
+class PlanStore:
+    """
+    Read-only store of sections generated ahead of time by `python -m backend.precompute`,
+    keyed by the same fingerprint as SessionArtifacts (template name + rendered prompt).
+
+    File layout (little-endian):
+
+        header    magic "FCPLANS\\0", format version, generation hash (PromptTemplates
+                  source + model routes), entry count, metadata length
+        metadata  JSON: model, sections, created_at
+        index     entry count x (fingerprint[8], offset u64, length u32), sorted by fingerprint
+        contents  zlib-compressed UTF-8 section texts
+
+    The file is memory-mapped and the index binary-searched in place, so opening it costs
+    nothing per entry and the pages are shared between worker processes. A file written
+    against a different PromptTemplates source (or format version) is ignored with a
+    warning, and so is one written with other model routes (ModelRouter, including
+    MODEL_ROUTES overrides), so a template or model change never serves sections
+    generated from old prompts or by the old model.
+
+    Configured through environment variables:
+    - PLAN_STORE_PATH: store file written by backend.precompute (unset disables the store)
+    """
+
+    def __init__(self, path=None, routes=None):
+        self.path = path if path is not None else os.getenv("PLAN_STORE_PATH")
+        self.source_hash = generation_hash(routes if routes is not None else ModelRouter().routes)
+        self.meta = {}
+        self.count = 0
+        self.status = "disabled"
+        self._file = None
+        self._mmap = None
+        self._index_offset = 0
+        self.stats = {"hits": 0, "misses": 0}
+        if self.path:
+            self.open()
+
+    @property
+    def enabled(self):
+        return self._mmap is not None
+
+    def open(self):
+        """(Re)open the store file; an absent, corrupt or outdated file leaves the store disabled."""
+        self.close()
+        try:
+            store_file = open(self.path, "rb")
+        except FileNotFoundError:
+            self.status = "missing"
+            logger.warning("Plan store %s not found; sections will be generated on demand", self.path)
+            return
+        try:
+            mapped = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, source_hash, count, meta_length = _HEADER.unpack_from(mapped, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"unsupported plan store format (version {version})")
+            if source_hash != self.source_hash:
+                mapped.close()
+                store_file.close()
+                self.status = "stale"
+                logger.warning("Plan store %s was built from other prompt templates or model routes; ignoring it",
+                               self.path)
+                return
+            meta_end = _HEADER.size + meta_length
+            self.meta = json.loads(mapped[_HEADER.size:meta_end].decode("utf-8"))
+            if len(mapped) < meta_end + count * _INDEX_RECORD.size:
+                raise ValueError("truncated index")
+        except (ValueError, struct.error, OSError) as e:
+            store_file.close()
+            self.status = "invalid"
+            logger.error("Plan store %s could not be read: %s", self.path, e)
+            return
+        self._file, self._mmap = store_file, mapped
+        self._index_offset, self.count = meta_end, count
+        self.status = "loaded"
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+        self._file = self._mmap = None
+        self.count = 0
+
+    def _find(self, key):
+        """(offset, length) of the entry with this 8-byte key, by binary search over the mapped index."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record_key, offset, length = _INDEX_RECORD.unpack_from(
+                self._mmap, self._index_offset + middle * _INDEX_RECORD.size
+            )
+            if record_key == key:
+                return offset, length
+            if record_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def lookup(self, fingerprint):
+        """The precomputed content for a SessionArtifacts fingerprint, or None."""
+        if self._mmap is None:
+            return None
+        entry = self._find(bytes.fromhex(fingerprint))
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        offset, length = entry
+        return zlib.decompress(self._mmap[offset:offset + length]).decode("utf-8")
+
+    def lookup_sections(self, fingerprints):
+        """{section: content} for every {section: fingerprint} found in the store."""
+        found = {}
+        for section, fingerprint in fingerprints.items():
+            content = self.lookup(fingerprint)
+            if content is not None:
+                found[section] = content
+        return found
+
+    @staticmethod
+    def write(path, entries, meta, routes=None):
+        """
+        Write {fingerprint: content} to path (atomically, via a temporary file), stamped for the
+        given model routes (default: ModelRouter's). meta is stored as JSON alongside; created_at is added.
+        """
+        source_hash = generation_hash(routes if routes is not None else ModelRouter().routes)
+        meta_bytes = json.dumps({**meta, "created_at": time.time()}).encode("utf-8")
+        keys = sorted((bytes.fromhex(fingerprint), fingerprint) for fingerprint in entries)
+        blobs = [zlib.compress(entries[fingerprint].encode("utf-8"), 9) for _, fingerprint in keys]
+
+        offset = _HEADER.size + len(meta_bytes) + len(keys) * _INDEX_RECORD.size
+        index = bytearray()
+        for (key, _), blob in zip(keys, blobs):
+            index += _INDEX_RECORD.pack(key, offset, len(blob))
+            offset += len(blob)
+
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as output:
+            output.write(_HEADER.pack(MAGIC, FORMAT_VERSION, source_hash, len(keys), len(meta_bytes)))
+            output.write(meta_bytes)
+            output.write(index)
+            for blob in blobs:
+                output.write(blob)
+            output.flush()
+            os.fsync(output.fileno())
+        os.replace(temporary, path)
+
+    @staticmethod
+    def read_entries(path, routes=None):
+        """(meta, {fingerprint: content}) of a current store file, or ({}, {}) when it is absent or outdated."""
+        store = PlanStore(path, routes)
+        try:
+            if not store.enabled:
+                return {}, {}
+            entries = {}
+            for position in range(store.count):
+                key, offset, length = _INDEX_RECORD.unpack_from(
+                    store._mmap, store._index_offset + position * _INDEX_RECORD.size
+                )
+                entries[key.hex()] = zlib.decompress(store._mmap[offset:offset + length]).decode("utf-8")
+            return store.meta, entries
+        finally:
+            store.close()
+
+    def get_stats(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "status": self.status,
+            "entries": self.count,
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
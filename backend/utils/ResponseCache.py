@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from backend.utils.TTLCache import TTLCache
+
+
+class ResponseCache:
+    """
+    Content-addressed cache for GPT responses.
+
+    Entries are keyed on a canonical hash of (prompt, model, temperature, max_tokens).
+    A bounded in-memory LRU with TTL expiry (TTLCache) sits in front of an optional
+    SQLite tier that survives restarts.
+
+    Configured through environment variables:
+    - RESPONSE_CACHE_SIZE: max in-memory entries (default 1024, 0 disables the cache)
+    - RESPONSE_CACHE_TTL: entry lifetime in seconds (default 86400)
+    - RESPONSE_CACHE_DB: path of the SQLite file (unset = memory only)
+    """
+
+    def __init__(self, max_entries=None, ttl_seconds=None, db_path=None):
+        self.max_entries = int(max_entries if max_entries is not None else os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+        self.ttl_seconds = float(ttl_seconds if ttl_seconds is not None else os.getenv("RESPONSE_CACHE_TTL", "86400"))
+        self.db_path = db_path if db_path is not None else os.getenv("RESPONSE_CACHE_DB")
+
+        self._memory = TTLCache(self.max_entries, self.ttl_seconds)
+        self._lock = threading.Lock()  # guards the SQLite connection
+        self._db = None
+        if self.db_path:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, stored_at REAL, value TEXT)"
+            )
+            self._db.commit()
+
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0}
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @staticmethod
+    def normalize_prompt(prompt):
+        """Collapse whitespace so indentation-only differences share a key."""
+        return " ".join(prompt.split())
+
+    @staticmethod
+    def make_key(prompt, model, temperature, max_tokens):
+        """Canonical SHA-256 key for a prompt and its generation parameters."""
+        payload = json.dumps(
+            {
+                "prompt": ResponseCache.normalize_prompt(prompt),
+                "model": model,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, stored_at):
+        return time.time() - stored_at > self.ttl_seconds
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        value = self._memory.get(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            return value
+
+        value = self._disk_get(key)
+        if value is not None:
+            self.stats["disk_hits"] += 1
+            return value
+
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key, value):
+        """Store a value in memory and, if configured, on disk."""
+        stored_at = time.time()
+        self._memory.set(key, value, stored_at)
+        if self._db is not None:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, stored_at, value) VALUES (?, ?, ?)",
+                    (key, stored_at, value),
+                )
+                self._db.commit()
+
+    def delete(self, key):
+        """Drop an entry from both tiers."""
+        self._memory.delete(key)
+        with self._lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+
+    async def get_async(self, key):
+        """Like get(), but keeps SQLite reads off the event loop."""
+        if self._db is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key, value):
+        """Like set(), but keeps SQLite writes off the event loop."""
+        if self._db is None:
+            return self.set(key, value)
+        return await asyncio.to_thread(self.set, key, value)
+
+    def record_bypass(self):
+        self.stats["bypassed"] += 1
+
+    def _disk_get(self, key):
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT stored_at, value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self._expired(row[0]):
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+        # Promote disk hits into the memory tier
+        self._memory.set(key, row[1], row[0])
+        return row[1]
+
+    def get_stats(self):
+        """Hit/miss counters plus current size."""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._memory),
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def clear(self):
+        self._memory.clear()
+        with self._lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
@@ -0,0 +1,386 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Profile fields the /user-concerns prompt depends on besides the concern itself
+PROFILE_FACETS = ("fitness_goal", "experience_level", "workout_preference", "workout_location", "hypertension", "diabetes")
+
+# Question filler that carries no meaning for matching ("can I", "how do I", "is it ok")
+_FILLER_WORDS = frozenset(
+    "a an the i me my im is are am be been can could should would do does did doing how what which to of for in on "
+    "at with while during when from it its ok okay much many please you your there any and or so just really get "
+    "have has had some tips good best will".split()
+)
+_WORDS = re.compile(r"[a-z0-9]+")
+# Spellings of the same thing, joined before splitting into words
+_PHRASES = tuple((re.compile(pattern), replacement) for pattern, replacement in (
+    (r"\bwork(?:ing|s|ed)? ?outs?\b", "workout"), (r"\bpush[- ]?ups?\b", "pushup"), (r"\bpull[- ]?ups?\b", "pullup"),
+    (r"\bsit[- ]?ups?\b", "situp"), (r"\bevery ?day\b", "daily"), (r"\bcouple of\b", "two"),
+))
+N_FEATURES = 2 ** 18
+
+
+def _stem(word):
+    """Crude suffix stripping, enough to fold "squats" / "squatting" and "knees" / "knee" together."""
+    if len(word) > 5 and word.endswith("ing"):
+        word = word[:-3]
+        if word[-1] == word[-2] and word[-1] not in "sz":
+            word = word[:-1]  # squatting -> squat, travelling -> travel
+    elif len(word) > 4 and word.endswith("ies"):
+        word = word[:-3] + "y"
+    elif len(word) > 4 and word.endswith(("ches", "shes", "sses", "xes")):
+        word = word[:-2]
+    elif len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us")):
+        word = word[:-1]
+    elif len(word) > 6 and word.endswith("ation"):
+        word = word[:-3]
+    elif len(word) > 5 and word.endswith("ed"):
+        word = word[:-2]
+    if len(word) > 4 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+# Words users pick interchangeably in fitness questions -> one canonical term (keys are stems)
+_SYNONYMS = {
+    _stem(word): canonical
+    for canonical, words in (
+        ("pain", "hurt hurts ache aches aching pain painful"),
+        ("train", "train training workout workouts exercise exercises exercising"),
+        ("avoid", "avoid stop prevent"),
+        ("belly", "belly stomach tummy"),
+        ("lose", "lose losing loss burn burning shed"),
+        ("gain", "gain build"),
+        ("need", "need necessary"),
+    )
+    for word in words.split()
+}
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour answer cache for /user-concerns.
+
+    Concerns are reduced to canonical terms (question filler dropped, light stemming and
+    a small table of fitness synonyms, so "knees hurt when squatting" and "my knee hurts
+    during squats" both become "knee pain squat"), vectorized with TF-IDF over those
+    terms plus their character 3-5 grams (for misspellings) and compared by cosine
+    similarity against cached concerns from users with the same profile facets. A match
+    at or above the threshold is served without a GPT call.
+
+    This catches rewordings built from the same terms or listed synonyms; it is not a
+    semantic model, and questions that differ in one content word ("shoulder" vs "knee",
+    "before" vs "after") must stay misses. The default threshold is calibrated on the
+    labelled paraphrase / non-paraphrase pairs in tests/test_semantic_cache.py, which
+    should be extended, and re-run, whenever the features or threshold change.
+
+    Term counts come from a stateless HashingVectorizer and document frequencies are
+    kept as running totals, so adding an entry never refits the index. Entries are
+    persisted to SQLite and reloaded on start.
+
+    scipy and scikit-learn take most of the API's import time, so they are imported, and
+    persisted entries loaded, on first use or by warm_up() after startup. Without
+    scikit-learn installed (requirements-extras.txt) the cache disables itself.
+
+    Every hit and near miss is written to the audit log with the matched concern and
+    similarity; a sample of hits can also be re-answered in the background to flag
+    likely false hits (see record_verification).
+
+    Configured through environment variables:
+    - SEMANTIC_CACHE_SIZE: max entries (default 5000, 0 disables the cache)
+    - SEMANTIC_CACHE_THRESHOLD: minimum cosine similarity for a hit (default 0.8)
+    - SEMANTIC_CACHE_DB: SQLite file path (unset = memory only)
+    - SEMANTIC_CACHE_AUDIT_LOG: NDJSON audit log path (unset = in-memory recent events only)
+    - SEMANTIC_CACHE_AUDIT_SAMPLE: fraction of hits re-answered to check for false hits (default 0)
+    - SEMANTIC_CACHE_AUDIT_MIN_SIMILARITY: answer similarity below which a verified hit
+      is logged as a suspected false hit (default 0.35)
+    """
+
+    NEAR_MISS_MARGIN = 0.1
+
+    def __init__(self, max_entries=None, threshold=None, db_path=None, audit_log=None):
+        self.max_entries = int(max_entries if max_entries is not None else os.getenv("SEMANTIC_CACHE_SIZE", "5000"))
+        self.threshold = float(threshold if threshold is not None else os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8"))
+        self.db_path = db_path if db_path is not None else os.getenv("SEMANTIC_CACHE_DB")
+        self.audit_log = audit_log if audit_log is not None else os.getenv("SEMANTIC_CACHE_AUDIT_LOG")
+        self.audit_sample = float(os.getenv("SEMANTIC_CACHE_AUDIT_SAMPLE", "0"))
+        self.audit_min_similarity = float(os.getenv("SEMANTIC_CACHE_AUDIT_MIN_SIMILARITY", "0.35"))
+
+        self._vectorizer = None  # built, with the persisted entries loaded, by _ready()
+        self._sparse = None
+        self._normalize = None
+        self._lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._order = deque()  # entries, oldest first
+        # facet key -> {"entries", "counts" (csr, one row per entry), "squared" (counts ** 2), "row_norms"}
+        self._partitions = {}
+        self._doc_freq = np.zeros(N_FEATURES)
+        self._idf_squared = None
+        self._recent_audit = deque(maxlen=100)
+
+        self.stats = {"hits": 0, "misses": 0, "near_misses": 0, "bypassed": 0,
+                      "verified_hits": 0, "suspected_false_hits": 0}
+
+        self._db = None
+        if self.db_path and self.enabled:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS concerns "
+                "(id INTEGER PRIMARY KEY, facets TEXT, concern TEXT, response TEXT, stored_at REAL)"
+            )
+            self._db.commit()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _ready(self):
+        """Import the text stack, build the vectorizer and load persisted entries once; False when unavailable."""
+        if self._vectorizer is None and self.enabled:
+            with self._init_lock:
+                if self._vectorizer is None and self.enabled:
+                    try:
+                        from scipy import sparse
+                        from sklearn.feature_extraction.text import HashingVectorizer
+                        from sklearn.preprocessing import normalize
+                    except ImportError:
+                        logger.warning("scikit-learn is not installed; the semantic cache is disabled")
+                        self.max_entries = 0
+                        return False
+                    self._sparse, self._normalize = sparse, normalize
+                    self._vectorizer = HashingVectorizer(
+                        analyzer=self._features, n_features=N_FEATURES, alternate_sign=False, norm=None
+                    )
+                    if self._db is not None:
+                        with self._lock:
+                            self._load()
+        return self._vectorizer is not None
+
+    def warm_up(self):
+        """Do the first-use work ahead of the first /user-concerns request (blocking; run it in a thread)."""
+        return self._ready()
+
+    @staticmethod
+    def facet_key(session_data):
+        return tuple(str(session_data.get(name, "")).strip().lower() for name in PROFILE_FACETS)
+
+    @staticmethod
+    def normalize_concern(concern):
+        return " ".join(concern.lower().split())
+
+    @staticmethod
+    def match_terms(concern):
+        """Canonical terms a concern is matched on: no question filler, stemmed, synonyms folded."""
+        text = concern.lower()
+        for pattern, replacement in _PHRASES:
+            text = pattern.sub(replacement, text)
+        words = _WORDS.findall(text)
+        words = [word for word in words if word not in _FILLER_WORDS] or words
+        return [_SYNONYMS.get(stem, stem) for stem in map(_stem, words)]
+
+    @classmethod
+    def _features(cls, text):
+        """Vectorizer analyzer: the canonical terms plus the character 3-5 grams of each term."""
+        terms = cls.match_terms(text)
+        features = list(terms)
+        for term in terms:
+            padded = f" {term} "
+            features.extend(padded[i:i + n] for n in (3, 4, 5) for i in range(len(padded) - n + 1))
+        return features
+
+    # **Index maintenance**
+
+    def _load(self):
+        rows = self._db.execute(
+            "SELECT id, facets, concern, response, stored_at FROM concerns ORDER BY id DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        self._index([
+            {"id": row_id, "facets": tuple(json.loads(facets)), "concern": concern,
+             "response": response, "stored_at": stored_at}
+            for row_id, facets, concern, response, stored_at in reversed(rows)
+        ])
+        # Drop rows beyond the size limit left by a previous, larger configuration
+        if rows:
+            self._db.execute("DELETE FROM concerns WHERE id < ?", (rows[-1][0],))
+            self._db.commit()
+
+    def _index(self, entries):
+        """Add entries to their partitions (one vstack per partition, so bulk loads stay linear)."""
+        if not entries:
+            return
+        counts = self._sparse.csr_matrix(self._vectorizer.transform([e["concern"] for e in entries]))
+        by_partition = {}
+        for position, entry in enumerate(entries):
+            by_partition.setdefault(entry["facets"], []).append(position)
+            self._order.append(entry)
+        for facets, positions in by_partition.items():
+            rows = counts[positions]
+            partition = self._partitions.setdefault(
+                facets, {"entries": [], "counts": rows[:0], "squared": rows[:0], "row_norms": None}
+            )
+            partition["entries"].extend(entries[position] for position in positions)
+            partition["counts"] = self._sparse.vstack([partition["counts"], rows], format="csr")
+            partition["squared"] = self._sparse.vstack([partition["squared"], rows.multiply(rows)], format="csr")
+        self._doc_freq += np.bincount(counts.indices, minlength=N_FEATURES)
+        self._idf_squared = None
+
+    def _evict_oldest(self):
+        entry = self._order.popleft()
+        partition = self._partitions[entry["facets"]]
+        position = next(i for i, candidate in enumerate(partition["entries"]) if candidate is entry)
+        counts = partition["counts"][position]
+        keep = np.arange(len(partition["entries"])) != position
+        partition["entries"].pop(position)
+        partition["counts"] = partition["counts"][keep]
+        partition["squared"] = partition["squared"][keep]
+        self._doc_freq[counts.indices] -= 1
+        if not partition["entries"]:
+            del self._partitions[entry["facets"]]
+        self._idf_squared = None
+        return entry
+
+    def _weights(self):
+        if self._idf_squared is None:
+            documents = len(self._order)
+            idf = np.log((1 + documents) / (1 + self._doc_freq)) + 1
+            self._idf_squared = idf * idf
+        return self._idf_squared
+
+    def _similarities(self, partition, counts):
+        """
+        Cosine similarity of TF-IDF vectors computed from raw term counts, so document-frequency
+        updates never require re-weighting the stored rows:
+        cos = sum(c * q * idf^2) / (sqrt(sum(c^2 * idf^2)) * sqrt(sum(q^2 * idf^2)))
+        """
+        idf_squared = self._weights()
+        weights = idf_squared[counts.indices]
+        query_norm = np.sqrt(np.sum(counts.data * counts.data * weights))
+        if query_norm == 0:
+            return np.zeros(len(partition["entries"]))
+        query = np.zeros(idf_squared.shape[0])
+        query[counts.indices] = counts.data * weights
+        dots = partition["counts"] @ query
+        # Row norms depend on the IDF, so they are recomputed only after it changes
+        if partition["row_norms"] is None or partition["row_norms"][0] is not idf_squared:
+            partition["row_norms"] = (idf_squared, np.sqrt(partition["squared"] @ idf_squared))
+        return dots / np.maximum(partition["row_norms"][1] * query_norm, 1e-12)
+
+    # **Lookups**
+
+    def lookup(self, concern, session_data):
+        """
+        Closest cached answer for this concern and profile, or None.
+        Returns {"response", "matched_concern", "similarity", "id"} on a hit.
+        """
+        if not self._ready():
+            return None
+        query = self.normalize_concern(concern)
+        facets = self.facet_key(session_data)
+        counts = self._sparse.csr_matrix(self._vectorizer.transform([query]))
+
+        with self._lock:
+            partition = self._partitions.get(facets)
+            best, similarity = None, 0.0
+            if partition is not None:
+                scores = self._similarities(partition, counts)
+                position = int(scores.argmax())
+                best, similarity = partition["entries"][position], float(scores[position])
+
+            if best is not None and similarity >= self.threshold:
+                self.stats["hits"] += 1
+                hit = {"response": best["response"], "matched_concern": best["concern"],
+                       "similarity": round(similarity, 4), "id": best["id"]}
+            else:
+                self.stats["misses"] += 1
+                hit = None
+                if best is not None and similarity >= self.threshold - self.NEAR_MISS_MARGIN:
+                    self.stats["near_misses"] += 1
+
+        if hit is not None:
+            self._audit("hit", query, facets, hit["matched_concern"], hit["similarity"])
+        elif best is not None and similarity >= self.threshold - self.NEAR_MISS_MARGIN:
+            self._audit("near_miss", query, facets, best["concern"], round(similarity, 4))
+        return hit
+
+    async def lookup_async(self, concern, session_data):
+        """Like lookup(), but keeps vectorizing, scoring and the audit log write off the event loop."""
+        return await asyncio.to_thread(self.lookup, concern, session_data)
+
+    def add(self, concern, session_data, response):
+        """Index a freshly generated answer (and persist it when a database is configured)."""
+        if not self._ready():
+            return
+        entry = {"id": None, "facets": self.facet_key(session_data), "concern": self.normalize_concern(concern),
+                 "response": response, "stored_at": time.time()}
+        with self._lock:
+            if self._db is not None:
+                cursor = self._db.execute(
+                    "INSERT INTO concerns (facets, concern, response, stored_at) VALUES (?, ?, ?, ?)",
+                    (json.dumps(entry["facets"]), entry["concern"], response, entry["stored_at"])
+                )
+                entry["id"] = cursor.lastrowid
+            self._index([entry])
+            evicted = [self._evict_oldest() for _ in range(len(self._order) - self.max_entries)]
+            if self._db is not None:
+                self._db.executemany("DELETE FROM concerns WHERE id = ?", [(old["id"],) for old in evicted])
+                self._db.commit()
+
+    async def add_async(self, concern, session_data, response):
+        """Like add(), but keeps vectorizing, re-indexing and the SQLite write off the event loop."""
+        return await asyncio.to_thread(self.add, concern, session_data, response)
+
+    def record_bypass(self):
+        self.stats["bypassed"] += 1
+
+    # **Audit**
+
+    def should_verify(self):
+        """Whether this hit should be re-answered in the background to check it."""
+        return self.audit_sample > 0 and random.random() < self.audit_sample
+
+    def record_verification(self, concern, session_data, hit, fresh_response):
+        """Compare a fresh answer with the served one; dissimilar answers suggest a false hit."""
+        answers = self._normalize(self._vectorizer.transform([hit["response"], fresh_response]))
+        agreement = round(float((answers[0] @ answers[1].T).toarray()[0, 0]), 4)
+        self.stats["verified_hits"] += 1
+        suspected = agreement < self.audit_min_similarity
+        if suspected:
+            self.stats["suspected_false_hits"] += 1
+        self._audit("suspected_false_hit" if suspected else "verified_hit",
+                    self.normalize_concern(concern), self.facet_key(session_data),
+                    hit["matched_concern"], hit["similarity"], answer_similarity=agreement)
+
+    async def record_verification_async(self, concern, session_data, hit, fresh_response):
+        return await asyncio.to_thread(self.record_verification, concern, session_data, hit, fresh_response)
+
+    def _audit(self, event, query, facets, matched, similarity, **extra):
+        record = {"time": time.time(), "event": event, "concern": query, "matched_concern": matched,
+                  "similarity": similarity, "facets": list(facets), **extra}
+        self._recent_audit.append(record)
+        if self.audit_log:
+            with self._lock, open(self.audit_log, "a", encoding="utf-8") as log:
+                log.write(json.dumps(record) + "\n")
+
+    def recent_audit(self):
+        return list(self._recent_audit)
+
+    def get_stats(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._order),
+            "threshold": self.threshold,
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,88 @@
+import hashlib
+import time
+
+from backend.nlp.PromptTemplates import PromptTemplates
+
+# Sections /generate-workout produces, in response order
+SECTIONS = ("fitness_analysis", "workout_plan", "nutrition_tips")
+
+
+class SessionArtifacts:
+    """
+    Generated sections stored on the session under "artifacts":
+
+        {section: {"content": str, "fingerprint": str, "source": "gpt" | "local" | "precomputed",
+                   "generated_at": float}}
+
+    The fingerprint is a hash of the template name and the rendered prompt, so it changes
+    exactly when an input the section was generated from changes. Endpoints look a
+    section up with the fingerprint of the prompt they would send and only call GPT
+    when the stored copy is missing or stale.
+    """
+
+    def __init__(self, session_manager):
+        self.session_manager = session_manager
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "stored": 0}
+
+    @staticmethod
+    def fingerprint(template, prompt):
+        return hashlib.sha256(f"{template}\0{prompt}".encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def section_fingerprints(prompts):
+        """Fingerprints for a {section: prompt} mapping from build_workout_prompts()."""
+        return {
+            section: SessionArtifacts.fingerprint(PromptTemplates.SECTION_TEMPLATES[section], prompt)
+            for section, prompt in prompts.items()
+        }
+
+    def lookup(self, session_data, section, fingerprint, include_local=False):
+        """The stored content of a section if it was generated from the same inputs, else None."""
+        artifact = (session_data.get("artifacts") or {}).get(section)
+        if artifact is None:
+            self.stats["misses"] += 1
+            return None
+        if artifact["fingerprint"] != fingerprint:
+            self.stats["stale"] += 1
+            return None
+        if artifact["source"] == "local" and not include_local:
+            # Local fallbacks stand in until GPT answers; they are not reused as final results
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return artifact["content"]
+
+    def fresh_sections(self, session_data, fingerprints):
+        """{section: content} for every section whose stored GPT copy matches its fingerprint."""
+        fresh = {}
+        for section, fingerprint in fingerprints.items():
+            content = self.lookup(session_data, section, fingerprint)
+            if content is not None:
+                fresh[section] = content
+        return fresh
+
+    @staticmethod
+    def merged(session_data, sections, fingerprints, source="gpt"):
+        """Session data with these sections stored as artifacts (other sections are kept)."""
+        now = time.time()
+        artifacts = dict(session_data.get("artifacts") or {})
+        for section, content in sections.items():
+            artifacts[section] = {"content": content, "fingerprint": fingerprints[section],
+                                  "source": source, "generated_at": now}
+        return {**session_data, "artifacts": artifacts}
+
+    async def store(self, session_id, sections, fingerprints, source="gpt"):
+        """Save sections on the session (re-read first so concurrent updates are kept)."""
+        if not sections:
+            return
+        session_data = await self.session_manager.get_session_async(session_id)
+        if not session_data:
+            return
+        await self.session_manager.create_session_async(
+            session_id, self.merged(session_data, sections, fingerprints, source)
+        )
+        self.stats["stored"] += len(sections)
+
+    def get_stats(self):
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["stale"]
+        return {**self.stats, "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else 0.0}
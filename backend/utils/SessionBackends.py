@@ -0,0 +1,165 @@
+import json
+import sqlite3
+import threading
+import time
+
+from backend.utils.SessionRecord import SessionRecord
+
+
+class SessionBackend:
+    """
+    Storage interface behind SessionManager.
+
+    Backends store plain JSON-serializable dicts and track when each session was
+    last accessed so idle sessions can be purged. load() may return a read-only
+    mapping (SessionRecord) instead of a dict; callers update a session by saving a
+    new dict.
+    """
+
+    # True when several processes can see the same sessions (e.g. uvicorn workers)
+    shared = False
+
+    def load(self, session_id):
+        """Return the stored session dict, or None."""
+        raise NotImplementedError
+
+    def save(self, session_id, data):
+        """Create or replace a session."""
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def touch(self, accessed):
+        """Refresh idle timers of sessions served from a front cache ({session_id: accessed_at})."""
+        raise NotImplementedError
+
+    def purge_expired(self, idle_ttl):
+        """Delete sessions idle for longer than idle_ttl seconds; returns the count removed."""
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemorySessionBackend(SessionBackend):
+    """
+    Process-local dict storage (single worker only). With compress_min_bytes set,
+    sessions are kept as SessionRecords, compressing strings of at least that size.
+    """
+
+    def __init__(self, compress_min_bytes=None):
+        self.sessions = {}  # session_id -> [data, accessed_at]
+        self.compress_min_bytes = compress_min_bytes
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        entry = self.sessions.get(session_id)
+        if entry is None:
+            return None
+        entry[1] = time.time()
+        return entry[0]
+
+    def save(self, session_id, data):
+        if self.compress_min_bytes is not None:
+            data = SessionRecord.pack(data, self.compress_min_bytes)
+        self.sessions[session_id] = [data, time.time()]
+
+    def delete(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    def touch(self, accessed):
+        for session_id, accessed_at in accessed.items():
+            entry = self.sessions.get(session_id)
+            if entry is not None:
+                entry[1] = max(entry[1], accessed_at)
+
+    def purge_expired(self, idle_ttl):
+        cutoff = time.time() - idle_ttl
+        with self._lock:
+            expired = [sid for sid, (_, accessed_at) in list(self.sessions.items()) if accessed_at < cutoff]
+            for session_id in expired:
+                self.sessions.pop(session_id, None)
+        return len(expired)
+
+    def count(self):
+        return len(self.sessions)
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    SQLite storage in WAL mode, shared by every worker process on the host.
+    Each thread gets its own connection; WAL lets readers proceed while a writer commits.
+    """
+
+    shared = True
+
+    def __init__(self, db_path="sessions.db"):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_accessed_at ON sessions (accessed_at)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id):
+        conn = self._conn()
+        row = conn.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE sessions SET accessed_at = ? WHERE session_id = ?", (time.time(), session_id))
+        conn.commit()
+        return json.loads(row[0])
+
+    def save(self, session_id, data):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, data, accessed_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(dict(data)), time.time()),
+        )
+        conn.commit()
+
+    def delete(self, session_id):
+        conn = self._conn()
+        conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        conn.commit()
+
+    def touch(self, accessed):
+        if not accessed:
+            return
+        conn = self._conn()
+        conn.executemany(
+            "UPDATE sessions SET accessed_at = MAX(accessed_at, ?) WHERE session_id = ?",
+            [(accessed_at, session_id) for session_id, accessed_at in accessed.items()],
+        )
+        conn.commit()
+
+    def purge_expired(self, idle_ttl):
+        conn = self._conn()
+        cursor = conn.execute("DELETE FROM sessions WHERE accessed_at < ?", (time.time() - idle_ttl,))
+        conn.commit()
+        return cursor.rowcount
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
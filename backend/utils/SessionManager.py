@@ -1,18 +1,165 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from backend.utils.SessionBackends import MemorySessionBackend, SQLiteSessionBackend
+from backend.utils.SessionRecord import DEFAULT_COMPRESS_MIN_BYTES, SessionRecord
+
+logger = logging.getLogger(__name__)
+
+
 class SessionManager:
-    """Handles user session storage."""
-    def __init__(self):
-        self.sessions = {}  # Store user data (keyed by session_id)
+    """
+    Handles user session storage.
+
+    Sessions live in a pluggable SessionBackend. Shared backends (SQLite) are fronted
+    by a bounded in-process LRU cache; a background sweeper expires idle sessions.
+    Sessions held in process memory (memory backend, front cache) are compact
+    SessionRecords unless SESSION_COMPACT=0.
+
+    Configured through environment variables:
+    - SESSION_BACKEND: "memory" (default, single worker) or "sqlite" (multi-worker)
+    - SESSION_DB: SQLite file path (default "sessions.db")
+    - SESSION_CACHE_SIZE: front cache entries (default 10000)
+    - SESSION_CACHE_FRESHNESS: seconds a cached copy is trusted before re-reading the
+      shared store, so writes from other workers become visible (default 2)
+    - SESSION_IDLE_TTL: seconds of inactivity before a session expires (default 3600)
+    - SESSION_SWEEP_INTERVAL: seconds between sweeper runs (default 60)
+    - SESSION_COMPACT: "1" (default) keeps in-memory sessions as SessionRecords, "0" as plain dicts
+    - SESSION_COMPRESS_MIN_BYTES: strings at least this long are stored zlib-compressed (default 256)
+    """
+
+    def __init__(self, backend=None):
+        self.compress_min_bytes = None
+        if os.getenv("SESSION_COMPACT", "1") != "0":
+            self.compress_min_bytes = int(os.getenv("SESSION_COMPRESS_MIN_BYTES", str(DEFAULT_COMPRESS_MIN_BYTES)))
+        self.backend = backend or self._backend_from_env()
+        self.cache_size = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+        self.cache_freshness = float(os.getenv("SESSION_CACHE_FRESHNESS", "2"))
+        self.idle_ttl = float(os.getenv("SESSION_IDLE_TTL", "3600"))
+        self.sweep_interval = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+
+        self._cache = OrderedDict()  # session_id -> [data, loaded_at, accessed_at]
+        self._touched = set()  # cache hits not yet written back to the backend
+        self._lock = threading.Lock()
+        self._sweeper = None
+
+    def _backend_from_env(self):
+        if os.getenv("SESSION_BACKEND", "memory").lower() == "sqlite":
+            return SQLiteSessionBackend(os.getenv("SESSION_DB", "sessions.db"))
+        return MemorySessionBackend(self.compress_min_bytes)
+
+    @property
+    def _use_cache(self):
+        # A process-local backend is already in memory; only shared stores need a front cache
+        return self.backend.shared and self.cache_size > 0
 
     def create_session(self, session_id, user_data):
         """Create or update a session."""
-        self.sessions[session_id] = user_data
+        self.backend.save(session_id, user_data)
+        if self._use_cache:
+            self._cache_put(session_id, user_data)
 
     def get_session(self, session_id):
         """Retrieve session data if exists."""
-        return self.sessions.get(session_id, None)
+        if self._use_cache:
+            data = self._cache_get(session_id)
+            if data is not None:
+                return data
+
+        data = self.backend.load(session_id)
+        if data is not None and self._use_cache:
+            self._cache_put(session_id, data)
+        return data
 
     def delete_session(self, session_id):
         """Clear session data (new user starts fresh)."""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        with self._lock:
+            self._cache.pop(session_id, None)
+            self._touched.discard(session_id)
+        self.backend.delete(session_id)
+
+    # **Async variants: storage I/O runs off the event loop for shared backends**
+    async def create_session_async(self, session_id, user_data):
+        if not self.backend.shared:
+            return self.create_session(session_id, user_data)
+        return await asyncio.to_thread(self.create_session, session_id, user_data)
+
+    async def get_session_async(self, session_id):
+        if not self.backend.shared:
+            return self.get_session(session_id)
+        if self._use_cache:
+            data = self._cache_get(session_id)
+            if data is not None:
+                return data
+        return await asyncio.to_thread(self.get_session, session_id)
+
+    async def delete_session_async(self, session_id):
+        if not self.backend.shared:
+            return self.delete_session(session_id)
+        return await asyncio.to_thread(self.delete_session, session_id)
+
+    def _cache_get(self, session_id):
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(session_id)
+            if entry is None:
+                return None
+            if now - entry[1] > self.cache_freshness or now - entry[2] > self.idle_ttl:
+                del self._cache[session_id]
+                return None
+            entry[2] = now
+            self._cache.move_to_end(session_id)
+            self._touched.add(session_id)
+            return entry[0]
+
+    def _cache_put(self, session_id, data):
+        if self.compress_min_bytes is not None:
+            data = SessionRecord.pack(data, self.compress_min_bytes)
+        now = time.time()
+        with self._lock:
+            self._cache[session_id] = [data, now, now]
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def sweep(self):
+        """Flush cache-hit access times, drop idle cache entries and purge expired sessions."""
+        now = time.time()
+        with self._lock:
+            touched = {sid: self._cache[sid][2] for sid in self._touched if sid in self._cache}
+            self._touched.clear()
+            for session_id, entry in list(self._cache.items()):
+                if now - entry[2] > self.idle_ttl:
+                    del self._cache[session_id]
+        self.backend.touch(touched)
+        return self.backend.purge_expired(self.idle_ttl)
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error("Session sweeper failed: %s", e)
+
+    def start_sweeper(self):
+        """Start the background sweeper on the running event loop."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
 
+    def size(self):
+        """Number of stored sessions."""
+        return self.backend.count()
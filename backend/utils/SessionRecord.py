@@ -0,0 +1,90 @@
+import json
+import sys
+import zlib
+from collections.abc import Mapping
+
+# UserInput fields and the values derived from them, kept in slots instead of dict entries
+PROFILE_FIELDS = (
+    "weight", "height", "gender", "age", "hypertension", "diabetes", "fitness_goal", "workout_preference",
+    "workout_location", "duration", "experience_level", "bmi", "recommendation_level",
+)
+# Enum-like answers repeated across sessions: one shared string object per distinct value
+CATEGORICAL_FIELDS = frozenset((
+    "hypertension", "diabetes", "fitness_goal", "workout_preference", "workout_location", "duration",
+    "experience_level",
+))
+DEFAULT_COMPRESS_MIN_BYTES = 256
+
+
+def _encode(value, min_bytes):
+    """JSON text of a value; zlib-compressed bytes when the text is at least min_bytes long."""
+    text = json.dumps(value, separators=(",", ":"))
+    if len(text) >= min_bytes:
+        return zlib.compress(text.encode("utf-8"))
+    return text
+
+
+def _decode(stored):
+    if isinstance(stored, bytes):
+        stored = zlib.decompress(stored)
+    return json.loads(stored)
+
+
+class SessionRecord(Mapping):
+    """
+    Compact, read-only form of a session dict, as kept in process memory by SessionManager.
+
+    Profile fields live in slots (no per-session dict or key objects) and categorical
+    answers are interned, so 100k sessions share a handful of "Muscle Gain" / "beginner"
+    strings. Every other value (artifacts, conversation, plan, prefetched videos) is kept
+    as its JSON text, zlib-compressed from `min_bytes` on, and only decoded when its key
+    is read; one compressed blob per value instead of a graph of small dicts and strings.
+
+    Reads behave like the dict it was packed from: `record["artifacts"]`, `.get()`, `in`,
+    `{**record, ...}` and `dict(record)` return plain dicts, lists and strings (fresh
+    copies, so changing them never alters the stored session). Values must be
+    JSON-serializable, as for the SQLite backend.
+    """
+
+    __slots__ = PROFILE_FIELDS + ("_extra",)
+
+    def __init__(self, data, min_bytes=DEFAULT_COMPRESS_MIN_BYTES):
+        extra = {}
+        for key, value in data.items():
+            if key in PROFILE_FIELDS:
+                setattr(self, key, sys.intern(value) if key in CATEGORICAL_FIELDS and isinstance(value, str) else value)
+            else:
+                extra[sys.intern(key)] = _encode(value, min_bytes)
+        self._extra = extra or None
+
+    @classmethod
+    def pack(cls, data, min_bytes=DEFAULT_COMPRESS_MIN_BYTES):
+        return data if isinstance(data, cls) else cls(data, min_bytes)
+
+    def __getitem__(self, key):
+        if key in PROFILE_FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return _decode(self._extra[key])
+
+    def __contains__(self, key):
+        if key in PROFILE_FIELDS:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for name in PROFILE_FIELDS:
+            if hasattr(self, name):
+                yield name
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for name in PROFILE_FIELDS if hasattr(self, name)) + len(self._extra or ())
+
+    def __repr__(self):
+        return f"SessionRecord({dict(self)!r})"
@@ -0,0 +1,122 @@
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import uuid
+
+from backend.utils.Metrics import REGISTRY
+
+# Correlates the spans of one request (also across the tasks it starts)
+request_id = contextvars.ContextVar("request_id", default=None)
+
+SPAN_SECONDS = REGISTRY.histogram("span_duration_seconds", "Duration of traced request stages.", ("span",))
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class Tracing:
+    """
+    Optional per-request timing spans (rule evaluation, prompt build, each GPT call, each
+    YouTube call), selected with TRACE_SPANS:
+    - "off" (default): span() is a shared no-op context manager
+    - "log": one JSON line per span ({"request_id", "span", "duration_ms", ...attributes})
+      written by a background thread to stderr or TRACE_LOG_FILE, so the request path
+      never blocks on log I/O
+    - "otel": spans are started through the OpenTelemetry API (opentelemetry-api, if
+      installed); where they go is up to the SDK/exporter the deployment configures,
+      with none configured they are dropped
+    Enabled spans are also timed into the span_duration_seconds histogram on /metrics.
+    """
+
+    mode = "off"
+    _logger = None
+    _listener = None
+    _tracer = None
+
+    @classmethod
+    def configure(cls, mode=None, log_file=None):
+        mode = (mode or os.getenv("TRACE_SPANS", "off")).lower()
+        if mode == "otel":
+            try:
+                from opentelemetry import trace
+                cls._tracer = trace.get_tracer("fitness-coach")
+            except ImportError:
+                logging.getLogger(__name__).warning("TRACE_SPANS=otel but opentelemetry-api is not installed; logging spans")
+                mode = "log"
+        if mode == "log" and cls._logger is None:
+            log_file = log_file or os.getenv("TRACE_LOG_FILE")
+            handler = logging.FileHandler(log_file) if log_file else logging.StreamHandler(sys.stderr)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            records = queue.SimpleQueue()
+            cls._listener = logging.handlers.QueueListener(records, handler)
+            cls._listener.start()
+            cls._logger = logging.getLogger("backend.trace")
+            cls._logger.addHandler(logging.handlers.QueueHandler(records))
+            cls._logger.setLevel(logging.INFO)
+            cls._logger.propagate = False
+        cls.mode = mode if mode in ("log", "otel") else "off"
+
+    @classmethod
+    def shutdown(cls):
+        if cls._listener is not None:
+            cls._listener.stop()
+            cls._listener = None
+
+    @staticmethod
+    def new_request_id(incoming=None):
+        return request_id.set(incoming or uuid.uuid4().hex[:16])
+
+    @classmethod
+    def span(cls, name, **attributes):
+        """Time a block: `with Tracing.span("gpt_call", template=...):`."""
+        if cls.mode == "off":
+            return _NULL_SPAN
+        return cls._span(name, attributes)
+
+    @classmethod
+    @contextlib.contextmanager
+    def _span(cls, name, attributes):
+        started = time.perf_counter()
+        error = None
+        otel_span = cls._tracer.start_as_current_span(name, attributes=attributes) if cls.mode == "otel" else None
+        try:
+            if otel_span is not None:
+                with otel_span:
+                    yield
+            else:
+                yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            SPAN_SECONDS.observe(duration, name)
+            if cls.mode == "log":
+                record = {"request_id": request_id.get(), "span": name, "duration_ms": round(duration * 1000, 3),
+                          **attributes}
+                if error:
+                    record["error"] = error
+                cls._logger.info(json.dumps(record, default=str))
+
+
+class TracingMiddleware:
+    """ASGI middleware giving each request an ID (X-Request-ID when sent) and, in "otel" mode, a root span."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or Tracing.mode == "off":
+            return await self.app(scope, receive, send)
+        incoming = dict(scope.get("headers") or []).get(b"x-request-id")
+        token = Tracing.new_request_id(incoming.decode("latin-1")[:64] if incoming else None)
+        try:
+            with Tracing.span("request", method=scope["method"], path=scope["path"]):
+                await self.app(scope, receive, send)
+        finally:
+            request_id.reset(token)
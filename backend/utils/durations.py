@@ -0,0 +1,25 @@
+import math
+import re
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)?\s*(day|week|month|year)")
+_NUMBER = re.compile(r"(\d+(?:\.\d+)?)")
+WEEKS_PER_UNIT = {"day": 1 / 7, "week": 1, "month": 4, "year": 52}
+DEFAULT_PLAN_WEEKS = 4
+MAX_PLAN_WEEKS = 52
+
+
+def parse_weeks(duration):
+    """
+    Weeks in a free-text plan duration, shared by FallbackPlanEngine (how many weeks a plan is
+    laid out in) and ModelRouter (how much output a plan is budgeted):
+    '1 week' -> 1, '6 weeks' -> 6, '2 months' -> 8, '10 days' -> 2, 'a year' -> 52, '6' -> 6
+    (default 4 when no duration can be read, max 52).
+    """
+    text = (duration or "").lower()
+    match = _DURATION.search(text) or _NUMBER.search(text)
+    if not match:
+        return DEFAULT_PLAN_WEEKS
+    amount = float(match.group(1) or 1)
+    unit = match.group(2) if match.re is _DURATION else "week"
+    weeks = math.ceil(round(amount * WEEKS_PER_UNIT[unit], 6))
+    return max(1, min(weeks, MAX_PLAN_WEEKS))
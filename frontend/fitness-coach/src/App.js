@@ -1,5 +1,4 @@
 import React, { useState } from "react";
-import axios from "axios";
 import "./App.css"; // ✅ Import the CSS file
 
 // Import our separate components
@@ -45,15 +44,72 @@ function App() {
     setLoading(true);
 
     try {
-      const response = await axios.post(
-        "http://127.0.0.1:8000/generate-workout",
-        formData
+      // Stream the plan: BMI and level arrive first, then each section fills in
+      const response = await fetch(
+        "http://127.0.0.1:8000/generate-workout/stream",
+        {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify(formData),
+        }
       );
-      // Merge formData and response data into one object
-    setSessionData({
-      ...formData, 
-      ...response.data,
-    });
+      if (!response.ok || !response.body) {
+        throw new Error(`Request failed with status ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+
+      const handleEvent = (eventName, data) => {
+        if (eventName === "meta") {
+          // Merge formData and response data into one object
+          setSessionData({
+            ...formData,
+            ...data,
+            fitness_analysis: "",
+            workout_plan: "",
+            nutrition_tips: "",
+            pendingSections: ["fitness_analysis", "workout_plan", "nutrition_tips"],
+          });
+          setLoading(false);
+        } else if (eventName === "delta") {
+          setSessionData((prev) => ({
+            ...prev,
+            [data.section]: prev[data.section] + data.delta,
+          }));
+        } else if (eventName === "section_reset") {
+          // The section stream failed part-way; the local plan replaces it
+          setSessionData((prev) => ({ ...prev, [data.section]: "" }));
+        } else if (eventName === "section_done") {
+          setSessionData((prev) => ({
+            ...prev,
+            pendingSections: prev.pendingSections.filter(
+              (section) => section !== data.section
+            ),
+          }));
+        }
+      };
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+          const rawEvent = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          let eventName = "message";
+          let dataText = "";
+          rawEvent.split("\n").forEach((line) => {
+            if (line.startsWith("event: ")) eventName = line.slice(7);
+            else if (line.startsWith("data: ")) dataText += line.slice(6);
+          });
+          if (dataText) handleEvent(eventName, JSON.parse(dataText));
+        }
+      }
     } catch (error) {
       console.error("Error generating workout:", error);
       alert("An error occurred while generating the workout plan.");
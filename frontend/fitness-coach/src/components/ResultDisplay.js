@@ -7,8 +7,29 @@ import "./ResultDisplay.css";
 function ResultDisplay({ sessionData, onNewSession, onExerciseSelect }) {
   const workoutRef = useRef(null);
 
+  // Sections still streaming in from the server (empty for a complete response)
+  const pendingSections = sessionData.pendingSections || [];
+  const isPending = (section) => pendingSections.includes(section);
+  const workoutPending = isPending("workout_plan");
+
+  const renderSection = (section) => {
+    if (isPending(section) && !sessionData[section]) {
+      return <p className="section-loading">Generating...</p>;
+    }
+    return (
+      <ReactMarkdown
+        className="markdown-content"
+        remarkPlugins={[remarkGfm]}
+        rehypePlugins={[rehypeRaw]}
+      >
+        {sessionData[section]}
+      </ReactMarkdown>
+    );
+  };
+
   useEffect(() => {
-    if (workoutRef.current && onExerciseSelect) {
+    // Wait for the workout table to finish streaming before wiring up clicks
+    if (workoutRef.current && onExerciseSelect && !workoutPending) {
       // Add null check for onExerciseSelect
       const tables = workoutRef.current.getElementsByTagName("table");
       Array.from(tables).forEach((table) => {
@@ -33,7 +54,7 @@ function ResultDisplay({ sessionData, onNewSession, onExerciseSelect }) {
         }
       });
     }
-  }, [sessionData, onExerciseSelect]);
+  }, [sessionData.workout_plan, workoutPending, onExerciseSelect]);
 
   return (
     <div className="result-container">
@@ -58,13 +79,7 @@ function ResultDisplay({ sessionData, onNewSession, onExerciseSelect }) {
 
       {/* Fitness Analysis */}
       <section className="markdown-section">
-        <ReactMarkdown
-          className="markdown-content"
-          remarkPlugins={[remarkGfm]}
-          rehypePlugins={[rehypeRaw]}
-        >
-          {sessionData.fitness_analysis}
-        </ReactMarkdown>
+        {renderSection("fitness_analysis")}
       </section>
 
       {/* Workout Plan */}
@@ -73,25 +88,13 @@ function ResultDisplay({ sessionData, onNewSession, onExerciseSelect }) {
         <p className="table-instruction">
           Click on any exercise to see video demonstrations
         </p>
-        <ReactMarkdown
-          className="markdown-content"
-          remarkPlugins={[remarkGfm]}
-          rehypePlugins={[rehypeRaw]}
-        >
-          {sessionData.workout_plan}
-        </ReactMarkdown>
+        {renderSection("workout_plan")}
       </section>
 
       {/* Nutrition Tips */}
       <section className="markdown-section">
         <h3>Nutrition Tips</h3>
-        <ReactMarkdown
-          className="markdown-content"
-          remarkPlugins={[remarkGfm]}
-          rehypePlugins={[rehypeRaw]}
-        >
-          {sessionData.nutrition_tips}
-        </ReactMarkdown>
+        {renderSection("nutrition_tips")}
       </section>
     </div>
   );
@@ -26,9 +26,13 @@ const YoutubeVideo = ({ sessionData, selectedExercise }) => {
             // Construct search query using exercise name and user's experience level
             const searchQuery = `${exerciseName} ${sessionData.experience_level} form technique`;
             
+            // The session lets the backend answer from videos it prefetched for this plan's exercises
             const response = await axios.post('http://localhost:8000/youtube-search', {
                 query: searchQuery,
-                max_results: 10
+                max_results: 10,
+                exercise: selectedExercise
+            }, {
+                headers: { 'session-id': sessionData.session_id }
             });
             
             setVideos(response.data.videos);
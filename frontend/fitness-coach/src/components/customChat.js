@@ -71,6 +71,16 @@ class CustomChat extends React.Component {
 
       const data = await response.json();
 
+      if (data.pending) {
+        // Past the server's latency budget: show the quick answer (if any) and fetch the full one later
+        const entryIndex = this.state.chatHistory.length - 1;
+        const updatedChatHistory = [...this.state.chatHistory];
+        updatedChatHistory[entryIndex].bot = data.response || 'LOTTIE_PLACEHOLDER';
+        this.setState({ chatHistory: updatedChatHistory, isLoading: false });
+        this.pollConcernAnswer(sessionId, data.concern_id, entryIndex);
+        return;
+      }
+
       if (!data.response) {
         console.error('Invalid API response:', data);
         // Replace the placeholder with an error message
@@ -98,6 +108,30 @@ class CustomChat extends React.Component {
     }
   };
 
+  // Poll for the answer to a concern that missed the latency budget, then replace the entry's reply
+  pollConcernAnswer = async (sessionId, concernId, entryIndex, attempt = 0) => {
+    try {
+      const response = await fetch(`http://localhost:8000/user-concerns/${sessionId}/${concernId}`);
+      const data = response.ok ? await response.json() : { status: 'failed' };
+
+      if (data.status === 'pending' && attempt < 30) {
+        setTimeout(() => this.pollConcernAnswer(sessionId, concernId, entryIndex, attempt + 1), 2000);
+        return;
+      }
+
+      const updatedChatHistory = [...this.state.chatHistory];
+      const entry = updatedChatHistory[entryIndex];
+      if (data.status === 'ready') {
+        entry.bot = data.response;
+      } else if (entry.bot === 'LOTTIE_PLACEHOLDER') {
+        entry.bot = 'Error: No response received';
+      }
+      this.setState({ chatHistory: updatedChatHistory });
+    } catch (error) {
+      console.error('Error fetching concern answer:', error);
+    }
+  };
+
   render() {
     const { userMessage, chatHistory } = this.state;
 
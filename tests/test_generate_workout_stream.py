@@ -0,0 +1,106 @@
+"""/generate-workout/stream must fall back to the local plan when a section stream stalls or fails."""
+import asyncio
+import json
+
+import httpx
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+import backend.main as main
+from backend.models.RuleBasedRecommender import RuleBasedRecommender
+from backend.nlp.GPTClient import GPTClient
+
+SECTIONS = ("fitness_analysis", "workout_plan", "nutrition_tips")
+
+PROFILE = dict(
+    weight=70, height=175, gender=1, age=30, hypertension="No", diabetes="No",
+    fitness_goal="Muscle Gain", workout_preference="Mixed", workout_location="Gym",
+    duration="1 week", experience_level="beginner",
+)
+
+
+def chunk(model, content):
+    payload = {
+        "id": "x", "object": "chat.completion.chunk", "created": 0, "model": model,
+        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+    }
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+async def stalled(request):
+    await asyncio.sleep(5)
+    return httpx.Response(503)
+
+
+async def broken(request):
+    """Send one delta, then drop the connection."""
+    model = json.loads(request.content)["model"]
+
+    async def body():
+        yield chunk(model, "Partial plan")
+        raise httpx.ReadError("connection reset")
+
+    return httpx.Response(200, content=body(), headers={"content-type": "text/event-stream"})
+
+
+def read_events(response):
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def local_sections():
+    user_input = main.UserInput(**PROFILE)
+    bmi = RuleBasedRecommender.calculate_bmi(user_input.weight, user_input.height)
+    level = RuleBasedRecommender.get_recommendation_level(
+        user_input.weight, user_input.height, user_input.age, user_input.hypertension, user_input.diabetes
+    )
+    return main.fallback_engine.build_sections(user_input, level, bmi)
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    def run(handler):
+        client = openai.AsyncOpenAI(
+            api_key="test", max_retries=0, http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+        monkeypatch.setattr(GPTClient, "_async_client", client)
+        monkeypatch.setitem(main.LATENCY_BUDGETS, "/generate-workout", 0.2)
+        with TestClient(main.app) as test_client:
+            response = test_client.post("/generate-workout/stream", json=PROFILE, headers={"cache-bypass": "1"})
+            assert response.status_code == 200
+            events = read_events(response)
+            session_id = events[0][1]["session_id"]
+            plan = test_client.get(f"/session/{session_id}/plan")
+        return events, plan
+    return run
+
+
+@pytest.mark.parametrize("handler", [stalled, broken], ids=["stalled", "broken"])
+def test_failed_sections_stream_the_local_plan(stream, handler):
+    events, plan = stream(handler)
+    expected = local_sections()
+
+    done = {data["section"]: data["source"] for event, data in events if event == "section_done"}
+    assert done == {section: "local" for section in SECTIONS}
+
+    text = {section: "" for section in SECTIONS}
+    for event, data in events:
+        if event == "section_reset":
+            text[data["section"]] = ""
+        elif event == "delta":
+            text[data["section"]] += data["delta"]
+    assert text == {section: expected[section] for section in SECTIONS}
+    assert events[-1][0] == "done"
+
+    # Neither the local sections nor the partial text are stored for reuse
+    assert plan.status_code == 404
+
+
+def test_partial_text_is_reset(stream):
+    events, _ = stream(broken)
+    reset = {data["section"] for event, data in events if event == "section_reset"}
+    assert reset == set(SECTIONS)
@@ -0,0 +1,90 @@
+"""GPTScheduler gives calls up at their deadline, hedges slow interactive calls and cancels what is no longer needed."""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from backend.nlp.GPTClient import GPTClient
+from backend.nlp.GPTScheduler import PRIORITY_BULK, GPTScheduler
+
+
+class SlowClient:
+    """Each request takes the next delay from `delays`; records requests sent, finished and cancelled."""
+
+    ERROR_PREFIX = GPTClient.ERROR_PREFIX
+
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.calls = {"sent": 0, "finished": 0, "cancelled": 0}
+
+    @staticmethod
+    def is_rate_limit(error):
+        return False
+
+    async def create_completion_async(self, prompt, model, temperature, max_tokens):
+        number = self.calls["sent"] = self.calls["sent"] + 1
+        try:
+            await asyncio.sleep(self.delays[number - 1])
+        except asyncio.CancelledError:
+            self.calls["cancelled"] += 1
+            raise
+        self.calls["finished"] += 1
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"reply {number}"), finish_reason="stop")],
+            usage=None,
+        )
+
+
+def run(scheduler, **kwargs):
+    async def scenario():
+        try:
+            return await scheduler.generate("prompt", "gpt-4o", 0.7, 100, template="workout_plan_prompt", **kwargs)
+        finally:
+            await scheduler.aclose()
+    return asyncio.run(scenario())
+
+
+def test_in_flight_call_is_cancelled_at_the_deadline():
+    client = SlowClient([5])
+    scheduler = GPTScheduler(client)
+    started = time.monotonic()
+    response = run(scheduler, deadline=time.monotonic() + 0.1)
+    assert time.monotonic() - started < 1
+    assert response == f"{GPTClient.ERROR_PREFIX} deadline exceeded"
+    assert client.calls == {"sent": 1, "finished": 0, "cancelled": 1}
+    assert scheduler.stats["deadline_exceeded"] == 1
+    assert scheduler.stats["cancelled"] == 1
+
+
+def test_queued_call_past_its_deadline_is_never_sent():
+    client = SlowClient([0])
+    scheduler = GPTScheduler(client)
+    scheduler._paused_until = time.monotonic() + 5  # as after a 429
+    response = run(scheduler, deadline=time.monotonic() + 0.1)
+    assert GPTClient.ERROR_PREFIX in response
+    assert client.calls["sent"] == 0
+    # Nothing was sent, so the whole prompt and expected reply count as saved
+    assert scheduler.stats["cancelled_tokens_saved"] > 100
+
+
+def test_slow_interactive_call_is_hedged(monkeypatch):
+    monkeypatch.setenv("GPT_HEDGE", "1")
+    monkeypatch.setenv("GPT_HEDGE_MIN_SAMPLES", "5")
+    client = SlowClient([5, 0])
+    scheduler = GPTScheduler(client)
+    scheduler._latencies["workout_plan_prompt"] = [0.05] * 5
+    started = time.monotonic()
+    assert run(scheduler) == "reply 2"
+    assert time.monotonic() - started < 1
+    assert client.calls == {"sent": 2, "finished": 1, "cancelled": 1}
+    assert (scheduler.stats["hedged"], scheduler.stats["hedge_wins"]) == (1, 1)
+
+
+def test_bulk_calls_are_not_hedged(monkeypatch):
+    monkeypatch.setenv("GPT_HEDGE", "1")
+    monkeypatch.setenv("GPT_HEDGE_MIN_SAMPLES", "5")
+    client = SlowClient([0.3])
+    scheduler = GPTScheduler(client)
+    scheduler._latencies["workout_plan_prompt"] = [0.05] * 5
+    assert run(scheduler, priority=PRIORITY_BULK) == "reply 1"
+    assert client.calls["sent"] == 1
+    assert scheduler.stats["hedged"] == 0
@@ -0,0 +1,128 @@
+"""GPTScheduler admission: token buckets, priorities and backing off on 429s for the server's Retry-After."""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.nlp.GPTClient import GPTClient
+from backend.nlp.GPTScheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, GPTScheduler, TokenBucket
+
+
+class RateLimited(Exception):
+    def __init__(self, headers):
+        super().__init__("429 Too Many Requests")
+        self.response = SimpleNamespace(headers=headers)
+
+
+def reply(text, total_tokens=50):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text), finish_reason="stop")],
+        usage=SimpleNamespace(total_tokens=total_tokens, completion_tokens=10),
+    )
+
+
+class FakeClient:
+    """Answers from `outcomes` in order: exceptions are raised, anything else returned."""
+
+    ERROR_PREFIX = GPTClient.ERROR_PREFIX
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.sent_at = []
+
+    @staticmethod
+    def is_rate_limit(error):
+        return isinstance(error, RateLimited)
+
+    async def create_completion_async(self, prompt, model, temperature, max_tokens):
+        self.sent_at.append(time.monotonic())
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_token_bucket_refills_per_minute(clock):
+    bucket = TokenBucket(600)
+    assert bucket.wait_time(600) == 0.0
+    bucket.consume(600)
+    assert bucket.wait_time(10) == pytest.approx(1.0)
+    clock[0] += 0.5
+    assert bucket.wait_time(10) == pytest.approx(0.5)
+    # Requests larger than the bucket wait for a full one rather than forever
+    assert bucket.wait_time(10_000) == pytest.approx(59.5)
+    bucket.adjust(-100)  # usage came in below the estimate
+    assert bucket.wait_time(100) == 0.0
+    assert TokenBucket(0).wait_time(10 ** 9) == 0.0
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after-ms": "250"}, 0.25),
+    ({"retry-after": "3"}, 3.0),
+    ({"retry-after": "Wed, 21 Oct 2026 07:28:00 GMT"}, None),
+    ({}, None),
+])
+def test_retry_after(headers, expected):
+    assert GPTScheduler._retry_after(RateLimited(headers)) == expected
+
+
+def test_rate_limited_call_waits_for_retry_after():
+    client = FakeClient([RateLimited({"retry-after-ms": "200"}), reply("plan")])
+    scheduler = GPTScheduler(client)
+
+    async def scenario():
+        try:
+            return await scheduler.generate("prompt", "gpt-4o", 0.7, 100)
+        finally:
+            await scheduler.aclose()
+
+    assert asyncio.run(scenario()) == "plan"
+    assert client.sent_at[1] - client.sent_at[0] >= 0.2
+    assert (scheduler.stats["rate_limited"], scheduler.stats["retries"], scheduler.stats["gave_up"]) == (1, 1, 0)
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setenv("OPENAI_RATE_LIMIT_RETRIES", "1")
+    client = FakeClient([RateLimited({"retry-after-ms": "10"}), RateLimited({"retry-after-ms": "10"})])
+    scheduler = GPTScheduler(client)
+
+    async def scenario():
+        try:
+            return await scheduler.generate("prompt", "gpt-4o", 0.7, 100)
+        finally:
+            await scheduler.aclose()
+
+    assert asyncio.run(scenario()).startswith(GPTClient.ERROR_PREFIX)
+    assert (scheduler.stats["rate_limited"], scheduler.stats["gave_up"]) == (2, 1)
+
+
+def test_interactive_calls_are_admitted_before_bulk(monkeypatch):
+    monkeypatch.setenv("OPENAI_RPM", "60")
+    scheduler = GPTScheduler(FakeClient([]))
+    admitted = []
+
+    async def wait(name, priority):
+        await scheduler.acquire(10, priority)
+        admitted.append(name)
+
+    async def scenario():
+        scheduler.request_bucket.consume(60)  # empty: the next request is admitted in about a second
+        waiters = [asyncio.create_task(wait("bulk", PRIORITY_BULK))]
+        await asyncio.sleep(0.01)
+        waiters.append(asyncio.create_task(wait("interactive", PRIORITY_INTERACTIVE)))
+        await asyncio.sleep(0.01)
+        scheduler.request_bucket.tokens = 2  # room for both
+        scheduler._wakeup.set()
+        await asyncio.gather(*waiters)
+        await scheduler.aclose()
+
+    asyncio.run(scenario())
+    assert admitted == ["interactive", "bulk"]
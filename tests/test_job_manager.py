@@ -0,0 +1,79 @@
+"""JobManager runs rows with bounded concurrency, checkpoints results and always releases a job."""
+import asyncio
+import json
+import os
+
+from backend.utils.JobManager import JobManager
+
+
+async def echo(row):
+    return {"echo": row["n"]}
+
+
+def upload(rows):
+    async def chunks():
+        yield "".join(json.dumps(row) + "\n" for row in rows).encode()
+    return chunks()
+
+
+async def run_job(manager, rows, concurrency=None):
+    status = await manager.create_job(upload(rows), "application/x-ndjson", concurrency)
+    await manager._running[status["job_id"]]
+    return await manager.get_status(status["job_id"])
+
+
+def test_concurrency_is_clamped(tmp_path):
+    manager = JobManager(echo, jobs_dir=str(tmp_path), max_concurrency=3)
+    status = asyncio.run(run_job(manager, [{"n": n} for n in range(5)], concurrency=100))
+    assert status["concurrency"] == 3
+    assert status["state"] == "completed" and status["completed"] == 5
+
+
+def test_unreadable_job_is_released(tmp_path):
+    async def scenario():
+        manager = JobManager(echo, jobs_dir=str(tmp_path))
+        status = await manager.create_job(upload([{"n": 1}]), "application/x-ndjson")
+        job_id = status["job_id"]
+        await manager._running[job_id]
+        # Losing the input makes the next run fail before any worker starts
+        os.remove(os.path.join(tmp_path, job_id, "input.ndjson"))
+        await manager.resume_job(job_id)
+        await manager._running[job_id]
+        return manager, job_id
+
+    manager, job_id = asyncio.run(scenario())
+    assert (manager._running, manager._locks, manager._conditions, manager._progress) == ({}, {}, {}, {})
+    with open(os.path.join(tmp_path, job_id, "status.json")) as status_file:
+        status = json.load(status_file)
+    assert status["state"] == "failed"
+    assert "input.ndjson" in status["error"]
+
+
+def test_resume_runs_only_rows_without_an_ok_result(tmp_path):
+    async def scenario():
+        attempts = []
+
+        async def flaky(row):
+            attempts.append(row["n"])
+            if row["n"] % 2 and attempts.count(row["n"]) == 1:
+                raise ValueError(f"row {row['n']} failed")
+            return {"echo": row["n"]}
+
+        manager = JobManager(flaky, jobs_dir=str(tmp_path))
+        first = await run_job(manager, [{"n": n} for n in range(6)], concurrency=2)
+        # A crash can leave a torn final line behind
+        with open(os.path.join(tmp_path, first["job_id"], "results.ndjson"), "a") as results:
+            results.write('{"row": 0, "sta')
+        await manager.resume_job(first["job_id"])
+        await manager._running[first["job_id"]]
+        return first, await manager.get_status(first["job_id"]), attempts
+
+    first, resumed, attempts = asyncio.run(scenario())
+    assert (first["completed"], first["failed"]) == (3, 3)
+    assert (resumed["state"], resumed["completed"], resumed["failed"]) == ("completed", 6, 0)
+    assert sorted(attempts) == [0, 1, 1, 2, 3, 3, 4, 5, 5]
+
+    with open(os.path.join(tmp_path, first["job_id"], "results.ndjson")) as results:
+        lines = [json.loads(line) for line in results if line.endswith("}\n")]
+    latest = {line["row"]: line["status"] for line in lines}
+    assert latest == {n: "ok" for n in range(6)}
@@ -0,0 +1,72 @@
+"""PlanStore serves only files written for the current templates, model routes and format version."""
+import struct
+
+import pytest
+
+from backend.nlp.ModelRouter import ModelRouter
+from backend.nlp.PromptTemplates import PromptTemplates
+from backend.utils.PlanStore import _HEADER, FORMAT_VERSION, PlanStore
+from backend.utils.SessionArtifacts import SessionArtifacts
+
+ROUTES = ModelRouter().routes
+ENTRIES = {
+    SessionArtifacts.fingerprint(PromptTemplates.SECTION_TEMPLATES["workout_plan"], f"prompt {n}"): f"plan {n} " * 50
+    for n in range(20)
+}
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    path = str(tmp_path / "plans.store")
+    PlanStore.write(path, ENTRIES, {"model": "gpt-4o"}, routes=ROUTES)
+    return path
+
+
+def test_round_trip(store_path):
+    store = PlanStore(store_path, routes=ROUTES)
+    assert (store.status, store.count, store.meta["model"]) == ("loaded", len(ENTRIES), "gpt-4o")
+    for fingerprint, content in ENTRIES.items():
+        assert store.lookup(fingerprint) == content
+    assert store.lookup("0" * 16) is None
+    assert store.get_stats()["hits"] == len(ENTRIES)
+    assert PlanStore.read_entries(store_path, routes=ROUTES)[1] == ENTRIES
+    store.close()
+
+
+def test_other_model_routes_make_the_store_stale(store_path):
+    routes = {**ROUTES, "workout_plan_prompt": {**ROUTES["workout_plan_prompt"], "model": "gpt-4.1"}}
+    store = PlanStore(store_path, routes=routes)
+    assert (store.status, store.enabled) == ("stale", False)
+    assert store.lookup_sections({"workout_plan": next(iter(ENTRIES))}) == {}
+    assert PlanStore.read_entries(store_path, routes=routes) == ({}, {})
+
+
+def rewrite_header(path, **fields):
+    with open(path, "r+b") as store_file:
+        header = dict(zip(("magic", "version", "source_hash", "count", "meta_length"),
+                          _HEADER.unpack(store_file.read(_HEADER.size))))
+        store_file.seek(0)
+        store_file.write(_HEADER.pack(*{**header, **fields}.values()))
+
+
+@pytest.mark.parametrize("fields", [
+    {"version": FORMAT_VERSION + 1},
+    {"magic": b"NOTPLANS"},
+    {"count": 10 ** 6},  # index runs past the end of the file
+], ids=["version", "magic", "truncated"])
+def test_unreadable_headers_leave_the_store_disabled(store_path, fields):
+    rewrite_header(store_path, **fields)
+    store = PlanStore(store_path, routes=ROUTES)
+    assert (store.status, store.enabled) == ("invalid", False)
+    assert store.lookup(next(iter(ENTRIES))) is None
+
+
+def test_short_file_is_invalid(tmp_path):
+    path = tmp_path / "plans.store"
+    path.write_bytes(struct.pack("<8s", b"FCPLANS\0"))
+    assert PlanStore(str(path), routes=ROUTES).status == "invalid"
+
+
+def test_missing_or_unset_path(tmp_path):
+    assert PlanStore(str(tmp_path / "absent.store"), routes=ROUTES).status == "missing"
+    assert PlanStore("", routes=ROUTES).status == "disabled"
@@ -0,0 +1,23 @@
+"""Every prompt template stays within PromptTemplates.TOKEN_BUDGETS over the profile grid."""
+import pytest
+
+from backend.benchmarks.prompt_tokens import measure
+from backend.nlp.PromptTemplates import PromptTemplates
+
+
+@pytest.fixture(scope="module")
+def worst_case_tokens():
+    # Offline estimate, so the check needs neither tiktoken nor network access
+    return measure(PromptTemplates)
+
+
+def test_every_rendered_template_has_a_budget(worst_case_tokens):
+    assert set(worst_case_tokens) <= set(PromptTemplates.TOKEN_BUDGETS)
+
+
+@pytest.mark.parametrize("template", sorted(PromptTemplates.TOKEN_BUDGETS))
+def test_template_within_budget(worst_case_tokens, template):
+    assert template in worst_case_tokens, f"{template} is not rendered by the grid"
+    assert worst_case_tokens[template] <= PromptTemplates.TOKEN_BUDGETS[template], (
+        f"{template}: {worst_case_tokens[template]} tokens > budget {PromptTemplates.TOKEN_BUDGETS[template]}"
+    )
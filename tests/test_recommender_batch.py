@@ -0,0 +1,60 @@
+"""The vectorized RuleBasedRecommender must agree with the scalar rules row for row."""
+import numpy as np
+import pytest
+
+from backend.benchmarks.recommender_batch import boundary_cases, make_cohort
+from backend.models.RuleBasedRecommender import RuleBasedRecommender
+
+COLUMNS = ("weight", "height", "age", "hypertension", "diabetes")
+
+
+def score(rows):
+    columns = {name: np.array(values) for name, values in zip(COLUMNS, zip(*rows))}
+    return RuleBasedRecommender.get_recommendation_levels_batch(*(columns[name] for name in COLUMNS))
+
+
+def assert_matches_scalar(rows):
+    bmi, levels = score(rows)
+    for position, (weight, height, age, hypertension, diabetes) in enumerate(rows):
+        expected_bmi = RuleBasedRecommender.calculate_bmi(weight, height)
+        expected_level = RuleBasedRecommender.get_recommendation_level(weight, height, age, hypertension, diabetes)
+        assert bmi[position] == expected_bmi, rows[position]
+        assert levels[position] == expected_level, rows[position]
+
+
+def test_bmi_and_age_boundaries():
+    assert_matches_scalar(boundary_cases())
+
+
+def test_rounding_ties():
+    # Weights whose BMI lands on (or within float error of) a .x5 tie at 100 cm and 180 cm
+    rows = [(weight, 100.0, 30, "No", "No") for weight in (18.45, 18.55, 24.95, 25.05, 29.95, 34.95, 39.95)]
+    rows += [(round(bmi * 3.24, 4), 180.0, 30, "No", "No") for bmi in (18.45, 24.95, 29.95, 34.95)]
+    assert_matches_scalar(rows)
+
+
+def test_random_sample():
+    cohort = make_cohort(20_000, seed=7)
+    rows = [
+        (float(cohort["weight"][i]), float(cohort["height"][i]), int(cohort["age"][i]),
+         str(cohort["hypertension"][i]), str(cohort["diabetes"][i]))
+        for i in range(len(cohort["weight"]))
+    ]
+    assert_matches_scalar(rows)
+
+
+def test_boolean_flags_match_yes_no():
+    rows = boundary_cases()
+    bmi, levels = score(rows)
+    columns = {name: np.array(values) for name, values in zip(COLUMNS, zip(*rows))}
+    flag_bmi, flag_levels = RuleBasedRecommender.get_recommendation_levels_batch(
+        columns["weight"], columns["height"], columns["age"],
+        columns["hypertension"] == "Yes", columns["diabetes"] == "Yes",
+    )
+    assert np.array_equal(bmi, flag_bmi)
+    assert np.array_equal(levels, flag_levels)
+
+
+def test_rejects_non_positive_height():
+    with pytest.raises(ValueError):
+        RuleBasedRecommender.calculate_bmi_batch([70.0, 70.0], [170.0, 0.0])
@@ -0,0 +1,76 @@
+"""ResponseCache keys, tiers and expiry, and the generator's rule that upstream errors are never cached."""
+import asyncio
+import time
+
+import pytest
+
+from backend.nlp.GPTClient import GPTClient
+from backend.nlp.GPTWorkoutGenerator import GPTWorkoutGenerator
+from backend.utils.ResponseCache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+def test_keys_ignore_whitespace_but_not_parameters():
+    key = ResponseCache.make_key("Plan for\n    a beginner", "gpt-4o", 0.7, 500)
+    assert key == ResponseCache.make_key("Plan for a beginner ", "gpt-4o", 0.7, 500)
+    assert key != ResponseCache.make_key("Plan for a beginner", "gpt-4o-mini", 0.7, 500)
+    assert key != ResponseCache.make_key("Plan for a beginner", "gpt-4o", 0.2, 500)
+    assert key != ResponseCache.make_key("Plan for a beginner", "gpt-4o", 0.7, 900)
+
+
+def test_memory_hit_miss_and_lru(clock):
+    cache = ResponseCache(max_entries=2, ttl_seconds=60, db_path="")
+    assert cache.get("a") is None
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    assert cache.get_stats()["memory_hits"] == 1
+    assert cache.get_stats()["misses"] == 2
+    assert cache.get_stats()["entries"] == 2
+
+
+def test_entries_expire_in_both_tiers(clock, tmp_path):
+    db_path = str(tmp_path / "responses.db")
+    ResponseCache(max_entries=8, ttl_seconds=60, db_path=db_path).set("a", "A")
+
+    # A fresh process finds the entry on disk and promotes it with its original age
+    cache = ResponseCache(max_entries=8, ttl_seconds=60, db_path=db_path)
+    clock[0] += 30
+    assert cache.get("a") == "A"
+    assert cache.get("a") == "A"
+    assert (cache.get_stats()["disk_hits"], cache.get_stats()["memory_hits"]) == (1, 1)
+
+    clock[0] += 31
+    assert cache.get("a") is None
+    assert ResponseCache(max_entries=8, ttl_seconds=60, db_path=db_path).get("a") is None
+
+
+def test_upstream_errors_are_not_cached():
+    generator = GPTWorkoutGenerator(cache=ResponseCache(max_entries=8, ttl_seconds=60, db_path=""))
+    replies = [f"{GPTClient.ERROR_PREFIX} upstream timed out", "A plan"]
+    calls = []
+
+    async def generate(prompt, model, temperature, max_tokens, priority, label):
+        calls.append(prompt)
+        return replies[len(calls) - 1]
+
+    generator.scheduler.generate = generate
+
+    async def scenario():
+        first = await generator.generate_response_async("prompt", template="workout_plan_prompt")
+        second = await generator.generate_response_async("prompt", template="workout_plan_prompt")
+        third = await generator.generate_response_async("prompt", template="workout_plan_prompt")
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert generator.is_error(first)
+    assert second == third == "A plan"
+    assert len(calls) == 2
@@ -0,0 +1,98 @@
+"""
+Labelled concern pairs the SemanticCache threshold is calibrated on.
+
+Each pair is (cached concern, incoming concern). Paraphrases must be served from the
+cache; non-paraphrases, mostly the same question with one content word changed, must
+not. Add pairs here when the matching features or SEMANTIC_CACHE_THRESHOLD change.
+"""
+import pytest
+
+pytest.importorskip("sklearn")
+
+from backend.utils.SemanticCache import SemanticCache  # noqa: E402
+
+PARAPHRASES = [
+    ("knees hurt when squatting", "knee pain during squats"),
+    ("my knee hurts during squats", "knee pain during squats"),
+    ("How do I avoid knee pain during squats?", "how can I stop my knees hurting when I squat"),
+    ("My lower back hurts after deadlifts", "lower back pain after deadlifting"),
+    ("Is it ok to train when my muscles are sore?", "can I work out with sore muscles"),
+    ("How much water should I drink?", "how much water do I need to drink"),
+    ("Can I train with a cold?", "is it ok to exercise when I have a cold"),
+    ("How long should I rest between workouts?", "how much rest between workouts"),
+    ("What should I eat before training?", "what to eat before a workout"),
+    ("Are protein supplements necessary?", "do I need protein supplements"),
+    ("I lose motivation after two weeks, any tips?", "I lose my motivation after a couple of weeks"),
+    ("How do I stay consistent while travelling?", "staying consistent with workouts while traveling"),
+    ("my shoulder hurts when I bench press", "shoulder pain during bench press"),
+    ("how do I lose belly fat", "how to burn stomach fat"),
+    ("how many push-ups should a beginner do", "how many pushups for beginners"),
+    ("can I do cardio every day", "is it ok to do cardio daily"),
+    ("my wrists hurt during push ups", "wrist pain when doing push-ups"),
+    ("how much protein do I need to build muscle", "how much protein to gain muscle"),
+    ("what are good stretches for tight hamstrings", "stretches for tight hamstrings"),
+    ("I feel dizzy after workouts", "feeling dizzy after working out"),
+    ("should I work out when I am tired", "is it ok to exercise when tired"),
+    ("how can I improve my sleep for recovery", "improve sleep for better recovery"),
+    ("my neck aches after crunches", "neck pain from doing crunches"),
+    ("is running bad for my knees", "does running hurt your knees"),
+]
+KNOWN_MISSES = {
+    ("is running bad for my knees", "does running hurt your knees"): "'bad' and 'hurt' are not folded together",
+}
+
+NON_PARAPHRASES = [
+    ("shoulder pain during squats", "knee pain during squats"),
+    ("knee pain during lunges", "knee pain during squats"),
+    ("My lower back hurts after deadlifts", "my upper back hurts after rows"),
+    ("How much water should I drink?", "how much protein should I eat"),
+    ("Can I train with a cold?", "can I train with a knee injury"),
+    ("What should I eat before training?", "what should I eat after training"),
+    ("How long should I rest between workouts?", "how long should my workouts be"),
+    ("Are protein supplements necessary?", "are creatine supplements safe"),
+    ("how do I lose belly fat", "how do I build arm muscle"),
+    ("is running bad for my knees", "is cycling bad for my knees"),
+    ("how many push-ups should a beginner do", "how many squats should a beginner do"),
+    ("can I do cardio every day", "can I do weights every day"),
+    ("my wrists hurt during push ups", "my wrists hurt during curls"),
+    ("I feel dizzy after workouts", "I feel nauseous after workouts"),
+    ("how can I improve my sleep for recovery", "how can I improve my diet for recovery"),
+    ("is it safe to exercise with high blood pressure", "is it safe to exercise with diabetes"),
+    ("how do I stay motivated", "how do I stay hydrated"),
+    ("what are good stretches for tight hamstrings", "what are good stretches for tight hips"),
+    ("should I do cardio before or after weights", "should I stretch before or after running"),
+    ("my neck aches after crunches", "my neck aches after sleeping"),
+    ("how do I lose weight fast", "how do I gain weight fast"),
+    ("best exercises for lower back pain", "best exercises for neck pain"),
+    ("Is it ok to train when my muscles are sore?", "is it ok to train on an empty stomach"),
+    ("I lose motivation after two weeks, any tips?", "I lose my breath after two minutes of running"),
+]
+
+
+def profile(concern):
+    return {"fitness_goal": concern}
+
+
+@pytest.fixture(scope="module")
+def cache():
+    # Every cached concern in one index (so the IDF is realistic), each under its own profile
+    cache = SemanticCache(max_entries=1000, db_path="", audit_log="")
+    for concern, _ in PARAPHRASES + NON_PARAPHRASES:
+        cache.add(concern, profile(concern), f"answer to {concern}")
+    return cache
+
+
+@pytest.mark.parametrize("cached, incoming", [
+    pytest.param(*pair, marks=pytest.mark.xfail(reason=KNOWN_MISSES[pair], strict=True)) if pair in KNOWN_MISSES else pair
+    for pair in PARAPHRASES
+])
+def test_paraphrase_is_served_from_cache(cache, cached, incoming):
+    hit = cache.lookup(incoming, profile(cached))
+    assert hit is not None, f"{incoming!r} missed {cached!r}"
+    assert hit["matched_concern"] == cache.normalize_concern(cached)
+
+
+@pytest.mark.parametrize("cached, incoming", NON_PARAPHRASES)
+def test_different_question_is_not_served(cache, cached, incoming):
+    hit = cache.lookup(incoming, profile(cached))
+    assert hit is None, f"{incoming!r} matched {cached!r} at {hit and hit['similarity']}"
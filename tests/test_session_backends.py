@@ -0,0 +1,61 @@
+"""SessionManager over the SQLite backend: sessions are shared between workers and expire when idle."""
+import time
+
+import pytest
+
+from backend.utils.SessionBackends import SQLiteSessionBackend
+from backend.utils.SessionManager import SessionManager
+
+SESSION = {"weight": 70, "height": 175, "fitness_goal": "Muscle Gain", "conversation": [{"concern": "knees"}]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def workers(tmp_path, monkeypatch):
+    """Two managers over one SQLite file, as two uvicorn workers would be."""
+    monkeypatch.setenv("SESSION_CACHE_FRESHNESS", "2")
+    monkeypatch.setenv("SESSION_IDLE_TTL", "60")
+    db_path = str(tmp_path / "sessions.db")
+    managers = [SessionManager(SQLiteSessionBackend(db_path)) for _ in range(2)]
+    yield managers
+    for manager in managers:
+        manager.backend.close()
+
+
+def test_sessions_are_shared_between_workers(workers, clock):
+    first, second = workers
+    first.create_session("s1", SESSION)
+    assert dict(second.get_session("s1")) == SESSION
+    assert second.size() == 1
+
+    # The second worker trusts its cached copy until it is older than SESSION_CACHE_FRESHNESS
+    first.create_session("s1", {**SESSION, "weight": 72})
+    assert second.get_session("s1")["weight"] == 70
+    clock[0] += 3
+    assert second.get_session("s1")["weight"] == 72
+
+    second.delete_session("s1")
+    clock[0] += 3
+    assert first.get_session("s1") is None
+
+
+def test_idle_sessions_expire(workers, clock):
+    first, second = workers
+    first.create_session("idle", SESSION)
+    first.create_session("active", SESSION)
+
+    # A read served from the front cache reaches the backend on the next sweep, keeping the session alive
+    first.cache_freshness = 100
+    clock[0] += 40
+    first.get_session("active")
+    assert "active" in first._touched
+    clock[0] += 30
+    assert first.sweep() == 1
+    assert second.get_session("idle") is None
+    assert dict(second.get_session("active")) == SESSION
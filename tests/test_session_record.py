@@ -0,0 +1,64 @@
+"""SessionRecord must read back exactly like the session dict it was packed from."""
+import pytest
+
+from backend.utils.SessionBackends import MemorySessionBackend, SQLiteSessionBackend
+from backend.utils.SessionRecord import SessionRecord
+
+SESSION = {
+    "weight": 70.5, "height": 175, "gender": 1, "age": 30, "hypertension": "No", "diabetes": "No",
+    "fitness_goal": "Muscle Gain", "workout_preference": "Mixed", "workout_location": "Gym",
+    "duration": "6 weeks", "experience_level": "beginner", "bmi": 23.02, "recommendation_level": "Moderate",
+    "artifacts": {"workout_plan": {"content": "| Exercise | Sets |\n" * 40, "fingerprint": "abc", "source": "gpt"}},
+    "conversation": [{"concern": "knee pain", "response": "Try low-impact cardio."}],
+    "plan": {"generation_mode": "separate", "pending": False},
+}
+
+
+@pytest.mark.parametrize("min_bytes", [0, 256, 10 ** 9], ids=["all-compressed", "default", "uncompressed"])
+def test_round_trip(min_bytes):
+    record = SessionRecord(SESSION, min_bytes)
+    assert dict(record) == SESSION
+    assert {**record, "age": 31} == {**SESSION, "age": 31}
+    assert len(record) == len(SESSION)
+    assert set(record) == set(SESSION)
+    assert record.get("exercise_videos") is None
+    assert "gender" in record and "exercise_videos" not in record
+
+
+def test_partial_profiles_round_trip():
+    partial = {"weight": 70, "conversation": []}
+    record = SessionRecord(partial)
+    assert dict(record) == partial
+    assert "height" not in record
+    with pytest.raises(KeyError):
+        record["height"]
+
+
+def test_reads_are_copies():
+    record = SessionRecord(SESSION)
+    record["conversation"].append({"concern": "sleep"})
+    record["artifacts"]["workout_plan"]["content"] = ""
+    assert dict(record) == SESSION
+
+
+def test_large_values_are_compressed_and_categoricals_shared():
+    first, second = SessionRecord(SESSION), SessionRecord({**SESSION, "fitness_goal": "".join(["Muscle ", "Gain"])})
+    assert isinstance(first._extra["artifacts"], bytes)
+    assert isinstance(first._extra["plan"], str)
+    assert first["fitness_goal"] is second["fitness_goal"]
+
+
+def test_memory_backend_stores_records():
+    backend = MemorySessionBackend(compress_min_bytes=256)
+    backend.save("s1", SESSION)
+    stored = backend.load("s1")
+    assert isinstance(stored, SessionRecord)
+    assert dict(stored) == SESSION
+    assert SessionRecord.pack(stored) is stored
+
+
+def test_records_save_to_sqlite(tmp_path):
+    backend = SQLiteSessionBackend(str(tmp_path / "sessions.db"))
+    backend.save("s1", SessionRecord(SESSION))
+    assert backend.load("s1") == SESSION
+    backend.close()
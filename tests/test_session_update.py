@@ -0,0 +1,79 @@
+"""PATCH /session/{id} regenerates only the sections whose prompts read a changed input."""
+import itertools
+import json
+
+import httpx
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+import backend.main as main
+from backend.nlp.GPTClient import GPTClient
+from backend.utils.ResponseCache import ResponseCache
+
+PROFILE = dict(
+    weight=70, height=175, gender=1, age=30, hypertension="No", diabetes="No",
+    fitness_goal="Muscle Gain", workout_preference="Mixed", workout_location="Gym",
+    duration="1 week", experience_level="beginner",
+)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """A session generated from PROFILE; yields (client, session_id, prompts sent upstream since)."""
+    prompts, replies = [], itertools.count()
+
+    def handler(request):
+        body = json.loads(request.content)
+        prompts.append(body["messages"][-1]["content"])
+        return httpx.Response(200, json={
+            "id": "x", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": f"reply {next(replies)}"},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        })
+
+    client = openai.AsyncOpenAI(
+        api_key="test", max_retries=0, http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(GPTClient, "_async_client", client)
+    monkeypatch.setattr(main.workout_generator, "cache", ResponseCache(max_entries=64, ttl_seconds=60, db_path=""))
+    with TestClient(main.app) as test_client:
+        session_id = test_client.post("/generate-workout", json=PROFILE).json()["session_id"]
+        prompts.clear()
+        yield test_client, session_id, prompts
+
+
+@pytest.mark.parametrize("update, updated_fields, regenerated", [
+    # Same BMI band: every prompt is unchanged
+    ({"weight": 72}, ["bmi", "weight"], []),
+    ({"weight": 95}, ["bmi", "recommendation_level", "weight"], ["fitness_analysis", "nutrition_tips"]),
+    ({"duration": "4 weeks"}, ["duration"], ["workout_plan"]),
+    ({"age": 31}, ["age"], ["fitness_analysis"]),
+    ({"hypertension": "Yes"}, ["hypertension", "recommendation_level"],
+     ["fitness_analysis", "workout_plan", "nutrition_tips"]),
+])
+def test_only_affected_sections_are_regenerated(session, update, updated_fields, regenerated):
+    client, session_id, prompts = session
+    before = client.get(f"/session/{session_id}/plan").json()["sections"]
+
+    response = client.patch(f"/session/{session_id}", json=update).json()
+    assert response["updated_fields"] == updated_fields
+    assert response["regenerated_sections"] == regenerated
+    assert len(prompts) == len(regenerated)
+    for section, content in before.items():
+        assert (response[section] != content) == (section in regenerated)
+
+    # The session now holds the new profile and sections, so repeating the update changes nothing
+    stored = client.get(f"/session/{session_id}").json()["user_data"]
+    assert {name: stored[name] for name in update} == update
+    repeated = client.patch(f"/session/{session_id}", json=update).json()
+    assert (repeated["updated_fields"], repeated["regenerated_sections"]) == ([], [])
+    assert len(prompts) == len(regenerated)
+
+
+def test_invalid_updates_are_rejected(session):
+    client, session_id, prompts = session
+    assert client.patch(f"/session/{session_id}", json={"age": "thirty"}).status_code == 422
+    assert client.patch("/session/unknown", json={"age": 31}).status_code == 404
+    assert prompts == []
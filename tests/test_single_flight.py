@@ -0,0 +1,78 @@
+"""Identical in-flight GPT calls share one upstream request, and one caller leaving never fails the others."""
+import asyncio
+import time
+
+from backend.nlp.GPTWorkoutGenerator import GPTWorkoutGenerator
+from backend.utils.ResponseCache import ResponseCache
+
+
+def make_generator():
+    """A generator whose upstream call blocks until `release` is set; `calls` records started and cancelled calls."""
+    generator = GPTWorkoutGenerator(cache=ResponseCache(max_entries=8, ttl_seconds=60, db_path=""))
+    release = asyncio.Event()
+    calls = {"started": 0, "cancelled": 0}
+
+    async def generate(prompt, model, temperature, max_tokens, priority, label):
+        calls["started"] += 1
+        try:
+            await release.wait()
+        except asyncio.CancelledError:
+            calls["cancelled"] += 1
+            raise
+        return f"plan for {prompt}"
+
+    generator.scheduler.generate = generate
+    return generator, release, calls
+
+
+def call(generator, **kwargs):
+    return asyncio.create_task(generator.generate_response_async("prompt", template="workout_plan_prompt", **kwargs))
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        generator, release, calls = make_generator()
+        first, second = call(generator), call(generator)
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return generator, calls, await second, first
+
+    generator, calls, result, first = asyncio.run(scenario())
+    assert first.cancelled()
+    assert result == "plan for prompt"
+    assert calls == {"started": 1, "cancelled": 0}
+    assert generator.single_flight_stats == {"upstream_calls": 1, "deduplicated": 1}
+    assert generator.in_flight_count() == 0
+
+
+def test_caller_past_its_deadline_leaves_the_call_running():
+    async def scenario():
+        generator, release, calls = make_generator()
+        hurried = call(generator, deadline=time.monotonic() + 0.05)
+        patient = call(generator)
+        hurried_result = await hurried
+        release.set()
+        return generator, calls, hurried_result, await patient
+
+    generator, calls, hurried, patient = asyncio.run(scenario())
+    assert generator.is_error(hurried)
+    assert patient == "plan for prompt"
+    assert calls == {"started": 1, "cancelled": 0}
+
+
+def test_last_caller_leaving_cancels_the_upstream_call():
+    async def scenario():
+        generator, release, calls = make_generator()
+        callers = [call(generator), call(generator)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        return generator, calls
+
+    generator, calls = asyncio.run(scenario())
+    assert calls == {"started": 1, "cancelled": 1}
+    assert generator.in_flight_count() == 0